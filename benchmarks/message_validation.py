@@ -0,0 +1,116 @@
+"""WebSocket受信メッセージ検証のマイクロベンチマーク
+
+message:sendのdataの検証方式ごとに、1秒あたりの検証回数を計測する。
+
+- legacy: 必須フィールドをisinstanceで1つずつ確認した後、MessageCreate.model_validateで再度検証（従来方式）
+- single: IncomingMessage.model_validateで1回だけ検証（現在の websocket.handler.parse_message_data）
+
+正常なメッセージに加えて、エラーになるメッセージでも計測し、両方式のエラー内容が一致することを確認する。
+
+使い方:
+    python benchmarks/message_validation.py --count 200000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from pydantic import ValidationError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.backend.schemas import MAX_MESSAGE_LENGTH, MessageCreate
+from src.backend.websocket.handler import parse_message_data
+
+LEGACY_REQUIRED_FIELDS = {
+    "id": str,
+    "channel_id": str,
+    "user_id": str,
+    "user_name": str,
+    "content": str,
+    "timestamp": str,
+    "is_own_message": bool,
+}
+
+VALID_MESSAGE = {
+    "id": "msg_1234567890_abcdef",
+    "channel_id": "1",
+    "user_id": "user_1",
+    "user_name": "ユーザー1",
+    "content": "こんにちは！今日は音楽の話をしよう",
+    "timestamp": datetime.now(UTC).isoformat(),
+    "is_own_message": True,
+}
+# (名前, メッセージ)
+CASES: tuple[tuple[str, dict[str, Any]], ...] = (
+    ("valid", VALID_MESSAGE),
+    ("missing field", {key: value for key, value in VALID_MESSAGE.items() if key != "user_name"}),
+    ("wrong type", {**VALID_MESSAGE, "is_own_message": "true"}),
+    ("empty content", {**VALID_MESSAGE, "content": "   "}),
+    ("bad timestamp", {**VALID_MESSAGE, "timestamp": "yesterday"}),
+)
+
+
+def legacy_validate(message_data: dict[str, Any]) -> tuple[MessageCreate | None, str | None]:
+    """比較用: 従来の2段階の検証"""
+    for field_name, field_type in LEGACY_REQUIRED_FIELDS.items():
+        if field_name not in message_data:
+            return None, f"メッセージデータが無効です: 必須フィールド '{field_name}' が不足しています"
+        if not isinstance(message_data[field_name], field_type):
+            return (
+                None,
+                f"メッセージデータが無効です: フィールド '{field_name}' の型が正しくありません"
+                f"（期待値: {field_type.__name__}）",
+            )
+    content = message_data["content"]
+    if not content.strip():
+        return None, "メッセージデータが無効です: メッセージ内容は空にできません"
+    if len(content) > MAX_MESSAGE_LENGTH:
+        return None, "メッセージデータが無効です: メッセージが長すぎます"
+    try:
+        return MessageCreate.model_validate(message_data), None
+    except ValidationError:
+        return None, "メッセージフォーマットが正しくありません"
+
+
+def _measure(validate: Callable[[dict[str, Any]], Any], message: dict[str, Any], count: int) -> float:
+    """検証をcount回実行し、1秒あたりの回数を返す"""
+    start = time.perf_counter()
+    for _ in range(count):
+        validate(message)
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """エントリーポイント"""
+    parser = argparse.ArgumentParser(description="WebSocket受信メッセージ検証のマイクロベンチマーク")
+    parser.add_argument("--count", type=int, default=200_000, help="ケースごとの検証回数")
+    args = parser.parse_args()
+
+    for name, message in CASES:
+        (legacy_message, legacy_error), (single_message, single_error) = (
+            legacy_validate(message),
+            parse_message_data(message),
+        )
+        legacy_values = legacy_message.model_dump() if legacy_message else None
+        single_values = single_message.model_dump() if single_message else None
+        if (legacy_values, legacy_error) != (single_values, single_error):
+            raise SystemExit(f"{name}: 検証結果が一致しません: {legacy_error} != {single_error}")
+
+    # 形式の誤りの警告ログを計測に含めない
+    logging.disable(logging.WARNING)
+    print(f"=== メッセージ検証: {args.count}回/ケース ===")
+    print(f"{'case':<16}{'legacy':>14}{'single':>14}{'speedup':>10}")
+    for name, message in CASES:
+        legacy = _measure(legacy_validate, message, args.count)
+        single = _measure(parse_message_data, message, args.count)
+        print(f"{name:<16}{legacy:>10.0f}/s{single:>12.0f}/s{single / legacy:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
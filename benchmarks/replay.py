@@ -0,0 +1,263 @@
+"""記録したメッセージのWebSocket再生
+
+エクスポートしたNDJSON（`export_messages.py` / `GET /api/channels/{channel_id}/export`）のメッセージを、
+元の送信間隔（またはその倍速）でWebSocketから送信し直し、本番のトラフィックをローカルで再現する。
+ユーザーごとに1本の接続を使い（--max-clientsを超える場合は接続を共有）、以下を計測する。
+
+- 送信スループットと、元の送信時刻からの遅れ（送信側が間に合っているか）
+- 受信 → 保存通知（message:saved）のレイテンシ
+
+--batch-size を指定すると、連続するメッセージを message:send_batch でまとめて送信する（ボットや取り込み処理を想定）。
+AIのメッセージはサーバーが@AIメンションに応答して生成し直すため、デフォルトでは送信しない。
+メッセージIDは元のIDに実行ごとの接頭辞を付けて送信する（取り込み済みのメッセージと重複させないため）。
+
+使い方:
+    # フェイクモデルで起動したサーバーに60倍速で再生
+    python benchmarks/replay.py backup/channel-1.ndjson.gz backup/channel-2.ndjson.gz --speed 60
+
+    # 起動中のサーバーに等速で再生
+    python benchmarks/replay.py backup/channel-1.ndjson --url ws://localhost:8000/ws --speed 1
+
+    # 送信間隔を無視して最大速度で送信
+    python benchmarks/replay.py backup/channel-1.ndjson --speed 0 --limit 10000
+
+    # 100件ずつ一括送信
+    python benchmarks/replay.py backup/channel-1.ndjson --speed 0 --limit 10000 --batch-size 100
+"""
+
+import argparse
+import asyncio
+import gzip
+import heapq
+import itertools
+import json
+import tempfile
+import time
+import uuid
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import websockets
+from websocket_load import ServerProcess, _percentiles
+
+
+def _read_records(path: Path) -> Iterator[dict[str, Any]]:
+    """エクスポートしたNDJSONファイル（.gzの場合は展開）を古い順に読み込む"""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _replay_records(paths: list[Path], include_ai: bool, limit: int | None) -> Iterator[dict[str, Any]]:
+    """複数ファイルのメッセージを作成日時の順に取得"""
+    records = heapq.merge(*(_read_records(path) for path in paths), key=lambda record: record["createdAt"])
+    if not include_ai:
+        records = (record for record in records if record.get("userType") != "ai")
+    return itertools.islice(records, limit)
+
+
+class Replayer:
+    """メッセージの再生と計測"""
+
+    def __init__(self, url: str, max_clients: int, run_id: str) -> None:
+        """初期化
+
+        Args:
+            url: WebSocketのURL
+            max_clients: 開く接続の最大数
+            run_id: メッセージIDに付ける接頭辞
+
+        """
+        self.url = url
+        self.max_clients = max_clients
+        self.run_id = run_id
+        self.connections: list[websockets.ClientConnection] = []
+        # user_id -> 接続
+        self.user_connections: dict[str, websockets.ClientConnection] = {}
+        self.receivers: list[asyncio.Task] = []
+        self.send_times: dict[str, float] = {}
+        self.ack_latencies: list[float] = []
+        self.schedule_lags: list[float] = []
+        self.sent = 0
+        self.errors = 0
+
+    async def _connection(self, user_id: str) -> websockets.ClientConnection:
+        """ユーザーの接続を取得（上限に達した後の新しいユーザーは既存の接続を順番に共有）"""
+        if user_id not in self.user_connections:
+            if len(self.connections) < self.max_clients:
+                ws = await websockets.connect(self.url, max_queue=None, ping_interval=None, open_timeout=30)
+                self.connections.append(ws)
+                self.receivers.append(asyncio.create_task(self._receive_loop(ws)))
+            else:
+                ws = self.connections[len(self.user_connections) % len(self.connections)]
+            self.user_connections[user_id] = ws
+        return self.user_connections[user_id]
+
+    async def _receive_loop(self, ws: websockets.ClientConnection) -> None:
+        async for raw in ws:
+            now = time.perf_counter()
+            message = json.loads(raw)
+            message_type = message.get("type")
+            if message_type == "message:saved":
+                self._ack((message.get("data") or {}).get("id"), now)
+            elif message_type == "message:batch_result":
+                for result in (message.get("data") or {}).get("results", []):
+                    if result.get("success"):
+                        self._ack(result.get("id"), now)
+                    else:
+                        self.errors += 1
+            elif message_type in ("message:error", "error"):
+                self.errors += 1
+
+    def _ack(self, message_id: str | None, now: float) -> None:
+        sent_at = self.send_times.pop(message_id, None)
+        if sent_at is not None:
+            self.ack_latencies.append(now - sent_at)
+
+    def _build_data(self, record: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "id": f"{self.run_id}_{record['id']}",
+            "channel_id": record["channelId"],
+            "user_id": record["userId"],
+            "user_name": record["userName"],
+            "user_type": record.get("userType", "user"),
+            "content": record["content"],
+            "timestamp": datetime.now(UTC).isoformat(),
+            "is_own_message": True,
+        }
+
+    async def replay(self, records: Iterator[dict[str, Any]], speed: float, batch_size: int = 1) -> float:
+        """メッセージを元の間隔のspeed倍速で送信し、所要時間（秒）を返す（speedが0の場合は待たない）
+
+        batch_sizeが2以上の場合は、連続するメッセージを先頭のメッセージの送信時刻にまとめて送信する。
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first_created_at: datetime | None = None
+        for batch in itertools.batched(records, batch_size, strict=False):
+            record = batch[0]
+            created_at = datetime.fromisoformat(record["createdAt"])
+            first_created_at = first_created_at or created_at
+            if speed > 0:
+                due = started + (created_at - first_created_at).total_seconds() / speed
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.schedule_lags.append(-delay)
+
+            ws = await self._connection(record["userId"])
+            items = [self._build_data(item) for item in batch]
+            sent_at = time.perf_counter()
+            for item in items:
+                self.send_times[item["id"]] = sent_at
+            if batch_size > 1:
+                message = {"type": "message:send_batch", "data": {"messages": items}}
+            else:
+                message = {"type": "message:send", "data": items[0]}
+            await ws.send(json.dumps(message, ensure_ascii=False))
+            self.sent += len(items)
+        return loop.time() - started
+
+    async def close(self) -> None:
+        """接続を閉じる"""
+        for task in self.receivers:
+            task.cancel()
+        await asyncio.gather(*(ws.close() for ws in self.connections), return_exceptions=True)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    """再生を実行して結果を返す"""
+    records = _replay_records(args.files, args.include_ai, args.limit)
+    with tempfile.TemporaryDirectory(prefix="ws-replay-") as tmp_dir:
+        server: ServerProcess | None = None
+        url = args.url
+        if url is None:
+            server = ServerProcess(args, args.database_url or f"sqlite:///{Path(tmp_dir) / 'replay.db'}")
+            server.migrate()
+            await server.start()
+            url = f"ws://127.0.0.1:{server.port}/ws"
+
+        replayer = Replayer(url, args.max_clients, f"replay_{uuid.uuid4().hex[:8]}")
+        try:
+            elapsed = await replayer.replay(records, args.speed, args.batch_size)
+            # 送信済みメッセージの保存通知を待つ
+            await asyncio.sleep(args.drain)
+        finally:
+            await replayer.close()
+            if server is not None:
+                server.stop()
+
+    return {
+        "config": {
+            "speed": args.speed,
+            "batch_size": args.batch_size,
+            "clients": len(replayer.connections),
+            "url": url,
+        },
+        "sent": replayer.sent,
+        "sent_per_second": replayer.sent / max(elapsed, 1e-9),
+        "errors": replayer.errors,
+        "unacked": len(replayer.send_times),
+        "latency_ms": {
+            "receive_to_ack": _percentiles(replayer.ack_latencies),
+            "schedule_lag": _percentiles(replayer.schedule_lags),
+        },
+    }
+
+
+def _print_report(result: dict[str, Any]) -> None:
+    config = result["config"]
+    speed = f"{config['speed']:g}倍速" if config["speed"] > 0 else "最大速度"
+    batch = f", {config['batch_size']}件ずつ一括送信" if config["batch_size"] > 1 else ""
+    print(f"\n=== WebSocket再生: {speed}, {config['clients']}接続{batch} ===")
+    print(
+        f"送信: {result['sent']}件（{result['sent_per_second']:.1f}件/秒）, "
+        f"エラー: {result['errors']}, 未応答: {result['unacked']}"
+    )
+    print(f"{'レイテンシ(ms)':<24}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name, values in result["latency_ms"].items():
+        cells = [
+            f"{values[key]:>10.1f}" if values[key] is not None else f"{'-':>10}" for key in ("p50", "p90", "p99", "max")
+        ]
+        print(f"{name:<24}{values['count']:>8}{''.join(cells)}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """コマンドライン引数を解析"""
+    parser = argparse.ArgumentParser(description="記録したメッセージのWebSocket再生")
+    parser.add_argument("files", nargs="+", type=Path, help="エクスポートしたNDJSONファイル（.gz可）")
+    parser.add_argument("--speed", type=float, default=1.0, help="再生速度（元の送信間隔の何倍速か。0は待たずに送信）")
+    parser.add_argument("--limit", type=int, help="送信するメッセージ数の上限")
+    parser.add_argument(
+        "--batch-size", type=int, default=1, help="message:send_batchでまとめて送信する件数（1は1件ずつ）"
+    )
+    parser.add_argument("--max-clients", type=int, default=200, help="開く接続の最大数（ユーザーごとに1接続）")
+    parser.add_argument("--include-ai", action="store_true", help="AIのメッセージも送信する")
+    parser.add_argument("--drain", type=float, default=3.0, help="送信終了後に保存通知を待つ時間（秒）")
+    parser.add_argument("--url", help="送信先のWebSocket URL（省略時はフェイクモデルでサーバーを起動）")
+    # --url省略時に起動するサーバーの設定（websocket_load.pyと同じ）
+    parser.add_argument("--database-url", help="サーバーの接続先DB（省略時は一時ディレクトリのSQLite）")
+    parser.add_argument("--fake-latency-ms", type=float, default=50.0, help="フェイクモデルの応答遅延（ミリ秒）")
+    parser.add_argument("--port", type=int, help="サーバーのポート（省略時は空きポート）")
+    parser.add_argument("--ws-compression", action="store_true", help="permessage-deflateでサーバーを起動")
+    parser.add_argument("--json-output", type=Path, help="結果をJSONで保存するパス")
+    parser.add_argument("--verbose", action="store_true", help="サーバーのログを表示")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """エントリーポイント"""
+    args = parse_args()
+    result = asyncio.run(run(args))
+    _print_report(result)
+    if args.json_output:
+        args.json_output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
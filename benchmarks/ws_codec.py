@@ -0,0 +1,74 @@
+"""WebSocketメッセージ形式（JSON / MessagePack）のマイクロベンチマーク
+
+websocket.codecの形式ごとに、代表的なメッセージのフレームサイズと、
+1秒あたりのエンコード（送信）・デコード（受信）回数を計測する。
+ブロードキャストは接続数に関係なく形式ごとに1回だけエンコードされるため、エンコードは1回あたりの値を示す。
+
+使い方:
+    python benchmarks/ws_codec.py --count 200000
+"""
+
+import argparse
+import sys
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.backend.websocket.codec import JSON_CODEC, MSGPACK_CODEC
+
+BROADCAST = {
+    "type": "message:broadcast",
+    "data": {
+        "id": "ai_msg_1700000000000_abcdef",
+        "channel_id": "1",
+        "user_id": "ai_takashi",
+        "user_name": "タカシ",
+        "user_type": "ai",
+        "content": "いいね！最近はどんな音楽を聴いてるの？自分は最近ジャズにはまってるよ。",
+        "timestamp": datetime.now(UTC).isoformat(),
+        "is_own_message": False,
+        "seq": 12345,
+        "epoch": "0123456789ab",
+    },
+}
+# (名前, メッセージ)
+CASES: tuple[tuple[str, dict[str, Any]], ...] = (
+    ("message:send", {"type": "message:send", "data": {**BROADCAST["data"], "is_own_message": True}}),
+    ("message:saved", {"type": "message:saved", "data": {"id": BROADCAST["data"]["id"], "success": True}}),
+    ("message:broadcast", BROADCAST),
+)
+
+
+def _measure(function: Callable[[Any], Any], argument: Any, count: int) -> float:  # noqa: ANN401
+    """関数をcount回実行し、1秒あたりの回数を返す"""
+    start = time.perf_counter()
+    for _ in range(count):
+        function(argument)
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """エントリーポイント"""
+    parser = argparse.ArgumentParser(description="WebSocketメッセージ形式のマイクロベンチマーク")
+    parser.add_argument("--count", type=int, default=200_000, help="ケース・形式ごとの実行回数")
+    args = parser.parse_args()
+
+    print(f"=== メッセージ形式: {args.count}回/ケース ===")
+    print(f"{'case':<20}{'format':<14}{'bytes':>8}{'encode':>14}{'decode':>14}")
+    for name, message in CASES:
+        for codec in (JSON_CODEC, MSGPACK_CODEC):
+            frame = codec.encode(message)
+            if codec.decode(frame) != message:
+                raise SystemExit(f"{name}: {codec.label}のデコード結果が一致しません")
+            size = len(frame.encode() if isinstance(frame, str) else frame)
+            encode = _measure(codec.encode, message, args.count)
+            decode = _measure(codec.decode, frame, args.count)
+            print(f"{name:<20}{codec.label:<14}{size:>8}{encode:>12.0f}/s{decode:>12.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 """AI自動会話機能モジュール."""
 
-import json
 import logging
 import time
 import uuid
@@ -13,7 +12,9 @@ try:
     from .. import crud
     from ..constants.timezone import JST
     from ..schemas import MessageBroadcastData, MessageCreate
-    from ..utils.session_manager import save_message_with_session_management
+    from ..utils.metrics import BROADCAST_DURATION, DB_SAVE_DURATION
+    from ..utils.session_manager import save_message_with_writer
+    from ..utils.tracing import get_tracer
     from ..websocket.manager import manager
     from .conversation_config import get_conversation_config
     from .gemini_client import get_gemini_client
@@ -26,7 +27,9 @@ except ImportError:
     from ai.personality_manager import AIPersonality
     from constants.timezone import JST
     from schemas import MessageBroadcastData, MessageCreate
-    from utils.session_manager import save_message_with_session_management
+    from utils.metrics import BROADCAST_DURATION, DB_SAVE_DURATION
+    from utils.session_manager import save_message_with_writer
+    from utils.tracing import get_tracer
     from websocket.manager import manager
 
 logger = logging.getLogger(__name__)
@@ -81,13 +84,15 @@ async def broadcast_auto_ai_response(message_data: MessageBroadcastData) -> None
     }
 
     broadcast_start = time.time()
-    await manager.broadcast(json.dumps(broadcast_message))
+    with get_tracer().span("websocket.broadcast", source="auto_ai", connections=len(manager.active_connections)):
+        await manager.broadcast_message(broadcast_message)
     broadcast_time = time.time() - broadcast_start
+    BROADCAST_DURATION.observe(broadcast_time, source="auto_ai")
     logger.info(
         f"自動会話AI応答ブロードキャスト完了: broadcast_time={broadcast_time:.2f}s, message_id={message_data.message_id}"
     )
 
-    # Discord webhook送信
+    # Discord webhook送信（配信キューに追加するのみで送信完了は待たない）
     try:
         try:
             # パッケージとして実行される場合
@@ -96,9 +101,8 @@ async def broadcast_auto_ai_response(message_data: MessageBroadcastData) -> None
             # 直接実行される場合
             from utils.discord_webhook import discord_sender
 
-        success = await discord_sender.send_ai_message(message_data.user_name, message_data.content)
-        if success:
-            logger.debug(f"Discord webhook送信成功: message_id={message_data.message_id}")
+        if discord_sender.enqueue_ai_message(message_data.user_name, message_data.content):
+            logger.debug(f"Discord webhook送信キューに追加: message_id={message_data.message_id}")
     except Exception as e:
         logger.warning(f"Discord webhook送信エラー: {e!s}")
 
@@ -197,13 +201,16 @@ async def generate_auto_conversation_response(channel_id: str, db_session: Sessi
 
         # AI応答を生成（連続発言防止考慮）
         start_time = time.time()
-        response_text, personality = await gemini_client.generate_response(
-            auto_conversation_message,
-            channel_id=channel_id,
-            db_session=db_session,
-            max_retries=3,
-            exclude_user_id=exclude_user_id,
-        )
+        with get_tracer().span("ai.generate") as span:
+            response_text, personality = await gemini_client.generate_response(
+                auto_conversation_message,
+                channel_id=channel_id,
+                db_session=db_session,
+                max_retries=3,
+                exclude_user_id=exclude_user_id,
+            )
+            if span is not None:
+                span.set_attribute("personality", personality.name)
         generation_time = time.time() - start_time
 
         logger.info(
@@ -217,12 +224,14 @@ async def generate_auto_conversation_response(channel_id: str, db_session: Sessi
 
         # データベースに保存
         db_start = time.time()
-        save_message_with_session_management(
-            lambda session: crud.create_message(session, ai_message_create),
-            db_session,
-            auto_commit=False,  # セッションは外部で管理
-        )
+        with get_tracer().span("db.save_message", source="auto_ai", message_id=ai_message_create.id):
+            await save_message_with_writer(
+                lambda session: crud.create_message(session, ai_message_create),
+                db_session,
+                auto_commit=False,  # セッションは外部で管理
+            )
         db_time = time.time() - db_start
+        DB_SAVE_DURATION.observe(db_time, source="auto_ai")
         logger.info(f"自動会話AI応答DB保存完了: db_time={db_time:.2f}s, message_id={ai_message_create.id}")
 
         return convert_message_create_to_broadcast_data(ai_message_create)
@@ -246,14 +255,15 @@ async def handle_auto_conversation_check(channel_id: str, db_session: Session) -
 
         logger.info(f"自動会話を開始: channel_id={channel_id}")
 
-        # AI応答を生成・保存
-        message_data = await generate_auto_conversation_response(channel_id, db_session)
+        with get_tracer().span("auto_conversation.run", channel_id=channel_id):
+            # AI応答を生成・保存
+            message_data = await generate_auto_conversation_response(channel_id, db_session)
 
-        if message_data:
-            # AI応答をブロードキャスト
-            await broadcast_auto_ai_response(message_data)
-            logger.info(f"自動会話完了: message_id={message_data.message_id}")
-            return True
+            if message_data:
+                # AI応答をブロードキャスト
+                await broadcast_auto_ai_response(message_data)
+                logger.info(f"自動会話完了: message_id={message_data.message_id}")
+                return True
 
         logger.warning("自動会話の応答生成に失敗")
         return False
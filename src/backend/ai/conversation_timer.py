@@ -8,7 +8,7 @@ from contextlib import asynccontextmanager
 try:
     # パッケージとして実行される場合
     from ..constants.ai_config import DEFAULT_CHECK_INTERVAL_SECONDS
-    from ..database import SessionLocal
+    from ..database import ReplicaSessionLocal
     from .auto_conversation import handle_auto_conversation_check
     from .conversation_config import get_conversation_config
 except ImportError:
@@ -16,7 +16,7 @@ except ImportError:
     from ai.auto_conversation import handle_auto_conversation_check
     from ai.conversation_config import get_conversation_config
     from constants.ai_config import DEFAULT_CHECK_INTERVAL_SECONDS
-    from database import SessionLocal
+    from database import ReplicaSessionLocal
 
 logger = logging.getLogger(__name__)
 
@@ -101,11 +101,13 @@ class ConversationTimer:
         - 依存性注入によるセッション管理
         - より効率的な非同期DB処理への移行
 
-        現在は同期Session（SessionLocal）を使用しているが、
+        現在は同期Session（ReplicaSessionLocal）を使用しているが、
         非同期アプリケーションとしてAsyncSessionの導入により
         パフォーマンスと一貫性の向上が期待できる。
         """
-        db = SessionLocal()
+        # 会話履歴はレプリカ（設定時）から読み込む。AI応答の保存はSQLiteの書き込みスレッドが有効な場合はそちらで、
+        # 無効な場合はプライマリで行う（保存後の読み込みもプライマリに切り替わる）
+        db = ReplicaSessionLocal()
         try:
             # 対象チャンネルで自動会話をチェック
             executed = await handle_auto_conversation_check(self.config.target_channel_id, db)
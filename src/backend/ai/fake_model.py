@@ -0,0 +1,74 @@
+"""フェイクモデルバックエンド
+
+Gemini APIを呼び出さずに応答を返すクライアント。負荷試験やAPIキーのない
+ローカル環境で、AI応答のフロー（DB保存・ブロードキャスト等）をそのまま動かすために使う。
+google-genaiの ``client.models.generate_content`` と同じ呼び出し方に対応する。
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+try:
+    # パッケージとして実行される場合
+    from ..constants.ai_config import DEFAULT_FAKE_MODEL_LATENCY_MS
+except ImportError:
+    # 直接実行される場合
+    from constants.ai_config import DEFAULT_FAKE_MODEL_LATENCY_MS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FakeResponse:
+    """generate_contentの応答（textのみ）"""
+
+    text: str
+
+
+class _FakeModels:
+    """client.models 相当"""
+
+    def __init__(self, latency_seconds: float) -> None:
+        self.latency_seconds = latency_seconds
+        self.call_count = 0
+
+    def generate_content(self, model: str, contents: str, config: object = None) -> FakeResponse:
+        """API呼び出しの代わりに一定時間待って応答を返す（run_in_executorから呼ばれる）"""
+        self.call_count += 1
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+        # 会話履歴付きのメッセージは末尾の質問部分のみを引用する
+        question = contents.rsplit("現在の質問: ", 1)[-1].strip()
+        return FakeResponse(text=f"（自動応答）「{question[:40]}」について考えてみました。")
+
+
+class FakeModelClient:
+    """google-genaiのClient互換のフェイククライアント"""
+
+    def __init__(self, latency_ms: float | None = None) -> None:
+        """初期化
+
+        Args:
+            latency_ms: 応答までの遅延（ミリ秒）。省略時は環境変数 AI_FAKE_LATENCY_MS
+
+        """
+        if latency_ms is None:
+            latency_ms = _load_latency_ms()
+        self.models = _FakeModels(latency_ms / 1000)
+        logger.warning(
+            f"フェイクモデルバックエンドを使用します（Gemini APIは呼び出されません）: latency={latency_ms}ms"
+        )
+
+
+def _load_latency_ms() -> float:
+    """環境変数から応答遅延を取得"""
+    env_value = os.getenv("AI_FAKE_LATENCY_MS")
+    if not env_value:
+        return DEFAULT_FAKE_MODEL_LATENCY_MS
+    try:
+        return max(float(env_value), 0.0)
+    except ValueError:
+        logger.warning(f"Invalid AI_FAKE_LATENCY_MS value: {env_value}. Using default: {DEFAULT_FAKE_MODEL_LATENCY_MS}")
+        return DEFAULT_FAKE_MODEL_LATENCY_MS
@@ -6,19 +6,43 @@ import os
 import re
 import sys
 import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 
 # 動的インポートを避けるための静的インポート
 try:
     # パッケージとして実行される場合
     from .. import crud
-    from ..constants.ai_config import DEFAULT_CONVERSATION_HISTORY_LIMIT, DEFAULT_MAX_OUTPUT_TOKENS
-    from .personality_manager import AIPersonality, get_personality_manager
+    from ..constants.ai_config import (
+        DEFAULT_CONVERSATION_HISTORY_LIMIT,
+        DEFAULT_GEMINI_RATE_LIMIT_BURST,
+        DEFAULT_GEMINI_REQUESTS_PER_MINUTE,
+        DEFAULT_MAX_OUTPUT_TOKENS,
+        MODEL_BACKEND_FAKE,
+        MODEL_BACKEND_GEMINI,
+    )
+    from ..utils.metrics import GEMINI_REQUEST_DURATION
+    from ..utils.rate_limiter import TokenBucketRateLimiter
+    from ..utils.tracing import get_tracer
+    from .fake_model import FakeModelClient
+    from .personality_manager import AIPersonality, PersonalitySnapshot, get_personality_manager
 except ImportError:
     # 直接実行される場合
     import crud
-    from ai.personality_manager import AIPersonality, get_personality_manager
-    from constants.ai_config import DEFAULT_CONVERSATION_HISTORY_LIMIT, DEFAULT_MAX_OUTPUT_TOKENS
+    from ai.fake_model import FakeModelClient
+    from ai.personality_manager import AIPersonality, PersonalitySnapshot, get_personality_manager
+    from constants.ai_config import (
+        DEFAULT_CONVERSATION_HISTORY_LIMIT,
+        DEFAULT_GEMINI_RATE_LIMIT_BURST,
+        DEFAULT_GEMINI_REQUESTS_PER_MINUTE,
+        DEFAULT_MAX_OUTPUT_TOKENS,
+        MODEL_BACKEND_FAKE,
+        MODEL_BACKEND_GEMINI,
+    )
+    from utils.metrics import GEMINI_REQUEST_DURATION
+    from utils.rate_limiter import TokenBucketRateLimiter
+    from utils.tracing import get_tracer
 from google import genai  # type: ignore
 from google.genai import types  # type: ignore
 from sqlalchemy.orm import Session
@@ -26,6 +50,41 @@ from sqlalchemy.orm import Session
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class MentionResult:
+    """@AIメンションの解析結果."""
+
+    # @AIメンションが含まれているかどうか
+    mentioned: bool
+    # 「@AI タカシ」のように指名された人格名（指名がない場合はNone）
+    target_personality: str | None = None
+
+
+def build_mention_pattern(personality_names: list[str]) -> re.Pattern[str]:
+    """@AIメンションと指名された人格名を1回の走査で抽出する正規表現を構築.
+
+    Args:
+        personality_names: 指名対象となる人格名のリスト
+
+    Returns:
+        コンパイル済みの正規表現（指名された人格名は name グループに入る）
+
+    """
+    # 日本語環境に対応した@AI検出（全角スペースも考慮）
+    # (?:^|[\s　]) - 文頭または半角・全角空白文字の後
+    # @ai - @aiのリテラル（大文字小文字区別なし）
+    # (?=[\s　]|$) - 半角・全角空白文字または文末の前
+    # (?:[\s　]+(?P<name>...))? - 続けて人格名があれば指名として抽出
+    # (?=...) - 人格名の後は空白・句読点・文末、またはひらがな・漢字の敬称（「さん」「は」「君」等）のみ
+    #           （「@AI タカシマ」を「タカシ」への指名としない）
+    pattern = r"(?:^|[\s　])@ai(?=[\s　]|$)"
+    if personality_names:
+        # 前方一致する名前同士では長い名前を優先する
+        names = "|".join(re.escape(name) for name in sorted(personality_names, key=len, reverse=True))
+        pattern += rf"(?:[\s　]+(?P<name>{names})(?=$|[^\w]|[ぁ-ゖ]|君|様|氏|殿|先輩|先生))?"
+    return re.compile(pattern, re.IGNORECASE)
+
+
 class GeminiAPIClient:
     """Gemini APIクライアント."""
 
@@ -39,14 +98,20 @@ class GeminiAPIClient:
     def __init__(self) -> None:
         """初期化."""
         logger.info("GeminiAPIClient初期化開始")
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            logger.error("GEMINI_API_KEY環境変数が設定されていません")
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-
-        logger.info("GEMINI_API_KEY確認済み")
-        self.client = genai.Client(api_key=self.api_key)  # type: ignore
-        logger.info("Gemini 2.5 Flash Preview 05-20クライアント初期化完了")
+        self.model_backend = os.getenv("AI_MODEL_BACKEND", MODEL_BACKEND_GEMINI).lower()
+        if self.model_backend == MODEL_BACKEND_FAKE:
+            # 負荷試験・ローカル開発用: APIキー不要で固定の応答を返す
+            self.api_key = None
+            self.client = FakeModelClient()
+        else:
+            self.api_key = os.getenv("GEMINI_API_KEY")
+            if not self.api_key:
+                logger.error("GEMINI_API_KEY環境変数が設定されていません")
+                raise ValueError("GEMINI_API_KEY environment variable is required")
+
+            logger.info("GEMINI_API_KEY確認済み")
+            self.client = genai.Client(api_key=self.api_key)  # type: ignore
+            logger.info("Gemini 2.5 Flash Preview 05-20クライアント初期化完了")
         self.personality_manager = get_personality_manager()
 
         # システム人格を作成
@@ -58,6 +123,30 @@ class GeminiAPIClient:
         )
         self._fallback_prompt: str | None = None
         self._load_fallback_prompt()
+        # 人格スナップショットごとにコンパイルしたメンション検出パターン
+        self._mention_pattern_cache: tuple[PersonalitySnapshot, re.Pattern[str]] | None = None
+        self.rate_limiter = self._create_rate_limiter()
+
+    def _create_rate_limiter(self) -> TokenBucketRateLimiter:
+        """環境変数からGemini API呼び出しのレート制限を作成."""
+        requests_per_minute = DEFAULT_GEMINI_REQUESTS_PER_MINUTE
+        env_value = os.getenv("GEMINI_REQUESTS_PER_MINUTE")
+        if env_value:
+            try:
+                requests_per_minute = int(env_value)
+                if requests_per_minute <= 0:
+                    raise ValueError(env_value)
+            except ValueError:
+                logger.warning(
+                    f"Invalid GEMINI_REQUESTS_PER_MINUTE value: {env_value}. "
+                    f"Using default: {DEFAULT_GEMINI_REQUESTS_PER_MINUTE}"
+                )
+                requests_per_minute = DEFAULT_GEMINI_REQUESTS_PER_MINUTE
+
+        logger.info(f"Gemini APIレート制限: {requests_per_minute}件/分, バースト={DEFAULT_GEMINI_RATE_LIMIT_BURST}")
+        return TokenBucketRateLimiter(
+            rate=requests_per_minute / 60, capacity=DEFAULT_GEMINI_RATE_LIMIT_BURST, name="gemini_api"
+        )
 
     def _load_fallback_prompt(self) -> None:
         """フォールバック用システムプロンプトを読み込む."""
@@ -117,6 +206,28 @@ class GeminiAPIClient:
             user_id=self.FALLBACK_AI_ID,
         )
 
+    def _select_personality(
+        self, exclude_user_id: str | None = None, personality_name: str | None = None
+    ) -> AIPersonality:
+        """指名された人格を選択し、指名がない場合はランダムに選択.
+
+        Args:
+            exclude_user_id: 除外するAI人格のuser_id（連続発言防止用）
+            personality_name: 指名された人格名
+
+        Returns:
+            選択された人格
+
+        """
+        if personality_name:
+            personality = self.personality_manager.get_personality_by_name(personality_name)
+            if personality:
+                logger.info(f"指名された人格を選択: {personality.name} (user_id: {personality.user_id})")
+                return personality
+            logger.warning(f"指名された人格が見つからないため、ランダムに選択: {personality_name}")
+
+        return self._select_random_personality(exclude_user_id)
+
     def _format_conversation_history(self, messages: list) -> str:
         """過去の会話履歴をフォーマットする"""
         if not messages:
@@ -157,6 +268,7 @@ class GeminiAPIClient:
         db_session: Session | None = None,
         max_retries: int = 5,
         exclude_user_id: str | None = None,
+        personality_name: str | None = None,
     ) -> tuple[str, AIPersonality]:
         """ユーザーメッセージに対する応答を生成する.
 
@@ -166,6 +278,7 @@ class GeminiAPIClient:
             db_session: データベースセッション
             max_retries: 最大リトライ回数
             exclude_user_id: 除外するAI人格のuser_id（連続発言防止用）
+            personality_name: 指名された人格名（指定時は指名された人格で応答）
 
         Returns:
             tuple[AIの応答テキスト, 選択された人格]
@@ -173,15 +286,16 @@ class GeminiAPIClient:
         """
         logger.info(f"Gemini API応答生成開始: user_message='{user_message[:50]}...' max_retries={max_retries}")
 
-        # ランダムに人格を選択（連続発言防止考慮）
-        personality = self._select_random_personality(exclude_user_id)
+        # 指名された人格、またはランダムに人格を選択（連続発言防止考慮）
+        personality = self._select_personality(exclude_user_id, personality_name)
         logger.info(f"選択された人格: {personality.name}")
 
         # 過去の会話履歴を取得
         conversation_history = ""
         logger.debug(f"デバッグ: channel_id={channel_id}, db_session={db_session is not None}")
         if channel_id and db_session:
-            conversation_history = await self._fetch_conversation_history(channel_id, db_session)
+            with get_tracer().span("db.fetch_history", channel_id=channel_id):
+                conversation_history = await self._fetch_conversation_history(channel_id, db_session)
         else:
             logger.debug(
                 f"デバッグ: 会話履歴取得をスキップ - channel_id={channel_id}, db_session={db_session is not None}"
@@ -199,9 +313,17 @@ class GeminiAPIClient:
         for attempt in range(max_retries):
             try:
                 logger.info(f"Gemini API呼び出し試行 {attempt + 1}/{max_retries}")
+                # レート制限に達している場合は枠が空くまで待機
+                with get_tracer().span("gemini.rate_limit_wait"):
+                    await self.rate_limiter.acquire()
                 # 非同期でGemini APIを呼び出し
                 loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(None, self._sync_generate, enhanced_message, personality)
+                request_start = time.perf_counter()
+                try:
+                    with get_tracer().span("gemini.request", personality=personality.name, attempt=attempt + 1):
+                        response = await loop.run_in_executor(None, self._sync_generate, enhanced_message, personality)
+                finally:
+                    GEMINI_REQUEST_DURATION.observe(time.perf_counter() - request_start, personality=personality.name)
 
                 if hasattr(response, "text") and response.text:  # type: ignore
                     response_text = response.text.strip()  # type: ignore
@@ -209,6 +331,8 @@ class GeminiAPIClient:
                         logger.info(
                             f"Gemini API応答成功: response_length={len(response_text)}, personality={personality.name}"
                         )
+                        # 発言順を記録（least_recent戦略の公平性のため）
+                        self.personality_manager.mark_spoken(personality.user_id)
                         return response_text, personality
 
                 logger.warning("Gemini APIから空の応答を受信")
@@ -282,6 +406,35 @@ class GeminiAPIClient:
         )
         return response
 
+    def _get_mention_pattern(self) -> re.Pattern[str]:
+        """現在の人格セットに対応するメンション検出パターンを取得（人格の再読み込み時のみ再構築）."""
+        snapshot = self.personality_manager.snapshot
+        cached = self._mention_pattern_cache
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+
+        pattern = build_mention_pattern(list(snapshot.personalities.keys()))
+        self._mention_pattern_cache = (snapshot, pattern)
+        return pattern
+
+    def parse_mention(self, message: str) -> MentionResult:
+        """メッセージから@AIメンションと指名された人格名を抽出する.
+
+        Args:
+            message: チェックするメッセージ
+
+        Returns:
+            メンションの解析結果
+
+        """
+        match = self._get_mention_pattern().search(message)
+        if match is None:
+            result = MentionResult(mentioned=False)
+        else:
+            result = MentionResult(mentioned=True, target_personality=match.groupdict().get("name"))
+        logger.debug(f"@AI検出: '{message[:50]}...' -> {result}")
+        return result
+
     def should_respond_to_message(self, message: str) -> bool:
         """メッセージに応答すべきかどうかを判定する.
 
@@ -292,14 +445,7 @@ class GeminiAPIClient:
             応答すべき場合True
 
         """
-        # 日本語環境に対応した@AI検出（全角スペースも考慮）
-        # (?:^|[\s　]) - 文頭または半角・全角空白文字の後
-        # @ai - @aiのリテラル（大文字小文字区別なし）
-        # (?=[\s　]|$) - 半角・全角空白文字または文末の前
-        pattern = r"(?:^|[\s　])@ai(?=[\s　]|$)"
-        result = bool(re.search(pattern, message.lower()))
-        logger.debug(f"@AI検出: '{message[:50]}...' -> {result}")
-        return result
+        return self.parse_mention(message).mentioned
 
 
 # グローバルインスタンス
@@ -1,6 +1,5 @@
 """AI応答処理とメッセージハンドリング"""
 
-import json
 import logging
 import time
 import uuid
@@ -14,7 +13,9 @@ try:
     from .. import crud
     from ..constants.timezone import JST
     from ..schemas import MessageBroadcastData, MessageCreate
-    from ..utils.session_manager import save_message_with_session_management
+    from ..utils.metrics import BROADCAST_DURATION, DB_SAVE_DURATION
+    from ..utils.session_manager import save_message_with_writer
+    from ..utils.tracing import get_tracer
     from ..websocket.manager import manager
     from .gemini_client import GeminiAPIClient, get_gemini_client
     from .personality_manager import AIPersonality
@@ -25,7 +26,9 @@ except ImportError:
     from ai.personality_manager import AIPersonality
     from constants.timezone import JST
     from schemas import MessageBroadcastData, MessageCreate
-    from utils.session_manager import save_message_with_session_management
+    from utils.metrics import BROADCAST_DURATION, DB_SAVE_DURATION
+    from utils.session_manager import save_message_with_writer
+    from utils.tracing import get_tracer
     from websocket.manager import manager
 
 logger = logging.getLogger(__name__)
@@ -85,15 +88,19 @@ def _extract_message_attributes(ai_message_create: MessageCreate) -> tuple[str,
 
 
 async def _generate_ai_response(
-    user_message: str, channel_id: str, db_session: Session | None = None
+    user_message: str,
+    channel_id: str,
+    db_session: Session | None = None,
+    target_personality: str | None = None,
 ) -> tuple[MessageCreate, float]:
     """AI応答を生成し、タイミング情報を返す"""
     generation_start = time.time()
     gemini_client = get_gemini_client()
 
     # 連続発言防止：最新メッセージがAIの場合は、そのuser_idを除外対象とする
+    # 人格が指名されている場合は指名を優先するため判定不要
     exclude_user_id = None
-    if db_session:
+    if db_session and not target_personality:
         try:
             recent_messages = crud.get_recent_channel_messages(db_session, channel_id, limit=1)
             if recent_messages:
@@ -114,9 +121,17 @@ async def _generate_ai_response(
         except Exception as e:
             logger.warning(f"連続発言防止チェック時のエラー: {e!s}")
 
-    ai_response, personality = await gemini_client.generate_response(
-        user_message, channel_id=channel_id, db_session=db_session, max_retries=3, exclude_user_id=exclude_user_id
-    )
+    with get_tracer().span("ai.generate") as span:
+        ai_response, personality = await gemini_client.generate_response(
+            user_message,
+            channel_id=channel_id,
+            db_session=db_session,
+            max_retries=3,
+            exclude_user_id=exclude_user_id,
+            personality_name=target_personality,
+        )
+        if span is not None:
+            span.set_attribute("personality", personality.name)
     generation_time = time.time() - generation_start
     logger.info(
         f"AI応答生成完了: generation_time={generation_time:.2f}s, response_length={len(ai_response)}, selected_personality={personality.name} (user_id={personality.user_id}), excluded_user_id={exclude_user_id}"
@@ -132,11 +147,14 @@ def _is_fallback_message(content: str) -> bool:
 
 
 async def generate_and_save_ai_response(
-    user_message: str, channel_id: str, db_session: Session | None = None
+    user_message: str,
+    channel_id: str,
+    db_session: Session | None = None,
+    target_personality: str | None = None,
 ) -> MessageBroadcastData:
     """AI応答を生成してデータベースに保存"""
     # AI応答を生成
-    ai_message_create, _ = await _generate_ai_response(user_message, channel_id, db_session)
+    ai_message_create, _ = await _generate_ai_response(user_message, channel_id, db_session, target_personality)
 
     # セッションから切り離される前に必要な情報を取得
     message_id, user_id, user_name, user_type, content, timestamp = _extract_message_attributes(ai_message_create)
@@ -147,12 +165,14 @@ async def generate_and_save_ai_response(
     else:
         # データベースに保存
         db_start = time.time()
-        save_message_with_session_management(
-            lambda session: crud.create_message(session, ai_message_create),
-            db_session,
-            auto_commit=(db_session is None),
-        )
+        with get_tracer().span("db.save_message", source="ai", message_id=message_id):
+            await save_message_with_writer(
+                lambda session: crud.create_message(session, ai_message_create),
+                db_session,
+                auto_commit=(db_session is None),
+            )
         db_time = time.time() - db_start
+        DB_SAVE_DURATION.observe(db_time, source="ai")
         logger.info(f"AI応答DB保存完了: db_time={db_time:.2f}s, message_id={message_id}")
 
     return MessageBroadcastData(
@@ -170,13 +190,15 @@ async def broadcast_ai_response(message_data: MessageBroadcastData) -> None:
     """AI応答をブロードキャスト"""
     broadcast_message = create_broadcast_message(message_data)
     broadcast_start = time.time()
-    await manager.broadcast(json.dumps(broadcast_message))
+    with get_tracer().span("websocket.broadcast", source="ai", connections=len(manager.active_connections)):
+        await manager.broadcast_message(broadcast_message)
     broadcast_time = time.time() - broadcast_start
+    BROADCAST_DURATION.observe(broadcast_time, source="ai")
     logger.info(
         f"AI応答ブロードキャスト完了: broadcast_time={broadcast_time:.2f}s, message_id={message_data.message_id}"
     )
 
-    # Discord webhook送信
+    # Discord webhook送信（配信キューに追加するのみで送信完了は待たない）
     try:
         try:
             # パッケージとして実行される場合
@@ -185,9 +207,8 @@ async def broadcast_ai_response(message_data: MessageBroadcastData) -> None:
             # 直接実行される場合
             from utils.discord_webhook import discord_sender
 
-        success = await discord_sender.send_ai_message(message_data.user_name, message_data.content)
-        if success:
-            logger.debug(f"Discord webhook送信成功: message_id={message_data.message_id}")
+        if discord_sender.enqueue_ai_message(message_data.user_name, message_data.content):
+            logger.debug(f"Discord webhook送信キューに追加: message_id={message_data.message_id}")
     except Exception as e:
         logger.warning(f"Discord webhook送信エラー: {e!s}")
 
@@ -214,7 +235,7 @@ async def handle_ai_error(channel_id: str, error: Exception, error_time: float)
         "data": fallback_message_data,
     }
 
-    await manager.broadcast(json.dumps(error_broadcast_message))
+    await manager.broadcast_message(error_broadcast_message)
 
 
 async def handle_ai_response(message_data: dict[str, Any] | None, db_session: Session | None = None) -> None:
@@ -228,23 +249,32 @@ async def handle_ai_response(message_data: dict[str, Any] | None, db_session: Se
     channel_id = message_data.get("channel_id", "")
     logger.info(f"AI応答処理開始: channel_id={channel_id}, message='{user_message[:50]}...'")
 
-    # @AI が含まれているかチェック（大文字小文字区別なし）
+    # @AI が含まれているか、人格が指名されているかチェック（大文字小文字区別なし）
     gemini_client = get_gemini_client()
-    if not gemini_client.should_respond_to_message(user_message):
+    mention = gemini_client.parse_mention(user_message)
+    if not mention.mentioned:
         logger.debug("@AI検出されず、AI応答処理をスキップ")
         return
 
-    logger.info("@AI検出、AI応答生成を開始")
-    try:
-        # AI応答を生成・保存
-        ai_message_data = await generate_and_save_ai_response(user_message, channel_id, db_session)
+    logger.info(f"@AI検出、AI応答生成を開始: target_personality={mention.target_personality}")
+    with get_tracer().span("ai.handle_response", channel_id=channel_id) as span:
+        if span is not None and mention.target_personality:
+            span.set_attribute("target_personality", mention.target_personality)
+        try:
+            # AI応答を生成・保存
+            ai_message_data = await generate_and_save_ai_response(
+                user_message, channel_id, db_session, mention.target_personality
+            )
 
-        # AI応答をブロードキャスト
-        await broadcast_ai_response(ai_message_data)
+            # AI応答をブロードキャスト
+            await broadcast_ai_response(ai_message_data)
 
-        total_time = time.time() - start_time
-        logger.info(f"AI応答処理完了: total_time={total_time:.2f}s, message_id={ai_message_data.message_id}")
+            total_time = time.time() - start_time
+            logger.info(f"AI応答処理完了: total_time={total_time:.2f}s, message_id={ai_message_data.message_id}")
 
-    except Exception as e:
-        error_time = time.time() - start_time
-        await handle_ai_error(channel_id, e, error_time)
+        except Exception as e:
+            error_time = time.time() - start_time
+            if span is not None:
+                span.status = "error"
+                span.error = f"{type(e).__name__}: {e!s}"
+            await handle_ai_error(channel_id, e, error_time)
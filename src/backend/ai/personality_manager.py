@@ -1,10 +1,14 @@
 """AI人格管理モジュール."""
 
 import logging
+import os
 import random
 import threading
-from dataclasses import dataclass
+from collections import OrderedDict
+from collections.abc import Collection, Mapping, Sequence
+from dataclasses import dataclass, field
 from pathlib import Path
+from types import MappingProxyType
 
 logger = logging.getLogger(__name__)
 
@@ -17,22 +21,194 @@ class AIPersonality:
     name: str
     prompt_content: str
     user_id: str
+    weight: float = 1.0
+
+
+class SelectionStrategy:
+    """人格選択戦略の定数クラス."""
+
+    # 重み付きランダム選択（front-matterのweightに比例）
+    WEIGHTED = "weighted"
+    # 最も長く発言していない人格を優先
+    LEAST_RECENT = "least_recent"
+
+
+SUPPORTED_SELECTION_STRATEGIES = {
+    SelectionStrategy.WEIGHTED,
+    SelectionStrategy.LEAST_RECENT,
+}
+
+# 除外対象に当たった場合の再抽選回数の上限（超えた場合は線形探索にフォールバック）
+MAX_REJECTION_ATTEMPTS = 32
+
+
+class AliasSampler:
+    """Walker/Voseのエイリアス法による重み付きサンプラー.
+
+    構築時にO(n)でテーブルを作成し、以降の抽選は人格数に依存せずO(1)で行う。
+    """
+
+    __slots__ = ("_alias", "_probability", "size")
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        """初期化.
+
+        Args:
+            weights: 各要素の重み（正の値）
+
+        """
+        self.size = len(weights)
+        self._probability = [0.0] * self.size
+        self._alias = [0] * self.size
+        if self.size == 0:
+            return
+
+        total = sum(weights)
+        scaled = [weight * self.size / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._probability[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # 浮動小数点誤差で残った要素は確率1とする
+        for i in large + small:
+            self._probability[i] = 1.0
+
+    def sample(self) -> int:
+        """重みに比例したインデックスを1つ抽選."""
+        i = int(random.random() * self.size)
+        return i if random.random() < self._probability[i] else self._alias[i]
+
+
+# ファイルの変更検知に使用するシグネチャ（mtime_ns, size）
+FileSignature = tuple[int, int]
+
+COMMON_PROMPT_FILENAME = "common_prompt.md"
+
+
+@dataclass(frozen=True)
+class PersonalitySnapshot:
+    """人格セットの不変スナップショット.
+
+    再読み込み時は新しいスナップショットを構築してから参照を差し替えるため、
+    読み取り側は常に完全な人格セットを参照できる。
+    """
+
+    personalities: Mapping[str, AIPersonality] = field(default_factory=lambda: MappingProxyType({}))
+    file_signatures: Mapping[str, FileSignature] = field(default_factory=lambda: MappingProxyType({}))
+    file_personalities: Mapping[str, AIPersonality] = field(default_factory=lambda: MappingProxyType({}))
+    common_prompt_signature: FileSignature | None = None
+    common_prompt: str = ""
+    # 抽選用の事前計算済みインデックス
+    ordered: tuple[AIPersonality, ...] = ()
+    index_by_user_id: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))
+    sampler: AliasSampler = field(default_factory=lambda: AliasSampler(()))
+
+
+def _file_signature(path: Path) -> FileSignature | None:
+    """ファイルの変更検知用シグネチャを取得（存在しない場合はNone）."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _parse_front_matter(content: str) -> tuple[dict[str, str], str]:
+    """人格ファイル先頭のfront-matter（--- で囲まれた key: value 行）を解析.
+
+    例:
+        ---
+        weight: 2
+        ---
+        # タカシ ...
+
+    Returns:
+        tuple[front-matterの辞書, front-matterを除いた本文]
+
+    """
+    lines = content.splitlines(keepends=True)
+    if not lines or lines[0].strip() != "---":
+        return {}, content
+
+    end = next((i for i, line in enumerate(lines[1:], start=1) if line.strip() == "---"), None)
+    if end is None:
+        # 閉じ区切りがない場合はfront-matterとして扱わない
+        return {}, content
+
+    metadata: dict[str, str] = {}
+    for line in lines[1:end]:
+        if ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        metadata[key.strip().lower()] = value.strip()
+    return metadata, "".join(lines[end + 1 :])
+
+
+def _parse_weight(value: str | None, file_name: str) -> float:
+    """front-matterのweightを解析（不正な値はデフォルト1.0）."""
+    if value is None:
+        return 1.0
+    try:
+        weight = float(value)
+    except ValueError:
+        logger.warning(f"人格ファイルのweightが数値ではありません: {file_name} (weight: {value})")
+        return 1.0
+    if weight <= 0:
+        logger.warning(f"人格ファイルのweightは正の値である必要があります: {file_name} (weight: {value})")
+        return 1.0
+    return weight
+
+
+def _load_selection_strategy() -> str:
+    """環境変数から人格選択戦略を読み込む."""
+    strategy = os.getenv("AI_PERSONALITY_SELECTION", SelectionStrategy.WEIGHTED).lower()
+    if strategy not in SUPPORTED_SELECTION_STRATEGIES:
+        logger.error(f"無効な人格選択戦略: {strategy}, デフォルト値{SelectionStrategy.WEIGHTED}を使用")
+        return SelectionStrategy.WEIGHTED
+    return strategy
 
 
 class PersonalityManager:
     """AI人格管理クラス."""
 
-    def __init__(self, personalities_dir: Path | None = None) -> None:
+    def __init__(self, personalities_dir: Path | None = None, selection_strategy: str | None = None) -> None:
         """初期化.
 
         Args:
             personalities_dir: 人格ファイルが格納されているディレクトリのパス
+            selection_strategy: 人格選択戦略（省略時は環境変数 AI_PERSONALITY_SELECTION）
 
         """
         self.personalities_dir = personalities_dir or self._find_personalities_dir()
-        self.personalities: dict[str, AIPersonality] = {}
+        self.selection_strategy = selection_strategy or _load_selection_strategy()
+        self._snapshot = PersonalitySnapshot()
+        # 再読み込みの同時実行を防ぐ（読み取り側はロック不要）
+        self._reload_lock = threading.Lock()
+        # 発言順（先頭ほど長く発言していない）。user_idをキーとするLRU
+        self._speak_order: OrderedDict[str, None] = OrderedDict()
+        self._speak_order_lock = threading.Lock()
         self._load_personalities()
 
+    @property
+    def personalities(self) -> Mapping[str, AIPersonality]:
+        """現在の人格セット（読み取り専用）."""
+        return self._snapshot.personalities
+
+    @property
+    def snapshot(self) -> PersonalitySnapshot:
+        """現在の人格スナップショット."""
+        return self._snapshot
+
     def _find_personalities_dir(self) -> Path:
         """人格ディレクトリを検索."""
         current = Path(__file__).parent
@@ -70,7 +246,7 @@ class PersonalityManager:
 
     def _load_common_prompt(self) -> str:
         """共通プロンプトを読み込み."""
-        common_prompt_path = self.personalities_dir / "common_prompt.md"
+        common_prompt_path = self.personalities_dir / COMMON_PROMPT_FILENAME
         if not common_prompt_path.exists():
             logger.warning(f"共通プロンプトファイルが見つかりません: {common_prompt_path}")
             return ""
@@ -92,113 +268,245 @@ class PersonalityManager:
         # フォーマット: 基本ルール + 人格プロンプト
         return f"{common_prompt}\n\n### 人格\n{personality_content}"
 
-    def _load_personalities(self) -> None:
-        """人格ファイルを読み込み."""
+    def _load_personality_file(self, file_path: Path, common_prompt: str) -> AIPersonality | None:
+        """人格ファイルを1件読み込む（読み込めない場合はNone）."""
+        try:
+            # ファイル名から名前を抽出
+            name = self._extract_name_from_filename(file_path.name)
+            user_id = self._generate_user_id_from_filename(file_path.name)
+
+            # ファイル内容を読み込み
+            with file_path.open(encoding="utf-8") as f:
+                metadata, personality_content = _parse_front_matter(f.read())
+
+            # 空ファイルチェック
+            if not personality_content.strip():
+                logger.warning(f"空の人格ファイル: {file_path.name}")
+                return None
+
+            # 内容の最小長チェック（意味のあるプロンプトかどうか）
+            if len(personality_content.strip()) < 10:
+                logger.warning(
+                    f"人格ファイルの内容が短すぎます: {file_path.name} (長さ: {len(personality_content.strip())})"
+                )
+                return None
+
+            # 共通プロンプトと人格プロンプトを結合
+            full_prompt = self._build_full_prompt(common_prompt, personality_content)
+
+            weight = _parse_weight(metadata.get("weight"), file_path.name)
+
+            personality = AIPersonality(
+                file_name=file_path.name, name=name, prompt_content=full_prompt, user_id=user_id, weight=weight
+            )
+            logger.info(f"人格読み込み成功: {name} (file: {file_path.name}, user_id: {user_id}, weight: {weight})")
+            return personality
+
+        except UnicodeDecodeError as e:
+            logger.error(f"人格ファイルの文字エンコーディングエラー: {file_path.name} - {e!s}")
+        except FileNotFoundError as e:
+            logger.error(f"人格ファイルが見つかりません: {file_path.name} - {e!s}")
+        except PermissionError as e:
+            logger.error(f"人格ファイルの読み込み権限がありません: {file_path.name} - {e!s}")
+        except OSError as e:
+            logger.error(f"人格ファイルの読み込み中にOSエラー: {file_path.name} - {e!s}")
+
+        except Exception as e:
+            logger.error(f"人格ファイル読み込みエラー: {file_path.name} - {e!s}")
+        return None
+
+    def _build_snapshot(self, previous: PersonalitySnapshot) -> PersonalitySnapshot:
+        """人格ディレクトリから新しいスナップショットを構築.
+
+        前回のスナップショットからシグネチャ（mtime・サイズ）が変わっていないファイルは
+        再利用し、変更されたファイルのみを読み込み直す。共通プロンプトが変更された場合は
+        全人格のプロンプトが変わるため全件を読み込み直す。
+        """
         if not self.personalities_dir.exists():
             logger.error(f"人格ディレクトリが存在しません: {self.personalities_dir}")
-            return
+            return PersonalitySnapshot()
 
-        # 共通プロンプトを読み込み
-        common_prompt = self._load_common_prompt()
+        # 共通プロンプトを読み込み（変更がなければ前回の内容を再利用）
+        common_signature = _file_signature(self.personalities_dir / COMMON_PROMPT_FILENAME)
+        common_changed = common_signature != previous.common_prompt_signature or not previous.file_signatures
+        common_prompt = self._load_common_prompt() if common_changed else previous.common_prompt
 
-        md_files = list(self.personalities_dir.glob("*.md"))
         # 共通プロンプトファイルを除外
-        md_files = [f for f in md_files if f.name != "common_prompt.md"]
+        md_files = sorted(f for f in self.personalities_dir.glob("*.md") if f.name != COMMON_PROMPT_FILENAME)
         logger.info(f"人格ファイル検出: {len(md_files)}件")
 
-        for file_path in md_files:
-            try:
-                # ファイル名から名前を抽出
-                name = self._extract_name_from_filename(file_path.name)
-                user_id = self._generate_user_id_from_filename(file_path.name)
-
-                # ファイル内容を読み込み
-                with file_path.open(encoding="utf-8") as f:
-                    personality_content = f.read()
-
-                # 空ファイルチェック
-                if not personality_content.strip():
-                    logger.warning(f"空の人格ファイル: {file_path.name}")
-                    continue
-
-                # 内容の最小長チェック（意味のあるプロンプトかどうか）
-                if len(personality_content.strip()) < 10:
-                    logger.warning(
-                        f"人格ファイルの内容が短すぎます: {file_path.name} (長さ: {len(personality_content.strip())})"
-                    )
-                    continue
-
-                # 共通プロンプトと人格プロンプトを結合
-                full_prompt = self._build_full_prompt(common_prompt, personality_content)
+        file_signatures: dict[str, FileSignature] = {}
+        file_personalities: dict[str, AIPersonality] = {}
+        personalities: dict[str, AIPersonality] = {}
+        reloaded = 0
 
-                personality = AIPersonality(
-                    file_name=file_path.name, name=name, prompt_content=full_prompt, user_id=user_id
-                )
-
-                self.personalities[name] = personality
-                logger.info(f"人格読み込み成功: {name} (file: {file_path.name}, user_id: {user_id})")
+        for file_path in md_files:
+            signature = _file_signature(file_path)
+            if signature is None:
+                continue
+            file_signatures[file_path.name] = signature
+
+            personality = None
+            if not common_changed and previous.file_signatures.get(file_path.name) == signature:
+                personality = previous.file_personalities.get(file_path.name)
+            if personality is None:
+                personality = self._load_personality_file(file_path, common_prompt)
+                reloaded += 1
+            if personality is None:
+                continue
+
+            file_personalities[file_path.name] = personality
+            personalities[personality.name] = personality
+
+        ordered = tuple(personalities.values())
+        logger.debug(f"人格スナップショット構築: 再読み込み={reloaded}件, 合計={len(personalities)}件")
+        return PersonalitySnapshot(
+            personalities=MappingProxyType(personalities),
+            file_signatures=MappingProxyType(file_signatures),
+            file_personalities=MappingProxyType(file_personalities),
+            common_prompt_signature=common_signature,
+            common_prompt=common_prompt,
+            ordered=ordered,
+            index_by_user_id=MappingProxyType({p.user_id: i for i, p in enumerate(ordered)}),
+            sampler=AliasSampler([p.weight for p in ordered]),
+        )
 
-            except UnicodeDecodeError as e:
-                logger.error(f"人格ファイルの文字エンコーディングエラー: {file_path.name} - {e!s}")
-            except FileNotFoundError as e:
-                logger.error(f"人格ファイルが見つかりません: {file_path.name} - {e!s}")
-            except PermissionError as e:
-                logger.error(f"人格ファイルの読み込み権限がありません: {file_path.name} - {e!s}")
-            except OSError as e:
-                logger.error(f"人格ファイルの読み込み中にOSエラー: {file_path.name} - {e!s}")
+    def _load_personalities(self) -> None:
+        """人格ファイルを読み込み、スナップショットを差し替える."""
+        with self._reload_lock:
+            self._snapshot = self._build_snapshot(self._snapshot)
+            self._sync_speak_order(self._snapshot)
 
-            except Exception as e:
-                logger.error(f"人格ファイル読み込みエラー: {file_path.name} - {e!s}")
+    def _sync_speak_order(self, snapshot: PersonalitySnapshot) -> None:
+        """発言順をスナップショットの人格セットに合わせる.
 
-    def get_random_personality(self, exclude_user_id: str | None = None) -> AIPersonality | None:
-        """ランダムに人格を選択.
+        新しく追加された人格は未発言として先頭に置き、削除された人格は取り除く。
+        """
+        with self._speak_order_lock:
+            for user_id in list(self._speak_order):
+                if user_id not in snapshot.index_by_user_id:
+                    del self._speak_order[user_id]
+            for personality in reversed(snapshot.ordered):
+                if personality.user_id not in self._speak_order:
+                    self._speak_order[personality.user_id] = None
+                    self._speak_order.move_to_end(personality.user_id, last=False)
+
+    def mark_spoken(self, user_id: str) -> None:
+        """人格が発言したことを記録（least_recent戦略で使用）."""
+        with self._speak_order_lock:
+            if user_id in self._speak_order:
+                self._speak_order.move_to_end(user_id)
+
+    def has_changes(self) -> bool:
+        """前回の読み込み以降に人格ファイルが変更されたかどうかを判定."""
+        snapshot = self._snapshot
+        if _file_signature(self.personalities_dir / COMMON_PROMPT_FILENAME) != snapshot.common_prompt_signature:
+            return True
+
+        current: dict[str, FileSignature] = {}
+        for file_path in self.personalities_dir.glob("*.md"):
+            if file_path.name == COMMON_PROMPT_FILENAME:
+                continue
+            signature = _file_signature(file_path)
+            if signature is not None:
+                current[file_path.name] = signature
+        return current != dict(snapshot.file_signatures)
+
+    def get_random_personality(
+        self,
+        exclude_user_id: str | None = None,
+        exclude_user_ids: Collection[str] = (),
+        strategy: str | None = None,
+    ) -> AIPersonality | None:
+        """人格を選択.
 
         Args:
             exclude_user_id: 除外するAI人格のuser_id（連続発言防止用）
+            exclude_user_ids: 追加で除外するAI人格のuser_idの集合
+            strategy: 選択戦略（省略時はマネージャーの設定値）
 
         Returns:
             選択された人格、または None
 
         """
-        if not self.personalities:
+        # 選択中に再読み込みが行われても一貫した人格セットを参照する
+        snapshot = self._snapshot
+        if not snapshot.ordered:
             logger.warning("利用可能な人格がありません")
             return None
 
-        # 除外対象がある場合はフィルタリング
-        available_personalities = self.personalities
-        if exclude_user_id:
-            available_personalities = {
-                name: personality
-                for name, personality in self.personalities.items()
-                if personality.user_id != exclude_user_id
-            }
+        strategy = strategy or self.selection_strategy
+        if strategy == SelectionStrategy.LEAST_RECENT:
+            personality = self._select_least_recent(snapshot, exclude_user_id, exclude_user_ids)
+        else:
+            personality = self._select_weighted(snapshot, exclude_user_id, exclude_user_ids)
 
+        if personality is None:
             # 除外後に選択肢がない場合は全人格から選択（フォールバック）
-            if not available_personalities:
-                logger.warning(f"除外後に利用可能な人格がないため、全人格から選択: exclude_user_id={exclude_user_id}")
-                available_personalities = self.personalities
-
-        selected_name = random.choice(list(available_personalities.keys()))
-        personality = available_personalities[selected_name]
+            logger.warning(f"除外後に利用可能な人格がないため、全人格から選択: exclude_user_id={exclude_user_id}")
+            personality = snapshot.ordered[snapshot.sampler.sample()]
 
-        if exclude_user_id:
-            logger.debug(f"連続発言防止考慮でランダム人格選択: {personality.name} (除外: {exclude_user_id})")
+        if exclude_user_id or exclude_user_ids:
+            logger.debug(f"連続発言防止考慮で人格選択: {personality.name} (除外: {exclude_user_id})")
         else:
-            logger.debug(f"ランダム人格選択: {personality.name}")
+            logger.debug(f"人格選択: {personality.name} (strategy: {strategy})")
 
         return personality
 
+    @staticmethod
+    def _is_excluded(user_id: str, exclude_user_id: str | None, exclude_user_ids: Collection[str]) -> bool:
+        """user_idが除外対象かどうかを判定."""
+        return user_id == exclude_user_id or user_id in exclude_user_ids
+
+    def _select_weighted(
+        self, snapshot: PersonalitySnapshot, exclude_user_id: str | None, exclude_user_ids: Collection[str]
+    ) -> AIPersonality | None:
+        """エイリアステーブルで重み付き抽選し、除外対象は再抽選する."""
+        for _ in range(MAX_REJECTION_ATTEMPTS):
+            personality = snapshot.ordered[snapshot.sampler.sample()]
+            if not self._is_excluded(personality.user_id, exclude_user_id, exclude_user_ids):
+                return personality
+
+        # 除外対象の重みが大半を占める場合のみ到達する（候補を絞って抽選）
+        candidates = [
+            p for p in snapshot.ordered if not self._is_excluded(p.user_id, exclude_user_id, exclude_user_ids)
+        ]
+        if not candidates:
+            return None
+        return random.choices(candidates, weights=[p.weight for p in candidates])[0]
+
+    def _select_least_recent(
+        self, snapshot: PersonalitySnapshot, exclude_user_id: str | None, exclude_user_ids: Collection[str]
+    ) -> AIPersonality | None:
+        """最も長く発言していない人格を選択."""
+        with self._speak_order_lock:
+            for user_id in self._speak_order:
+                index = snapshot.index_by_user_id.get(user_id)
+                if index is None or self._is_excluded(user_id, exclude_user_id, exclude_user_ids):
+                    continue
+                return snapshot.ordered[index]
+        return None
+
     def get_personality_by_name(self, name: str) -> AIPersonality | None:
         """名前で人格を取得."""
         return self.personalities.get(name)
 
+    def get_personality_by_user_id(self, user_id: str) -> AIPersonality | None:
+        """user_idで人格を取得."""
+        snapshot = self._snapshot
+        index = snapshot.index_by_user_id.get(user_id)
+        return snapshot.ordered[index] if index is not None else None
+
     def list_available_personalities(self) -> list[str]:
         """利用可能な人格名のリストを取得."""
         return list(self.personalities.keys())
 
     def reload_personalities(self) -> None:
-        """人格を再読み込み."""
-        self.personalities.clear()
+        """人格を再読み込み.
+
+        変更されたファイルのみを読み込み直し、新しいスナップショットに差し替える。
+        差し替えまでは既存の人格セットが参照され続ける。
+        """
         self._load_personalities()
 
 
@@ -0,0 +1,167 @@
+"""AI人格ファイル監視モジュール.
+
+prompts/people 配下の変更を検知し、人格を再起動なしで再読み込みする。
+watchfiles（Linuxではinotify）が利用可能な場合はファイルイベントで、
+利用できない場合はmtimeのポーリングで変更を検知する。
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+try:
+    # パッケージとして実行される場合
+    from ..constants.ai_config import DEFAULT_PERSONALITY_POLL_INTERVAL_SECONDS
+    from .personality_manager import PersonalityManager, get_personality_manager
+except ImportError:
+    # 直接実行される場合
+    from ai.personality_manager import PersonalityManager, get_personality_manager
+    from constants.ai_config import DEFAULT_PERSONALITY_POLL_INTERVAL_SECONDS
+
+try:
+    from watchfiles import awatch
+except ImportError:  # pragma: no cover - watchfilesはuvicorn[standard]経由でインストールされる
+    awatch = None
+
+logger = logging.getLogger(__name__)
+
+
+def is_hot_reload_enabled() -> bool:
+    """人格のホットリロードが有効かどうかを判定."""
+    return os.getenv("AI_PERSONALITY_HOT_RELOAD", "true").lower() in ("true", "1", "yes", "on")
+
+
+class PersonalityWatcher:
+    """人格ファイルの変更を監視し、再読み込みを行うクラス."""
+
+    def __init__(
+        self,
+        personality_manager: PersonalityManager | None = None,
+        poll_interval: float = DEFAULT_PERSONALITY_POLL_INTERVAL_SECONDS,
+        use_file_events: bool = True,
+    ) -> None:
+        """初期化.
+
+        Args:
+            personality_manager: 監視対象の人格マネージャー（省略時はシングルトン）
+            poll_interval: mtimeポーリングの間隔（秒）
+            use_file_events: watchfilesによるファイルイベント監視を使用するかどうか
+
+        """
+        self.personality_manager = personality_manager or get_personality_manager()
+        self.poll_interval = poll_interval
+        self.use_file_events = use_file_events and awatch is not None
+        self._task: asyncio.Task | None = None
+        self._stop_event = asyncio.Event()
+
+    def is_running(self) -> bool:
+        """監視が動作中かどうかを確認."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """監視を開始."""
+        if self.is_running():
+            logger.warning("人格ファイル監視は既に動作中です")
+            return
+
+        mode = "ファイルイベント" if self.use_file_events else f"ポーリング（{self.poll_interval}秒間隔）"
+        logger.info(f"人格ファイル監視を開始: dir={self.personality_manager.personalities_dir}, mode={mode}")
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self) -> None:
+        """監視を停止."""
+        if not self.is_running():
+            logger.debug("人格ファイル監視は動作していません")
+            return
+
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                logger.info("人格ファイル監視が正常に停止されました")
+            except Exception as e:
+                logger.error(f"人格ファイル監視停止時にエラー: {e!s}")
+            finally:
+                self._task = None
+
+    async def reload(self) -> None:
+        """イベントループをブロックしないよう、別スレッドで人格を再読み込み."""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.personality_manager.reload_personalities)
+            logger.info(f"人格を再読み込みしました: {self.personality_manager.list_available_personalities()}")
+        except Exception as e:
+            logger.error(f"人格の再読み込みに失敗しました: {e!s}")
+
+    async def _watch_loop(self) -> None:
+        """監視のメインループ."""
+        if self.use_file_events:
+            try:
+                await self._watch_file_events()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"ファイルイベント監視に失敗したため、ポーリングに切り替えます: {e!s}")
+
+        await self._watch_polling()
+
+    async def _watch_file_events(self) -> None:
+        """watchfilesのファイルイベントで変更を検知."""
+        assert awatch is not None
+        async for changes in awatch(self.personality_manager.personalities_dir, stop_event=self._stop_event):
+            changed_files = sorted({Path(path).name for _, path in changes})
+            logger.info(f"人格ファイルの変更を検知: {changed_files}")
+            await self.reload()
+
+    async def _watch_polling(self) -> None:
+        """mtimeのポーリングで変更を検知."""
+        loop = asyncio.get_running_loop()
+        while not self._stop_event.is_set():
+            await asyncio.sleep(self.poll_interval)
+            try:
+                changed = await loop.run_in_executor(None, self.personality_manager.has_changes)
+            except Exception as e:
+                logger.error(f"人格ファイルの変更チェックでエラー: {e!s}")
+                continue
+
+            if changed:
+                logger.info("人格ファイルの変更を検知（ポーリング）")
+                await self.reload()
+
+
+# グローバル監視インスタンス
+_personality_watcher: PersonalityWatcher | None = None
+
+
+def get_personality_watcher() -> PersonalityWatcher:
+    """PersonalityWatcherのシングルトンインスタンスを取得."""
+    global _personality_watcher
+    if _personality_watcher is None:
+        _personality_watcher = PersonalityWatcher()
+    return _personality_watcher
+
+
+# 便利関数
+async def start_personality_watcher() -> None:
+    """人格ファイル監視を開始（無効化されている場合は何もしない）."""
+    if not is_hot_reload_enabled():
+        logger.info("人格のホットリロードが無効のため、ファイル監視を開始しません")
+        return
+
+    try:
+        watcher = get_personality_watcher()
+    except FileNotFoundError as e:
+        logger.warning(f"人格ディレクトリが見つからないため、ファイル監視を開始しません: {e!s}")
+        return
+    await watcher.start()
+
+
+async def stop_personality_watcher() -> None:
+    """人格ファイル監視を停止."""
+    if _personality_watcher is not None:
+        await _personality_watcher.stop()
@@ -0,0 +1,27 @@
+"""Add composite index on messages (channel_id, created_at)
+
+Revision ID: 3f1c2a7d8e94
+Revises: 9cd82373621b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a7d8e94"
+down_revision: str | Sequence[str] | None = "9cd82373621b"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_messages_channel_id_created_at", "messages", ["channel_id", "created_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_messages_channel_id_created_at", table_name="messages")
@@ -0,0 +1,63 @@
+"""Add full-text search index on message content
+
+SQLite: FTS5 external-content table with the trigram tokenizer, kept in sync by triggers.
+PostgreSQL: pg_trgm GIN index on messages.content for ILIKE substring search.
+
+Revision ID: 7b4e9d2c1a35
+Revises: 3f1c2a7d8e94
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7b4e9d2c1a35"
+down_revision: str | Sequence[str] | None = "3f1c2a7d8e94"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE messages_fts USING fts5("
+            "content, content='messages', content_rowid='rowid', tokenize='trigram')"
+        )
+        op.execute(
+            """CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+            END"""
+        )
+        op.execute(
+            """CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END"""
+        )
+        op.execute(
+            """CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+                INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+            END"""
+        )
+        # 既存のメッセージをインデックスに登録
+        op.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_messages_content_trgm ON messages USING gin (content gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS messages_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS messages_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS messages_fts_insert")
+        op.execute("DROP TABLE IF EXISTS messages_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_messages_content_trgm")
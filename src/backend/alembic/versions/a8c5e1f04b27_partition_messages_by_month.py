@@ -0,0 +1,149 @@
+"""Partition messages by month (PostgreSQL)
+
+PostgreSQL: messages becomes a table range-partitioned by created_at with one partition per month
+(plus a default partition), so old months can be archived and dropped without touching the hot partitions.
+The primary key becomes (id, created_at) because a partitioned table's unique constraints must include
+the partition key; duplicate ids are skipped by a BEFORE INSERT trigger instead, which claims each id in the
+small unpartitioned message_ids table (id PRIMARY KEY) with ON CONFLICT DO NOTHING.
+SQLite: no-op.
+
+Revision ID: a8c5e1f04b27
+Revises: 7b4e9d2c1a35
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a8c5e1f04b27"
+down_revision: str | Sequence[str] | None = "7b4e9d2c1a35"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# 移行時に作成しておく将来の月数（以降はアーカイブ処理が作成する）
+MONTHS_AHEAD = 3
+
+MESSAGE_COLUMNS = "id, channel_id, user_id, user_name, user_type, content, timestamp, is_own_message, created_at"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # 既存のテーブルを退避（インデックス名・制約名が新しいテーブルと衝突しないようにする）
+    op.execute("ALTER TABLE messages RENAME TO messages_unpartitioned")
+    op.execute("ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_messages_channel_id")
+    op.execute("DROP INDEX IF EXISTS ix_messages_channel_id_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_messages_content_trgm")
+
+    op.execute(
+        """CREATE TABLE messages (
+            id VARCHAR NOT NULL,
+            channel_id VARCHAR NOT NULL,
+            user_id VARCHAR NOT NULL,
+            user_name VARCHAR NOT NULL,
+            user_type VARCHAR NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            is_own_message BOOLEAN NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT messages_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)"""
+    )
+    # 月別のパーティションがない日時（作成漏れ）の受け皿
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+    # 既存の最も古い月から、数か月先までの月別パーティションを作成
+    op.execute(
+        f"""DO $$
+        DECLARE
+            month_start date;
+            last_month date := date_trunc('month', now()) + interval '{MONTHS_AHEAD} months';
+        BEGIN
+            SELECT coalesce(date_trunc('month', min(created_at)), date_trunc('month', now()))
+                INTO month_start FROM messages_unpartitioned;
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                    'messages_' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$"""
+    )
+
+    op.create_index("ix_messages_id", "messages", ["id"], unique=False)
+    op.create_index("ix_messages_channel_id", "messages", ["channel_id"], unique=False)
+    op.create_index("ix_messages_channel_id_created_at", "messages", ["channel_id", "created_at"], unique=False)
+    op.execute("CREATE INDEX ix_messages_content_trgm ON messages USING gin (content gin_trgm_ops)")
+
+    op.execute(f"INSERT INTO messages ({MESSAGE_COLUMNS}) SELECT {MESSAGE_COLUMNS} FROM messages_unpartitioned")
+    op.execute("DROP TABLE messages_unpartitioned")
+
+    # 主キーにcreated_atが含まれるため、IDの重複（再送）はトリガーで読み飛ばす
+    # IDの一意性はパーティションなしのmessage_idsの主キーで保証する（同じIDの同時INSERTは後の方が読み飛ばされる）。
+    # 行ごとのアドバイザリーロックと違い、数万行のINSERT ... SELECTでも共有メモリのロックテーブルを使い切らない。
+    # アーカイブでmessagesから削除したIDも残すため、アーカイブ済みのメッセージが再送されても保存し直さない
+    op.execute("CREATE TABLE message_ids (id VARCHAR NOT NULL, CONSTRAINT message_ids_pkey PRIMARY KEY (id))")
+    op.execute("INSERT INTO message_ids (id) SELECT id FROM messages ON CONFLICT DO NOTHING")
+    op.execute(
+        """CREATE FUNCTION messages_skip_duplicate_id() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO message_ids (id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql"""
+    )
+    op.execute(
+        """CREATE TRIGGER messages_skip_duplicate_id BEFORE INSERT ON messages
+        FOR EACH ROW EXECUTE FUNCTION messages_skip_duplicate_id()"""
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS messages_skip_duplicate_id ON messages")
+    op.execute("DROP FUNCTION IF EXISTS messages_skip_duplicate_id()")
+    op.execute("DROP TABLE IF EXISTS message_ids")
+    op.execute("ALTER TABLE messages RENAME TO messages_partitioned")
+    op.execute("ALTER TABLE messages_partitioned RENAME CONSTRAINT messages_pkey TO messages_partitioned_pkey")
+    op.execute("DROP INDEX IF EXISTS ix_messages_id")
+    op.execute("DROP INDEX IF EXISTS ix_messages_channel_id")
+    op.execute("DROP INDEX IF EXISTS ix_messages_channel_id_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_messages_content_trgm")
+
+    op.execute(
+        """CREATE TABLE messages (
+            id VARCHAR NOT NULL,
+            channel_id VARCHAR NOT NULL,
+            user_id VARCHAR NOT NULL,
+            user_name VARCHAR NOT NULL,
+            user_type VARCHAR NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            is_own_message BOOLEAN NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT messages_pkey PRIMARY KEY (id)
+        )"""
+    )
+    op.execute(
+        f"""INSERT INTO messages ({MESSAGE_COLUMNS})
+        SELECT DISTINCT ON (id) {MESSAGE_COLUMNS} FROM messages_partitioned ORDER BY id, created_at"""
+    )
+    op.execute("DROP TABLE messages_partitioned CASCADE")
+
+    op.create_index("ix_messages_channel_id", "messages", ["channel_id"], unique=False)
+    op.create_index("ix_messages_channel_id_created_at", "messages", ["channel_id", "created_at"], unique=False)
+    op.execute("CREATE INDEX ix_messages_content_trgm ON messages USING gin (content gin_trgm_ops)")
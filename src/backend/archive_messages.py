@@ -0,0 +1,50 @@
+"""古いメッセージのアーカイブ処理
+
+指定日数より前の月のメッセージをアーカイブファイル（MESSAGE_ARCHIVE_DIR）に移してDBから削除する。
+PostgreSQLで月別パーティションを使っている場合は、空になった古いパーティションを削除し、
+数か月先までのパーティションを作成する（定期実行することでパーティションの作成漏れを防ぐ）。
+
+使い方（src/backend で実行）:
+    uv run python archive_messages.py --after-days 90
+"""
+
+import argparse
+import logging
+from datetime import UTC, datetime, timedelta
+
+try:
+    # パッケージとして実行される場合
+    from .database import SessionLocal
+    from .utils.message_archive import archive_messages, ensure_partitions, get_message_archive, is_partitioned
+except ImportError:
+    # 直接実行される場合
+    from database import SessionLocal
+    from utils.message_archive import archive_messages, ensure_partitions, get_message_archive, is_partitioned
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """アーカイブ処理を実行"""
+    parser = argparse.ArgumentParser(description="古いメッセージをアーカイブファイルに移す")
+    parser.add_argument("--after-days", type=int, default=90, help="この日数より前の月のメッセージを移す")
+    parser.add_argument("--months-ahead", type=int, default=3, help="作成しておく将来のパーティションの月数")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    archive = get_message_archive()
+    if archive is None:
+        raise SystemExit("MESSAGE_ARCHIVE_DIR を指定してください")
+
+    before = datetime.now(UTC) - timedelta(days=args.after_days)
+    with SessionLocal() as db:
+        archived = archive_messages(db, archive, before)
+        logger.info(f"アーカイブ完了: {archived}件（保存先: {archive.root}）")
+        if db.get_bind().dialect.name == "postgresql" and is_partitioned(db):
+            created = ensure_partitions(db, args.months_ahead)
+            if created:
+                logger.info(f"パーティションを作成しました: {', '.join(created)}")
+
+
+if __name__ == "__main__":
+    main()
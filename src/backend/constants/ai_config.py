@@ -3,8 +3,20 @@
 # タイマー設定
 DEFAULT_CHECK_INTERVAL_SECONDS = 15  # 自動会話チェック間隔（秒）
 
+# 人格ファイル監視設定
+DEFAULT_PERSONALITY_POLL_INTERVAL_SECONDS = 2.0  # ファイルイベントが使えない場合のポーリング間隔（秒）
+
 # 会話履歴設定
 DEFAULT_CONVERSATION_HISTORY_LIMIT = 10  # デフォルト会話履歴取得件数
 
 # AI応答設定
 DEFAULT_MAX_OUTPUT_TOKENS = 2048  # AI応答の最大トークン数（十分な長さの会話をサポート）
+
+# Gemini APIレート制限設定
+DEFAULT_GEMINI_REQUESTS_PER_MINUTE = 10  # 1分あたりの平均リクエスト数
+DEFAULT_GEMINI_RATE_LIMIT_BURST = 3  # 連続で許可するリクエスト数
+
+# モデルバックエンド設定
+MODEL_BACKEND_GEMINI = "gemini"  # Gemini APIを使用（デフォルト）
+MODEL_BACKEND_FAKE = "fake"  # APIを呼ばずに固定の応答を返す（負荷試験・ローカル開発用）
+DEFAULT_FAKE_MODEL_LATENCY_MS = 50  # フェイクモデルの応答遅延（ミリ秒）
@@ -3,40 +3,124 @@
 ChannelとMessageモデルに対するCRUD（作成・読み取り・更新・削除）操作を提供します。
 """
 
-from sqlalchemy.orm import Session
+import re
+from collections.abc import Mapping, Sequence
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import ColumnElement, Insert, and_, column, func, literal_column, or_, select, table, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
 
 try:
-    from .models import Channel, Message
+    from .models import MESSAGES_FTS_TABLE, Channel, Message
     from .schemas import MessageCreate
+    from .utils.message_archive import get_message_archive
+    from .utils.response_cache import CHANNEL_MESSAGES_KIND, response_cache
 except ImportError:
-    from models import Channel, Message
+    from models import MESSAGES_FTS_TABLE, Channel, Message
     from schemas import MessageCreate
+    from utils.message_archive import get_message_archive
+    from utils.response_cache import CHANNEL_MESSAGES_KIND, response_cache
 
 
-def create_message(db: Session, message: MessageCreate) -> Message:
-    """メッセージを作成"""
-    db_message = Message(
-        id=message.id,
-        channel_id=message.channel_id,
-        user_id=message.user_id,
-        user_name=message.user_name,
-        user_type=message.user_type,
-        content=message.content,
-        timestamp=message.timestamp,
-        is_own_message=message.is_own_message,
-    )
+def message_to_row(message: MessageCreate, created_at: datetime | None = None) -> dict[str, Any]:
+    """MessageCreateをINSERT用の行データに変換
+
+    Args:
+        message: 保存するメッセージ
+        created_at: 作成日時（キュー投入時刻を保持する場合に指定。省略時は現在時刻）
+
+    Returns:
+        messagesテーブルの列名をキーとする辞書
+
+    """
+    return {
+        "id": message.id,
+        "channel_id": message.channel_id,
+        "user_id": message.user_id,
+        "user_name": message.user_name,
+        "user_type": message.user_type,
+        "content": message.content,
+        "timestamp": message.timestamp,
+        "is_own_message": message.is_own_message,
+        "created_at": created_at or datetime.now(UTC),
+    }
+
+
+def _insert_messages_ignoring_duplicates(db: Session) -> Insert:
+    """IDが既存のメッセージを読み飛ばすINSERT文（ON CONFLICT DO NOTHING）を作成"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # 月別パーティションのテーブルでは主キーが (id, created_at) のため、競合対象の列を指定しない
+        # （IDのみの重複はトリガーで読み飛ばす。alembic a8c5e1f04b27 を参照）
+        return postgresql_insert(Message).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite_insert(Message).on_conflict_do_nothing(index_elements=["id"])
+    raise ValueError(f"未対応のデータベースです: {dialect}")
+
+
+def create_message(db: Session, message: MessageCreate) -> Message | None:
+    """メッセージを作成
+
+    作成日時も含めて全ての列の値をアプリケーション側で決めてからINSERTするため、
+    コミット後にrefresh（SELECT）で読み直さず、保存した値からMessageを組み立てて返す。
+    クライアントの再送などでIDが既に保存されている場合は、エラーにせず何もしない。
+
+    Returns:
+        保存したメッセージ（IDが既に保存されていた場合はNone）
+
+    """
+    row = message_to_row(message)
+    # 値をパラメータで渡し、文のコンパイル結果をメッセージごとに作り直さず再利用する
+    statement = _insert_messages_ignoring_duplicates(db).returning(Message.id)
     try:
-        db.add(db_message)
+        inserted_id = db.execute(statement, row).scalar_one_or_none()
         db.commit()
-        db.refresh(db_message)
-        return db_message
     except Exception:
         db.rollback()
         raise
+    if inserted_id is None:
+        return None
+    # チャンネルの最新ページのキャッシュを無効化
+    response_cache.invalidate(CHANNEL_MESSAGES_KIND, message.channel_id)
+    return Message(**row)
+
+
+def bulk_insert_messages(db: Session, rows: Sequence[dict[str, Any]]) -> set[str]:
+    """複数メッセージを1回の複数行INSERTで保存（IDが既存のメッセージは無視）
+
+    同じメッセージが再送・再実行されても二重に保存されないよう、主キーの
+    重複はON CONFLICT DO NOTHINGで読み飛ばす。
+
+    Args:
+        db: データベースセッション
+        rows: message_to_row() で作成した行データ
+
+    Returns:
+        新たに保存されたメッセージのID
+
+    """
+    if not rows:
+        return set()
+
+    statement = _insert_messages_ignoring_duplicates(db).returning(Message.id)
+    try:
+        # executemany形式で渡すと、SQLAlchemyが複数行のINSERT ... RETURNINGにまとめて実行する
+        # （values()に行を埋め込むより文のコンパイル結果が再利用されるため速い）
+        inserted_ids = set(db.execute(statement, list(rows)).scalars())
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    for channel_id in {row["channel_id"] for row in rows if row["id"] in inserted_ids}:
+        response_cache.invalidate(CHANNEL_MESSAGES_KIND, channel_id)
+    return inserted_ids
 
 
 def get_channel_messages(db: Session, channel_id: str, skip: int = 0, limit: int = 100) -> list[Message]:
-    """チャンネルのメッセージを取得（一貫した逆時系列ページネーション）"""
+    """チャンネルのメッセージを取得（一貫した逆時系列ページネーション。DBより古いページはアーカイブから読み込む）"""
     if skip < 0:
         raise ValueError("skip parameter must be non-negative")
     if limit <= 0:
@@ -52,15 +136,130 @@ def get_channel_messages(db: Session, channel_id: str, skip: int = 0, limit: int
         .all()
     )
 
+    # DBに残っていない古いページはアーカイブから続きを読み込む
+    archive = get_message_archive()
+    if len(messages) < limit and archive is not None:
+        if messages:
+            db_count = skip + len(messages)
+        else:
+            db_count = get_channel_db_messages_count(db, channel_id) if skip > 0 else 0
+        messages.extend(archive.read(channel_id, max(0, skip - db_count), limit - len(messages)))
+
     # 時系列順（古い順）に並び替えて返す
     return list(reversed(messages))
 
 
-def get_channel_messages_count(db: Session, channel_id: str) -> int:
-    """チャンネルのメッセージ総数を取得"""
+# created_atとして扱う文字列（日付部分が YYYY-MM-DD 形式のISO 8601）
+_ISO_DATETIME_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}([T ]|$)")
+
+# 差分取得の基準（メッセージID、作成日時、またはNone=基準なし）
+MessageWatermark = str | datetime | None
+
+
+def parse_message_watermark(value: str | None) -> MessageWatermark:
+    """クライアントから受け取った差分取得の基準を解釈
+
+    ISO 8601形式の日時はcreated_atとして、それ以外はメッセージIDとして扱う。
+
+    Args:
+        value: メッセージIDまたはISO 8601形式の日時（空の場合は基準なし）
+
+    Returns:
+        メッセージID、UTCのdatetime、またはNone
+
+    Raises:
+        ValueError: 日時の形式が不正な場合
+
+    """
+    if not value:
+        return None
+    if not _ISO_DATETIME_PATTERN.match(value):
+        return value
+    dt = datetime.fromisoformat(value)
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt.astimezone(UTC)
+
+
+def _newer_than(watermark: MessageWatermark) -> ColumnElement[bool] | None:
+    """基準より新しいメッセージの条件式を作成（基準なしの場合はNone）"""
+    if watermark is None:
+        return None
+    if isinstance(watermark, datetime):
+        # created_atはタイムゾーンなしのUTCで保存されている
+        return Message.created_at > watermark.astimezone(UTC).replace(tzinfo=None)
+
+    # メッセージIDの場合はそのメッセージのcreated_atを副問い合わせで引く（往復を増やさない）。
+    # 同時刻のメッセージを取りこぼさないよう同時刻は基準メッセージ以外を含め、
+    # 保存されていないIDの場合は最新分をそのまま返す（クライアント側で置き換える）
+    anchor = aliased(Message)
+    anchor_created_at = select(anchor.created_at).where(anchor.id == watermark).scalar_subquery()
+    return and_(Message.created_at >= func.coalesce(anchor_created_at, datetime.min), Message.id != watermark)
+
+
+def get_messages_since(
+    db: Session, watermarks: Mapping[str, MessageWatermark], limit: int = 100
+) -> dict[str, tuple[list[Message], bool]]:
+    """複数チャンネルについて、基準より新しいメッセージを1回のクエリで取得
+
+    チャンネルごとに新しい方から最大limit件を返す。基準より新しいメッセージがlimit件を
+    超える場合は間が抜けるため、クライアントは返された分で表示を置き換える必要がある。
+
+    Args:
+        db: データベースセッション
+        watermarks: チャンネルIDと基準（parse_message_watermark() の戻り値）の対応
+        limit: チャンネルごとの最大取得件数
+
+    Returns:
+        チャンネルIDごとの (時系列順のメッセージ, limit件を超えて残りがあるか)
+
+    """
+    if limit <= 0:
+        raise ValueError("limit parameter must be positive")
+
+    result: dict[str, tuple[list[Message], bool]] = {channel_id: ([], False) for channel_id in watermarks}
+    if not watermarks:
+        return result
+
+    conditions = []
+    for channel_id, watermark in watermarks.items():
+        condition = Message.channel_id == channel_id
+        newer = _newer_than(watermark)
+        conditions.append(condition if newer is None else and_(condition, newer))
+
+    # チャンネルごとに新しい順の番号を振り、limit + 1件目まで取って残りの有無を判定する
+    row_number = (
+        func.row_number()
+        .over(partition_by=Message.channel_id, order_by=(Message.created_at.desc(), Message.id.desc()))
+        .label("row_number")
+    )
+    ranked = select(Message, row_number).where(or_(*conditions)).subquery()
+    ranked_message = aliased(Message, ranked)
+    statement = (
+        select(ranked_message, ranked.c.row_number)
+        .where(ranked.c.row_number <= limit + 1)
+        .order_by(ranked.c.channel_id, ranked.c.created_at, ranked.c.id)
+    )
+
+    for message, number in db.execute(statement):
+        messages = result[message.channel_id][0]
+        if number > limit:
+            result[message.channel_id] = (messages, True)
+        else:
+            messages.append(message)
+    return result
+
+
+def get_channel_db_messages_count(db: Session, channel_id: str) -> int:
+    """チャンネルのDBに残っているメッセージ数を取得（アーカイブ済みを除く）"""
     return db.query(Message).filter(Message.channel_id == channel_id).count()
 
 
+def get_channel_messages_count(db: Session, channel_id: str) -> int:
+    """チャンネルのメッセージ総数を取得（アーカイブ済みを含む）"""
+    archive = get_message_archive()
+    archived = archive.count(channel_id) if archive is not None else 0
+    return get_channel_db_messages_count(db, channel_id) + archived
+
+
 def get_recent_channel_messages(db: Session, channel_id: str, limit: int = 10) -> list[Message]:
     """指定チャンネルの最新メッセージを指定件数取得（時系列順）"""
     if limit <= 0:
@@ -79,6 +278,86 @@ def get_recent_channel_messages(db: Session, channel_id: str, limit: int = 10) -
     return list(reversed(recent_messages))
 
 
+# FTS5のtrigramトークナイザで検索できる最小文字数（これより短い語は部分一致で検索）
+SEARCH_MIN_TRIGRAM_LENGTH = 3
+# 1回の検索で使う語の最大数
+MAX_SEARCH_TERMS = 8
+
+
+def _search_terms(query: str) -> list[str]:
+    """検索文字列を空白（全角スペースを含む）で区切った語のリストにする"""
+    return list(dict.fromkeys(query.split()))[:MAX_SEARCH_TERMS]
+
+
+def _escape_like(term: str) -> str:
+    """LIKEの特殊文字をエスケープ"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_messages(
+    db: Session, query: str, channel_id: str | None = None, limit: int = 50, offset: int = 0
+) -> tuple[list[Message], bool]:
+    """メッセージ本文を全文検索（空白区切りの全ての語を含むメッセージを新しい順に返す）
+
+    SQLiteではFTS5（trigram）の全文検索インデックスを使い、3文字未満の語のみ部分一致で絞り込む（保存順の新しい順）。
+    PostgreSQLではpg_trgmのインデックスを使ったILIKEで検索する（created_atの新しい順）。
+
+    Args:
+        db: データベースセッション
+        query: 検索文字列
+        channel_id: 絞り込むチャンネルID（省略時は全チャンネル）
+        limit: 最大取得件数
+        offset: 取得を開始する位置
+
+    Returns:
+        (新しい順のメッセージ, 続きがあるか)
+
+    """
+    if offset < 0:
+        raise ValueError("offset parameter must be non-negative")
+    if limit <= 0:
+        raise ValueError("limit parameter must be positive")
+
+    terms = _search_terms(query)
+    if not terms:
+        return [], False
+
+    if db.get_bind().dialect.name == "sqlite":
+        # 保存順（rowid）の新しい順に返す。FTS5・messagesともrowidの降順に走査できるため、
+        # 全件を並べ替えずに必要な件数が見つかった時点で打ち切られる
+        fts_terms = [term for term in terms if len(term) >= SEARCH_MIN_TRIGRAM_LENGTH]
+        like_terms = [term for term in terms if len(term) < SEARCH_MIN_TRIGRAM_LENGTH]
+        message_rowid = literal_column("messages.rowid")
+        if fts_terms:
+            # 各語をフレーズとして引用し、AND検索する
+            match = " AND ".join('"' + term.replace('"', '""') + '"' for term in fts_terms)
+            fts = table(MESSAGES_FTS_TABLE, column("rowid"))
+            statement = (
+                select(Message)
+                .select_from(fts)
+                .join(Message, message_rowid == fts.c.rowid)
+                .where(text(f"{MESSAGES_FTS_TABLE} MATCH :match").bindparams(match=match))
+                .order_by(fts.c.rowid.desc())
+            )
+        else:
+            statement = select(Message).order_by(message_rowid.desc())
+        # SQLiteのLIKEはASCIIの大文字・小文字を区別しない
+        like = Message.content.like
+    else:
+        statement = select(Message).order_by(Message.created_at.desc(), Message.id.desc())
+        like_terms = terms
+        like = Message.content.ilike
+
+    for term in like_terms:
+        statement = statement.where(like(f"%{_escape_like(term)}%", escape="\\"))
+    if channel_id is not None:
+        statement = statement.where(Message.channel_id == channel_id)
+
+    statement = statement.offset(offset).limit(limit + 1)
+    messages = list(db.scalars(statement))
+    return messages[:limit], len(messages) > limit
+
+
 def get_channels(db: Session) -> list[Channel]:
     """全チャンネルを取得"""
     return db.query(Channel).all()
@@ -3,15 +3,25 @@
 Supabase PostgreSQLおよびテスト用SQLiteのデータベース接続を管理します。
 """
 
+import itertools
 import logging
 import os
 from collections.abc import Generator
 from pathlib import Path
+from typing import Any
 from urllib.parse import quote_plus
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import Connection, Engine, create_engine, event
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+try:
+    # パッケージとして実行される場合
+    from .utils.db_pool import InstrumentedQueuePool, PoolProfile, instrument_engine
+except ImportError:
+    # 直接実行される場合（Alembic等）
+    from utils.db_pool import InstrumentedQueuePool, PoolProfile, instrument_engine
 
 # ログ設定
 logger = logging.getLogger(__name__)
@@ -23,17 +33,23 @@ load_dotenv()
 #
 # 優先順位:
 # 1. テスト環境: SQLiteインメモリDB（:memory:）- テスト専用、ファイル生成なし
-# 2. 本番環境: Supabase PostgreSQL - 本番・ステージング環境
-# 3. 開発環境: SQLite（ローカルファイル）- 開発・デバッグ用のフォールバック
+# 2. 接続URL指定: DATABASE_URL - 負荷試験などで接続先を直接指定する場合
+# 3. 本番環境: Supabase PostgreSQL - 本番・ステージング環境
+# 4. 開発環境: SQLite（ローカルファイル）- 開発・デバッグ用のフォールバック
 #
 # 使い分けガイド:
 # - テスト実行時: TESTING=true で自動的にインメモリDBを使用
+# - 負荷試験: DATABASE_URL=sqlite:///... または postgresql://... を指定
 # - 本番・ステージング: DB_HOST等の環境変数を設定してSupabase使用
 # - ローカル開発: 環境変数未設定時にchat.dbファイルを使用（.gitignoreで除外済み）
 
 if os.getenv("TESTING") == "true":
     # テスト環境: SQLiteインメモリDB（ファイル生成を防ぐ）
     SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+elif os.getenv("DATABASE_URL"):
+    # 接続URLを直接指定
+    SQLALCHEMY_DATABASE_URL = os.environ["DATABASE_URL"]
+    logger.info("DATABASE_URLの接続設定を使用します")
 else:
     # Supabase PostgreSQL接続設定の確認
     DB_HOST = os.getenv("DB_HOST")
@@ -61,21 +77,178 @@ else:
         DB_FILE_PATH = Path(__file__).parent / "chat.db"
         SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_FILE_PATH.as_posix()}"
 
+# SQLiteファイルの本番向け設定（WAL・PRAGMA・書き込み専用接続と読み込み専用の接続プール）
+#
+# 環境変数:
+#   SQLITE_TUNED: false で従来の設定（ジャーナル・接続とも既定値）を使用（デフォルト true）
+#   SQLITE_MMAP_SIZE: メモリマップするサイズ（バイト。デフォルト 256MiB）
+#   SQLITE_CACHE_SIZE: ページキャッシュ（負の値はKiB単位。デフォルト -65536 = 64MiB）
+#   SQLITE_BUSY_TIMEOUT_MS: ロック待ちの上限（ミリ秒。デフォルト 5000）
+#   SQLITE_READ_POOL_SIZE: 読み込み専用の接続を保持しておく数（デフォルト 8）
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+# インメモリDBは接続ごとに別のDBになるため、ファイルのSQLiteのみ対象
+IS_TUNED_SQLITE = (
+    SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+    and ":memory:" not in SQLALCHEMY_DATABASE_URL
+    and os.getenv("SQLITE_TUNED", "true").lower() in ("true", "1", "yes", "on")
+)
+
+
+def _apply_sqlite_pragmas(engine: Engine, read_only: bool = False) -> None:
+    """接続ごとにSQLiteのPRAGMAを設定するイベントを登録
+
+    Args:
+        engine: 対象のエンジン
+        read_only: 読み込み専用の接続にする（query_only）
+
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: Any, _connection_record: Any) -> None:  # noqa: ANN401
+        cursor = dbapi_connection.cursor()
+        try:
+            # WALは読み込みと書き込みが互いをブロックしない（設定はDBファイルに保存される）
+            cursor.execute("PRAGMA journal_mode=WAL")
+            # WALではコミットごとのfsyncを省いても破損しない（電源断時に直近のコミットが失われうる）
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            if read_only:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+
 # PostgreSQL用の設定（connection pooling）
+# プールのサイズは環境変数のプロファイルで切り替える（utils/db_pool.py）
 # SQLiteの場合は従来の設定を維持
-if SQLALCHEMY_DATABASE_URL.startswith("postgresql://"):
+POOL_PROFILE = PoolProfile.from_env()
+if SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, **POOL_PROFILE.engine_options())
+    instrument_engine(engine, "primary")
+    read_engine = engine
+    logger.info(f"DB接続プールの設定: {POOL_PROFILE}")
+elif IS_TUNED_SQLITE:
+    # SQLiteの書き込みは1接続ずつしか実行できないため、書き込み用の接続は1本に限定し
+    # （書き込みスレッド utils/sqlite_writer.py が使用）、読み込みは別の接続プールで並行して処理する
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
-        pool_size=5,  # 開発環境では小さめに設定
-        max_overflow=10,  # 過剰なリソース使用を防ぐ
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
         pool_timeout=30,
-        pool_recycle=3600,
-        pool_pre_ping=True,  # 接続の有効性チェック
     )
+    _apply_sqlite_pragmas(engine)
+    instrument_engine(engine, "primary")
+    read_engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=SQLITE_READ_POOL_SIZE,
+        # WebSocketの処理はセッションを保持したままawaitするため、接続の空き待ちでイベントループを止めないよう上限を設けない
+        max_overflow=-1,
+    )
+    _apply_sqlite_pragmas(read_engine, read_only=True)
+    instrument_engine(read_engine, "read")
+    logger.info(f"SQLiteの本番向け設定を使用します: WAL, 読み込み接続={SQLITE_READ_POOL_SIZE}")
 else:
     # SQLite用設定（テスト環境やフォールバック時）
     engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    read_engine = engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 読み込み専用のセッション（SQLite以外・チューニング無効時はSessionLocalと同じ接続先）
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# 読み込みレプリカ（履歴のスクロールやAIの会話履歴など、多少の遅延を許容できる読み込み用）
+#
+# 環境変数:
+#   DB_REPLICA_URLS: レプリカの接続URL（カンマ区切り）。未設定の場合は全ての読み込みをプライマリで行う
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+replica_engines: list[Engine] = [
+    create_engine(url, **POOL_PROFILE.engine_options()) if url.startswith("postgresql") else create_engine(url)
+    for url in DB_REPLICA_URLS
+]
+for _index, _replica_engine in enumerate(replica_engines):
+    instrument_engine(_replica_engine, f"replica_{_index}")
+if replica_engines:
+    logger.info(f"読み込みレプリカを使用します: {len(replica_engines)}台")
+
+# セッションごとにレプリカを順番に割り当てる
+_replica_counter = itertools.count()
+
+
+class RoutingSession(Session):
+    """読み込みをレプリカ、書き込みをプライマリに振り分けるセッション
+
+    書き込みを1度でも行ったセッションは、以降の読み込みもプライマリで行う（自分の書き込みを読めるようにするため）。
+    1つのセッション内の読み込みは同じレプリカで行う。
+    """
+
+    _replica: Engine | None = None
+    _use_primary = False
+
+    def get_bind(
+        self,
+        mapper: Any = None,  # noqa: ANN401
+        clause: Any = None,  # noqa: ANN401
+        **kw: Any,  # noqa: ANN401
+    ) -> Engine | Connection:
+        """実行する文に応じて接続先を選択"""
+        if not replica_engines or self._use_primary:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or getattr(clause, "is_dml", False):
+            self._use_primary = True
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._replica is None:
+            self._replica = replica_engines[next(_replica_counter) % len(replica_engines)]
+        return self._replica
+
+    def close(self) -> None:
+        """セッションを閉じ、次回の利用時に接続先を選び直す"""
+        super().close()
+        self._replica = None
+        self._use_primary = False
+
+
+# レプリカに振り分けるセッション（レプリカ未設定の場合はReadSessionLocalと同じ接続先）
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+    if replica_engines
+    else ReadSessionLocal
+)
+
+
+def get_pool_stats() -> dict[str, dict[str, int]]:
+    """接続先ごとの接続プールの利用状況を取得
+
+    Returns:
+        接続先（primary / read / replica_N）ごとの
+        {"size": 保持する接続数, "checked_out": 使用中, "idle": 待機中, "overflow": 上限超過分}
+    """
+    targets = {"primary": engine}
+    if read_engine is not engine:
+        targets["read"] = read_engine
+    targets.update({f"replica_{i}": replica for i, replica in enumerate(replica_engines)})
+
+    stats: dict[str, dict[str, int]] = {}
+    for target, target_engine in targets.items():
+        pool = target_engine.pool
+        # QueuePool以外（テスト用のStaticPool等）は集計しない
+        if isinstance(pool, QueuePool):
+            stats[target] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            }
+    return stats
 
 
 class Base(DeclarativeBase):
@@ -91,3 +264,21 @@ def get_db() -> Generator[Session]:
         yield db
     finally:
         db.close()
+
+
+def get_replica_db() -> Generator[Session]:
+    """レプリカに振り分けるデータベースセッションを取得（遅延を許容できる参照系のAPI用）"""
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db() -> Generator[Session]:
+    """読み込み専用のデータベースセッションを取得（参照系のAPI用）"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,61 @@
+"""チャンネル履歴のエクスポート
+
+チャンネルの全メッセージ（アーカイブ済みを含む）をNDJSONまたはCSVで古い順に書き出す。
+バックアップや分析用。`GET /api/channels/{channel_id}/export` と同じ形式で出力する。
+
+使い方（src/backend で実行）:
+    # チャンネル1をNDJSONで標準出力に書き出す
+    uv run python export_messages.py 1
+
+    # 全チャンネルをチャンネルごとのgzip圧縮したCSVファイルに書き出す
+    uv run python export_messages.py --format csv --gzip --output-dir backup/
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+try:
+    # パッケージとして実行される場合
+    from .database import ReplicaSessionLocal
+    from .models import Channel
+    from .utils.message_export import EXPORT_FORMATS, encode_export, export_filename, iter_channel_history
+except ImportError:
+    # 直接実行される場合
+    from database import ReplicaSessionLocal
+    from models import Channel
+    from utils.message_export import EXPORT_FORMATS, encode_export, export_filename, iter_channel_history
+
+
+def main() -> None:
+    """エクスポートを実行"""
+    parser = argparse.ArgumentParser(description="チャンネルのメッセージ履歴をエクスポートする")
+    parser.add_argument("channel_ids", nargs="*", help="チャンネルID（省略時は全チャンネル）")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson", help="出力形式")
+    parser.add_argument("--gzip", action="store_true", help="gzip圧縮する")
+    parser.add_argument("--output-dir", type=Path, help="チャンネルごとのファイルの出力先（省略時は標準出力）")
+    args = parser.parse_args()
+
+    with ReplicaSessionLocal() as db:
+        channel_ids = args.channel_ids or [channel.id for channel in db.query(Channel).order_by(Channel.id)]
+        if args.output_dir is None and len(channel_ids) > 1 and args.format == "csv":
+            parser.error("複数チャンネルのCSVは --output-dir を指定してください")
+
+        for channel_id in channel_ids:
+            chunks = encode_export(iter_channel_history(db, channel_id), args.format, args.gzip)
+            if args.output_dir is None:
+                # NDJSON（gzipの場合も連結したファイルとして展開できる）は続けて出力する
+                for chunk in chunks:
+                    sys.stdout.buffer.write(chunk)
+                continue
+
+            args.output_dir.mkdir(parents=True, exist_ok=True)
+            path = args.output_dir / export_filename(channel_id, args.format, args.gzip)
+            with path.open("wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            print(path, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""メッセージの一括取り込み
+
+エクスポートしたNDJSON（`export_messages.py` / `GET /api/channels/{channel_id}/export`）や
+生成した会話をDBにまとめて保存する。開発用のデータ作成や負荷試験の準備に使う。
+IDが既存のメッセージは読み飛ばす。
+
+使い方（src/backend で実行）:
+    # エクスポートしたファイルを取り込む（.gzはそのまま指定できる）
+    uv run python import_messages.py backup/channel-1.ndjson.gz backup/channel-2.ndjson.gz
+
+    # 初期チャンネルに100万件の会話を生成して保存する
+    uv run python import_messages.py --synthetic 1000000
+"""
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+try:
+    # パッケージとして実行される場合
+    from .database import SessionLocal
+    from .utils.message_import import IMPORT_BATCH_SIZE, generate_conversations, import_messages, read_export_file
+except ImportError:
+    # 直接実行される場合
+    from database import SessionLocal
+    from utils.message_import import IMPORT_BATCH_SIZE, generate_conversations, import_messages, read_export_file
+
+# 生成した会話を保存するチャンネル（main.INITIAL_CHANNELS）
+DEFAULT_CHANNEL_IDS = ["1", "2", "3", "4", "5"]
+
+
+def main() -> None:
+    """取り込みを実行"""
+    parser = argparse.ArgumentParser(description="メッセージをDBにまとめて保存する")
+    parser.add_argument("files", nargs="*", type=Path, help="エクスポートしたNDJSONファイル（.gz可）")
+    parser.add_argument("--synthetic", type=int, default=0, help="生成して保存する会話のメッセージ数")
+    parser.add_argument("--channels", nargs="+", default=DEFAULT_CHANNEL_IDS, help="会話を生成するチャンネルID")
+    parser.add_argument("--seed", type=int, default=0, help="会話生成の乱数シード（メッセージIDにも使う）")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="1トランザクションで保存する件数")
+    args = parser.parse_args()
+    if not args.files and args.synthetic <= 0:
+        parser.error("取り込むファイルか --synthetic を指定してください")
+
+    rows = itertools.chain(
+        *(read_export_file(path) for path in args.files),
+        generate_conversations(args.synthetic, args.channels, args.seed),
+    )
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        imported = import_messages(db, rows, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{imported}件を保存しました（{elapsed:.1f}秒, {imported / max(elapsed, 1e-9):.0f}件/秒）", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
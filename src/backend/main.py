@@ -3,24 +3,59 @@
 AI CommunityのFastAPIバックエンドアプリケーションのAPIエンドポイントとWebSocketを提供します。
 """
 
-import json
 import logging
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Iterator
 from contextlib import asynccontextmanager
+from urllib.parse import quote
 
-from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 try:
     # パッケージとして実行される場合（テスト等）
     from . import crud
     from .ai.conversation_timer import start_conversation_timer, stop_conversation_timer
+    from .ai.personality_watcher import start_personality_watcher, stop_personality_watcher
     from .constants.logging import LOG_DATE_FORMAT, LOG_FORMAT
-    from .database import SessionLocal, get_db
+    from .database import ReadSessionLocal, SessionLocal, get_pool_stats, get_read_db, get_replica_db
     from .models import Channel
-    from .schemas import ChannelResponse, MessageResponse, MessagesListResponse
+    from .schemas import (
+        ChannelResponse,
+        MessageResponse,
+        MessagesListResponse,
+        SearchResponse,
+        SyncChannelMessages,
+        SyncRequest,
+        SyncResponse,
+    )
+    from .utils.discord_webhook import discord_sender
+    from .utils.message_export import EXPORT_FORMATS, encode_export, export_filename, iter_channel_history
+    from .utils.metrics import (
+        DB_POOL_CONNECTIONS,
+        QUEUE_DEPTH,
+        RATE_LIMITER_DROPS,
+        RATE_LIMITER_WAITS,
+        RESPONSE_CACHE_REQUESTS,
+        WEBSOCKET_ACTIVE_CONNECTIONS,
+    )
+    from .utils.metrics import registry as metrics_registry
+    from .utils.rate_limiter import get_registered_rate_limiters
+    from .utils.response_cache import (
+        CHANNEL_MESSAGES_KIND,
+        CHANNELS_KEY,
+        CachedResponse,
+        CacheKey,
+        etag_matches,
+        response_cache,
+    )
+    from .utils.sqlite_writer import get_sqlite_writer, stop_sqlite_writer
+    from .utils.tracing import shutdown_tracing
+    from .utils.write_behind import get_message_writer, start_message_writer, stop_message_writer
     from .websocket import handle_websocket_message, manager
+    from .websocket.codec import MessageDecodeError
 
     # ログ設定（早期初期化）
     logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
@@ -29,11 +64,44 @@ except ImportError:
         # 直接実行される場合（backend ディレクトリから）
         import crud
         from ai.conversation_timer import start_conversation_timer, stop_conversation_timer
+        from ai.personality_watcher import start_personality_watcher, stop_personality_watcher
         from constants.logging import LOG_DATE_FORMAT, LOG_FORMAT
-        from database import SessionLocal, get_db
+        from database import ReadSessionLocal, SessionLocal, get_pool_stats, get_read_db, get_replica_db
         from models import Channel
-        from schemas import ChannelResponse, MessageResponse, MessagesListResponse
+        from schemas import (
+            ChannelResponse,
+            MessageResponse,
+            MessagesListResponse,
+            SearchResponse,
+            SyncChannelMessages,
+            SyncRequest,
+            SyncResponse,
+        )
+        from utils.discord_webhook import discord_sender
+        from utils.message_export import EXPORT_FORMATS, encode_export, export_filename, iter_channel_history
+        from utils.metrics import (
+            DB_POOL_CONNECTIONS,
+            QUEUE_DEPTH,
+            RATE_LIMITER_DROPS,
+            RATE_LIMITER_WAITS,
+            RESPONSE_CACHE_REQUESTS,
+            WEBSOCKET_ACTIVE_CONNECTIONS,
+        )
+        from utils.metrics import registry as metrics_registry
+        from utils.rate_limiter import get_registered_rate_limiters
+        from utils.response_cache import (
+            CHANNEL_MESSAGES_KIND,
+            CHANNELS_KEY,
+            CachedResponse,
+            CacheKey,
+            etag_matches,
+            response_cache,
+        )
+        from utils.sqlite_writer import get_sqlite_writer, stop_sqlite_writer
+        from utils.tracing import shutdown_tracing
+        from utils.write_behind import get_message_writer, start_message_writer, stop_message_writer
         from websocket import handle_websocket_message, manager
+        from websocket.codec import MessageDecodeError
 
         # ログ設定（早期初期化）
         logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
@@ -46,11 +114,44 @@ except ImportError:
 
         import crud
         from ai.conversation_timer import start_conversation_timer, stop_conversation_timer
+        from ai.personality_watcher import start_personality_watcher, stop_personality_watcher
         from constants.logging import LOG_DATE_FORMAT, LOG_FORMAT
-        from database import SessionLocal, get_db
+        from database import ReadSessionLocal, SessionLocal, get_pool_stats, get_read_db, get_replica_db
         from models import Channel
-        from schemas import ChannelResponse, MessageResponse, MessagesListResponse
+        from schemas import (
+            ChannelResponse,
+            MessageResponse,
+            MessagesListResponse,
+            SearchResponse,
+            SyncChannelMessages,
+            SyncRequest,
+            SyncResponse,
+        )
+        from utils.discord_webhook import discord_sender
+        from utils.message_export import EXPORT_FORMATS, encode_export, export_filename, iter_channel_history
+        from utils.metrics import (
+            DB_POOL_CONNECTIONS,
+            QUEUE_DEPTH,
+            RATE_LIMITER_DROPS,
+            RATE_LIMITER_WAITS,
+            RESPONSE_CACHE_REQUESTS,
+            WEBSOCKET_ACTIVE_CONNECTIONS,
+        )
+        from utils.metrics import registry as metrics_registry
+        from utils.rate_limiter import get_registered_rate_limiters
+        from utils.response_cache import (
+            CHANNEL_MESSAGES_KIND,
+            CHANNELS_KEY,
+            CachedResponse,
+            CacheKey,
+            etag_matches,
+            response_cache,
+        )
+        from utils.sqlite_writer import get_sqlite_writer, stop_sqlite_writer
+        from utils.tracing import shutdown_tracing
+        from utils.write_behind import get_message_writer, start_message_writer, stop_message_writer
         from websocket import handle_websocket_message, manager
+        from websocket.codec import MessageDecodeError
 
         # ログ設定（早期初期化）
         logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
@@ -75,6 +176,7 @@ def init_channels() -> None:
                 channel = Channel(**channel_data)
                 db.add(channel)
         db.commit()
+        response_cache.invalidate(*CHANNELS_KEY)
     finally:
         db.close()
 
@@ -86,15 +188,32 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
     # 注意: テーブル作成はAlembicマイグレーションで実行済み
     init_channels()  # 初期チャンネル作成
 
+    # メッセージの一括保存を開始（有効な場合のみ。前回の未保存分もここで保存）
+    await start_message_writer()
+
     # 自動会話タイマーを開始
     logger.info("自動会話タイマーを開始中...")
     await start_conversation_timer()
 
+    # 人格ファイルの監視を開始（プロンプト編集を再起動なしで反映）
+    await start_personality_watcher()
+
     yield
 
     # 終了時処理
     logger.info("自動会話タイマーを停止中...")
     await stop_conversation_timer()
+    await stop_personality_watcher()
+
+    # 保存待ちのメッセージを保存してから終了
+    await stop_message_writer()
+    stop_sqlite_writer()
+
+    # Discord配信キューに残っているメッセージを送信してから終了
+    await discord_sender.close()
+
+    # 未出力のトレースを書き出す
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -113,20 +232,72 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
+# メトリクスの現在値は出力時に取得する
+WEBSOCKET_ACTIVE_CONNECTIONS.set_function(lambda: len(manager.active_connections))
+QUEUE_DEPTH.set_function(
+    lambda: {
+        ("discord_webhook",): discord_sender.queue_depth,
+        ("message_write_behind",): writer.queue_depth if (writer := get_message_writer()) else 0,
+        ("sqlite_writer",): sqlite_writer.queue_depth if (sqlite_writer := get_sqlite_writer()) else 0,
+    }
+)
+DB_POOL_CONNECTIONS.set_function(
+    lambda: {(target, state): value for target, stats in get_pool_stats().items() for state, value in stats.items()}
+)
+RATE_LIMITER_WAITS.set_function(lambda: {(lim.name,): lim.stats.waits for lim in get_registered_rate_limiters()})
+RATE_LIMITER_DROPS.set_function(lambda: {(lim.name,): lim.stats.drops for lim in get_registered_rate_limiters()})
+
+
 @app.get("/")
 async def root() -> dict[str, str]:
     """ルートエンドポイント."""
     return {"message": "AI Community Backend API"}
 
 
+# レスポンス本文のシリアライズ用（response_modelと同じくエイリアス名で出力）
+_channels_adapter = TypeAdapter(list[ChannelResponse])
+
+
+def _cached_json_response(request: Request, cached: CachedResponse | None) -> Response | None:
+    """キャッシュ済みのレスポンスを返す（キャッシュがない場合はNone）"""
+    if cached is None:
+        RESPONSE_CACHE_REQUESTS.inc(result="miss")
+        return None
+    RESPONSE_CACHE_REQUESTS.inc(result="hit")
+    return _json_response(request, cached)
+
+
+def _json_response(request: Request, cached: CachedResponse) -> Response:
+    """ETag付きのJSONレスポンスを作成（If-None-Matchが一致する場合は304）"""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
 @app.get("/api/channels", response_model=list[ChannelResponse])
-async def get_channels(db: Session = Depends(get_db)) -> list[ChannelResponse]:  # noqa: B008
-    """チャンネル一覧取得"""
-    channels = crud.get_channels(db)
-    return [ChannelResponse.model_validate(channel) for channel in channels]
+async def get_channels(request: Request, db: Session = Depends(get_read_db)) -> Response:  # noqa: B008
+    """チャンネル一覧取得（変更されるまでキャッシュし、ETagで条件付き取得に対応）
+
+    レプリカの遅延で古い内容をキャッシュしないよう、プライマリから取得する。
+    """
+    if (response := _cached_json_response(request, response_cache.get(CHANNELS_KEY))) is not None:
+        return response
+
+    generation = response_cache.generation
+    channels = [ChannelResponse.model_validate(channel) for channel in crud.get_channels(db)]
+    cached = response_cache.set(CHANNELS_KEY, _channels_adapter.dump_json(channels, by_alias=True), generation)
+    return _json_response(request, cached)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus形式のメトリクス出力"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # デフォルト値の定数定義
@@ -135,53 +306,175 @@ DEFAULT_MESSAGE_LIMIT = 100
 
 @app.get("/api/channels/{channel_id}/messages", response_model=MessagesListResponse)
 async def get_channel_messages(
+    request: Request,
     channel_id: str,
     limit: int = DEFAULT_MESSAGE_LIMIT,
     offset: int = 0,
-    db: Session = Depends(get_db),  # noqa: B008
+    since: str | None = None,
+    db: Session = Depends(get_replica_db),  # noqa: B008
+    primary_db: Session = Depends(get_read_db),  # noqa: B008
+) -> MessagesListResponse | Response:
+    """指定チャンネルのメッセージ履歴取得
+
+    sinceを指定した場合は、そのメッセージ（IDまたはcreated_at）より新しいメッセージのみを返す（offsetは無視）。
+    最新ページ（offset=0、since指定なし）は新しいメッセージが保存されるまでキャッシュし、ETagで条件付き取得に対応する。
+    過去のページはレプリカから取得する。キャッシュする最新ページは、レプリカの遅延で古い内容を
+    キャッシュしないようプライマリから取得する。
+    """
+    if offset == 0 and since is None:
+        key: CacheKey = (CHANNEL_MESSAGES_KIND, channel_id, limit)
+        if (response := _cached_json_response(request, response_cache.get(key))) is not None:
+            return response
+
+        generation = response_cache.generation
+        latest_page = _get_channel_messages(channel_id, limit, 0, None, primary_db)
+        cached = response_cache.set(key, latest_page.model_dump_json(by_alias=True).encode(), generation)
+        return _json_response(request, cached)
+
+    return _get_channel_messages(channel_id, limit, offset, since, db)
+
+
+def _get_channel_messages(
+    channel_id: str, limit: int, offset: int, since: str | None, db: Session
 ) -> MessagesListResponse:
-    """指定チャンネルのメッセージ履歴取得"""
+    """メッセージ履歴をDBから取得"""
     # チャンネルの存在確認
     channel = db.query(Channel).filter(Channel.id == channel_id).first()
     if not channel:
         raise HTTPException(status_code=404, detail="チャンネルが見つかりません")
 
+    # 総数取得
+    total = crud.get_channel_messages_count(db, channel_id)
+
+    if since is not None:
+        watermark = _parse_watermark(since)
+        message_models, has_more = crud.get_messages_since(db, {channel_id: watermark}, limit)[channel_id]
+        messages = [MessageResponse.model_validate(msg) for msg in message_models]
+        return MessagesListResponse(messages=messages, total=total, has_more=has_more)
+
     # メッセージ取得
     message_models = crud.get_channel_messages(db, channel_id, offset, limit)
     messages = [MessageResponse.model_validate(msg) for msg in message_models]
-
-    # 総数取得
-    total = crud.get_channel_messages_count(db, channel_id)
     has_more = (offset + limit) < total
 
     return MessagesListResponse(messages=messages, total=total, has_more=has_more)
 
 
+def _parse_watermark(since: str | None) -> crud.MessageWatermark:
+    """差分取得の基準を解釈（不正な日時は400エラー）"""
+    try:
+        return crud.parse_message_watermark(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"sinceの形式が不正です: {since}") from e
+
+
+@app.get("/api/channels/{channel_id}/export")
+async def export_channel_messages(
+    channel_id: str,
+    export_format: str = Query("ndjson", alias="format"),
+    compress: bool = Query(False, alias="gzip"),
+    db: Session = Depends(get_replica_db),  # noqa: B008
+) -> StreamingResponse:
+    """指定チャンネルの全メッセージを古い順にストリーミングでエクスポート（NDJSON / CSV、gzip圧縮も可）"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"formatは{' / '.join(EXPORT_FORMATS)}で指定してください")
+    if db.query(Channel).filter(Channel.id == channel_id).first() is None:
+        raise HTTPException(status_code=404, detail="チャンネルが見つかりません")
+
+    def stream() -> Iterator[bytes]:
+        # FastAPIのバージョンによってはレスポンスの送信前にセッションが閉じられるため、送信後にもう一度閉じる
+        try:
+            yield from encode_export(iter_channel_history(db, channel_id), export_format, compress)
+        finally:
+            db.close()
+
+    filename = export_filename(channel_id, export_format, compress)
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip" if compress else EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"},
+    )
+
+
+# 検索の制限値
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 100
+MAX_SEARCH_QUERY_LENGTH = 200
+
+
+@app.get("/api/search", response_model=SearchResponse)
+async def search_messages(
+    q: str,
+    channel_id: str | None = None,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    offset: int = 0,
+    db: Session = Depends(get_replica_db),  # noqa: B008
+) -> SearchResponse:
+    """メッセージ本文の全文検索（空白区切りの全ての語を含むメッセージを新しい順に返す）"""
+    if not q.strip() or len(q) > MAX_SEARCH_QUERY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"検索文字列は1〜{MAX_SEARCH_QUERY_LENGTH}文字で指定してください")
+    if not 1 <= limit <= MAX_SEARCH_LIMIT or offset < 0:
+        raise HTTPException(status_code=400, detail=f"limitは1〜{MAX_SEARCH_LIMIT}、offsetは0以上で指定してください")
+
+    message_models, has_more = crud.search_messages(db, q, channel_id, limit, offset)
+    return SearchResponse(messages=[MessageResponse.model_validate(msg) for msg in message_models], has_more=has_more)
+
+
+@app.post("/api/sync", response_model=SyncResponse)
+async def sync_messages(request: SyncRequest, db: Session = Depends(get_read_db)) -> SyncResponse:  # noqa: B008
+    """再接続したクライアント向けの差分同期
+
+    チャンネルごとの基準（最後に受け取ったメッセージ）より新しいメッセージだけを、
+    全チャンネル分まとめて1回のクエリで返す。
+    """
+    watermarks = {channel.channel_id: _parse_watermark(channel.since) for channel in request.channels}
+    results = crud.get_messages_since(db, watermarks, request.limit)
+    return SyncResponse(
+        channels=[
+            SyncChannelMessages(
+                channel_id=channel_id,
+                messages=[MessageResponse.model_validate(msg) for msg in message_models],
+                has_more=has_more,
+            )
+            for channel_id, (message_models, has_more) in results.items()
+        ]
+    )
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket) -> None:
-    """WebSocketエンドポイント."""
+    """WebSocketエンドポイント.
+
+    メッセージの形式は接続時のサブプロトコルで選ぶ（なしの場合はJSON、ai-community.msgpack の場合はMessagePack）。
+    """
     await manager.connect(websocket)
+    codec = manager.codec_for(websocket)
     try:
         while True:
-            data = await websocket.receive_text()
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received["code"], received.get("reason"))
+            data = received["text"] if received.get("text") is not None else received.get("bytes", b"")
             try:
-                message = json.loads(data)
+                message = codec.decode(data)
                 # データベースセッションを作成して渡す
-                db = SessionLocal()
+                # （SQLiteの書き込みスレッドが有効な場合、保存は書き込みスレッドで行うため読み込み用のセッションを使う。
+                #   保存したメッセージをAIの会話履歴に含めるため、レプリカではなくプライマリから読み込む）
+                db = ReadSessionLocal()
                 try:
                     await handle_websocket_message(websocket, message, db_session=db)
                 finally:
                     db.close()
-            except json.JSONDecodeError:
-                logger.error(f"無効なJSONを受信: {data}")
+            except MessageDecodeError:
+                logger.error(f"無効な{codec.label}を受信: {data!r}")
                 # クライアントにエラー応答を送信
-                error_response = {"type": "error", "data": {"success": False, "error": "無効なJSON形式"}}
-                await websocket.send_text(json.dumps(error_response))
+                error_response = {"type": "error", "data": {"success": False, "error": f"無効な{codec.label}形式"}}
+                await manager.send_personal_message(error_response, websocket)
             except Exception as e:
                 logger.error(f"WebSocketメッセージ処理エラー: {e!s}")
                 # 一般的なエラー応答を送信
                 error_response = {"type": "error", "data": {"success": False, "error": "内部サーバーエラー"}}
-                await websocket.send_text(json.dumps(error_response))
+                await manager.send_personal_message(error_response, websocket)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -5,7 +5,7 @@ ChannelとMessageのSQLAlchemyモデルを定義し、チャットアプリケ
 
 from datetime import UTC, datetime
 
-from sqlalchemy import String, Text
+from sqlalchemy import DDL, Index, String, Text, event
 from sqlalchemy.orm import Mapped, mapped_column
 
 try:
@@ -29,6 +29,8 @@ class Message(Base):
     """チャットメッセージモデル"""
 
     __tablename__ = "messages"
+    # チャンネルごとの新着順取得・差分同期（created_atでの絞り込み）用
+    __table_args__ = (Index("ix_messages_channel_id_created_at", "channel_id", "created_at"),)
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
     channel_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
@@ -39,3 +41,39 @@ class Message(Base):
     timestamp: Mapped[datetime] = mapped_column(nullable=False)
     is_own_message: Mapped[bool] = mapped_column(default=False)
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+
+
+# 全文検索インデックス
+#
+# 日本語は単語の区切りがないため、文字の3-gramでインデックスする。
+# - SQLite: FTS5のtrigramトークナイザ（messagesを外部コンテンツとし、トリガーで差分更新）
+# - PostgreSQL: pg_trgmのGINインデックス（ILIKEによる部分一致検索を高速化）
+# 本番DBではAlembicマイグレーションで作成し、create_all（テスト・ベンチマーク）では以下のDDLで作成する
+MESSAGES_FTS_TABLE = "messages_fts"
+
+SQLITE_SEARCH_INDEX_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {MESSAGES_FTS_TABLE} USING fts5("
+    "content, content='messages', content_rowid='rowid', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO {MESSAGES_FTS_TABLE}(rowid, content) VALUES (new.rowid, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO {MESSAGES_FTS_TABLE}({MESSAGES_FTS_TABLE}, rowid, content) VALUES ('delete', old.rowid, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO {MESSAGES_FTS_TABLE}({MESSAGES_FTS_TABLE}, rowid, content) VALUES ('delete', old.rowid, old.content);
+        INSERT INTO {MESSAGES_FTS_TABLE}(rowid, content) VALUES (new.rowid, new.content);
+    END""",
+)
+POSTGRESQL_SEARCH_INDEX_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_messages_content_trgm ON messages USING gin (content gin_trgm_ops)",
+)
+
+for _statement in SQLITE_SEARCH_INDEX_DDL:
+    event.listen(Message.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in POSTGRESQL_SEARCH_INDEX_DDL:
+    event.listen(Message.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+event.listen(
+    Message.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {MESSAGES_FTS_TABLE}").execute_if(dialect="sqlite")
+)
@@ -6,8 +6,19 @@ FastAPIのAPIエンドポイントで使用されるPydanticスキーマとデ
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from enum import Enum
+from typing import Annotated, Any
 
-from pydantic import BaseModel, ConfigDict, field_serializer
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    Field,
+    StrictBool,
+    StrictStr,
+    field_serializer,
+)
+from pydantic_core import PydanticCustomError
 
 
 class UserType(str, Enum):
@@ -75,6 +86,44 @@ class MessageCreate(MessageBase):
     pass
 
 
+# WebSocketで受信するメッセージ本文の最大文字数
+MAX_MESSAGE_LENGTH = 10000
+
+
+def _require_str(value: Any) -> Any:  # noqa: ANN401
+    """文字列以外を拒否（日時への変換前に検査する）"""
+    if not isinstance(value, str):
+        raise PydanticCustomError("string_type", "Input should be a valid string")
+    return value
+
+
+def _validate_content(content: str) -> str:
+    """メッセージ本文の空・長さを検査"""
+    if not content.strip():
+        raise PydanticCustomError("content_empty", "メッセージ内容は空にできません")
+    if len(content) > MAX_MESSAGE_LENGTH:
+        raise PydanticCustomError("content_too_long", "メッセージが長すぎます")
+    return content
+
+
+class IncomingMessage(MessageCreate):
+    """WebSocketで受信するメッセージ（message:sendのdata）用スキーマ.
+
+    必須フィールドの型（文字列・真偽値）と本文の空・長さを、日時の変換と合わせて1回の検証で確認します。
+    キーはsnake_caseのみ受け付けます。
+    """
+
+    model_config = ConfigDict(alias_generator=to_camel, validate_by_name=True, validate_by_alias=False)
+
+    id: StrictStr
+    channel_id: StrictStr
+    user_id: StrictStr
+    user_name: StrictStr
+    content: Annotated[StrictStr, AfterValidator(_validate_content)]
+    timestamp: Annotated[datetime, BeforeValidator(_require_str)]
+    is_own_message: StrictBool
+
+
 class MessageResponse(MessageBase):
     """メッセージレスポンス用スキーマ.
 
@@ -137,6 +186,63 @@ class MessagesListResponse(BaseModel):
     has_more: bool
 
 
+class SearchResponse(BaseModel):
+    """メッセージ検索レスポンス用スキーマ.
+
+    検索結果のメッセージを新しい順に返します。hasMoreがtrueの場合はoffsetをずらして続きを取得します。
+    """
+
+    model_config = ConfigDict(alias_generator=to_camel, validate_by_name=True, validate_by_alias=True)
+
+    messages: list[MessageResponse]
+    has_more: bool
+
+
+class SyncChannelWatermark(BaseModel):
+    """差分同期リクエストのチャンネルごとの基準.
+
+    sinceにはクライアントが最後に受け取ったメッセージのID、またはcreated_at（ISO 8601）を指定します。
+    """
+
+    model_config = ConfigDict(alias_generator=to_camel, validate_by_name=True, validate_by_alias=True)
+
+    channel_id: str
+    since: str | None = None
+
+
+class SyncRequest(BaseModel):
+    """差分同期リクエスト用スキーマ.
+
+    再接続したクライアントが、チャンネルごとの基準より新しいメッセージをまとめて取得する際に使用されるスキーマです。
+    """
+
+    model_config = ConfigDict(alias_generator=to_camel, validate_by_name=True, validate_by_alias=True)
+
+    channels: list[SyncChannelWatermark] = Field(max_length=50)
+    limit: int = Field(default=100, ge=1, le=1000)
+
+
+class SyncChannelMessages(BaseModel):
+    """差分同期レスポンスのチャンネルごとの結果.
+
+    hasMoreがtrueの場合は基準との間にメッセージが残っているため、messagesで表示を置き換えます。
+    """
+
+    model_config = ConfigDict(alias_generator=to_camel, validate_by_name=True, validate_by_alias=True)
+
+    channel_id: str
+    messages: list[MessageResponse]
+    has_more: bool
+
+
+class SyncResponse(BaseModel):
+    """差分同期レスポンス用スキーマ."""
+
+    model_config = ConfigDict(alias_generator=to_camel, validate_by_name=True, validate_by_alias=True)
+
+    channels: list[SyncChannelMessages]
+
+
 @dataclass
 class MessageBroadcastData:
     """ブロードキャスト用メッセージデータ."""
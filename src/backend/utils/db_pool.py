@@ -0,0 +1,123 @@
+"""DB接続プールの計測とサイズ設定
+
+接続プールの空き待ち時間・タイムアウト・接続の経過時間をメトリクスに記録し、
+プールのサイズを環境変数のプロファイルで切り替えられるようにする。
+実際の待ち時間と使用中の接続数（db_pool_connections）を見てプロファイルを選ぶ。
+
+環境変数:
+    DB_POOL_PROFILE: development（デフォルト） / production / minimal
+    DB_POOL_SIZE: 常に保持する接続数（プロファイルの値を上書き）
+    DB_MAX_OVERFLOW: 一時的に追加できる接続数（プロファイルの値を上書き）
+    DB_POOL_TIMEOUT: 接続の空き待ちの上限（秒。プロファイルの値を上書き）
+    DB_POOL_RECYCLE: 接続を作り直すまでの時間（秒。プロファイルの値を上書き）
+"""
+
+import dataclasses
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+
+try:
+    # パッケージとして実行される場合
+    from .metrics import DB_POOL_CHECKOUT_TIMEOUTS, DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTION_AGE
+except ImportError:
+    # 直接実行される場合
+    from utils.metrics import DB_POOL_CHECKOUT_TIMEOUTS, DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTION_AGE
+
+
+@dataclass(frozen=True)
+class PoolProfile:
+    """接続プールのサイズ設定"""
+
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int = 3600
+
+    @classmethod
+    def from_env(cls) -> "PoolProfile":
+        """環境変数からプロファイルを読み込み、個別の指定で上書きする"""
+        name = os.getenv("DB_POOL_PROFILE", "development")
+        if name not in POOL_PROFILES:
+            raise ValueError(f"未対応のDB_POOL_PROFILEです: {name}（{' / '.join(POOL_PROFILES)}）")
+        profile = POOL_PROFILES[name]
+        return dataclasses.replace(
+            profile,
+            pool_size=int(os.getenv("DB_POOL_SIZE", str(profile.pool_size))),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", str(profile.max_overflow))),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", str(profile.pool_timeout))),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", str(profile.pool_recycle))),
+        )
+
+    def engine_options(self) -> dict[str, Any]:
+        """create_engineに渡す接続プールの設定"""
+        return {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": True,  # 接続の有効性チェック
+        }
+
+
+POOL_PROFILES = {
+    # ローカル開発（従来の設定）
+    "development": PoolProfile(pool_size=5, max_overflow=10, pool_timeout=30),
+    # 本番: バーストに備えて接続を多めに持ち、空きがない場合は30秒待たずに早めにエラーにする
+    "production": PoolProfile(pool_size=20, max_overflow=20, pool_timeout=5, pool_recycle=1800),
+    # 接続数の上限が小さいDB（Supabaseの無料プラン等）
+    "minimal": PoolProfile(pool_size=2, max_overflow=3, pool_timeout=10),
+}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """接続の取得にかかった時間とタイムアウトを記録するQueuePool"""
+
+    # メトリクスのラベルに使う接続先の名前（instrument_engineで設定）
+    target = "unknown"
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        """接続を取得（空き待ち・新規接続の時間を含めて記録。競合時の内部の再試行分も記録される）"""
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.inc(target=self.target)
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, target=self.target)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        """dispose()で作り直したプールにも接続先の名前を引き継ぐ"""
+        pool = super().recreate()
+        assert isinstance(pool, InstrumentedQueuePool)
+        pool.target = self.target
+        return pool
+
+
+def instrument_engine(engine: Engine, target: str) -> None:
+    """エンジンの接続プールに接続先の名前を設定し、接続の経過時間を記録するイベントを登録
+
+    Args:
+        engine: poolclass=InstrumentedQueuePool で作成したエンジン
+        target: メトリクスのラベルに使う接続先の名前（primary / read / replica_N）
+
+    """
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.target = target
+
+    @event.listens_for(engine, "connect")
+    def record_connected_at(_dbapi_connection: Any, connection_record: Any) -> None:  # noqa: ANN401
+        connection_record.info["connected_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def observe_connection_age(_dbapi_connection: Any, connection_record: Any, _connection_proxy: Any) -> None:  # noqa: ANN401
+        connected_at = connection_record.info.get("connected_at")
+        if connected_at is not None:
+            DB_POOL_CONNECTION_AGE.observe(time.monotonic() - connected_at, target=target)
@@ -1,29 +1,68 @@
 """Discord Webhook送信ユーティリティ"""
 
+import asyncio
 import logging
 import os
-import time
 
 import httpx
 
+try:
+    # パッケージとして実行される場合
+    from .rate_limiter import SlidingWindowRateLimiter
+except ImportError:
+    # 直接実行される場合
+    from utils.rate_limiter import SlidingWindowRateLimiter
+
 logger = logging.getLogger(__name__)
 
 
 class DiscordWebhookSender:
-    """Discord Webhook送信クラス"""
+    """Discord Webhook送信クラス
+
+    送信はバックグラウンドの配信キューで行い、AI応答のブロードキャストが
+    Discordへの送信を待たないようにする。短時間に続いたメッセージは
+    Discordの文字数制限内で1回のWebhook送信にまとめる。
+    """
 
     # Discord API制約
     MAX_MESSAGE_LENGTH = 2000
     RATE_LIMIT_MESSAGES = 30
     RATE_LIMIT_WINDOW = 60  # 60秒
 
-    def __init__(self) -> None:
-        """初期化"""
+    # 配信キュー設定
+    QUEUE_MAX_SIZE = 1000
+    BATCH_WINDOW_SECONDS = 0.5  # バーストをまとめるための待ち時間
+    REQUEST_TIMEOUT_SECONDS = 10.0
+    MAX_RATE_LIMIT_RETRIES = 3
+    SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None) -> None:
+        """初期化
+
+        Args:
+            transport: HTTPトランスポート（テスト用。省略時はhttpxのデフォルト）
+
+        """
         self.webhook_url = os.environ.get("DISCORD_WEBHOOK_URL")
-        self.message_timestamps: list[float] = []
+        self._transport = transport
+        self.rate_limiter = SlidingWindowRateLimiter(
+            max_calls=self.RATE_LIMIT_MESSAGES, window_seconds=self.RATE_LIMIT_WINDOW, name="discord_webhook"
+        )
+        self._client: httpx.AsyncClient | None = None
+        self._queue: asyncio.Queue[str] | None = None
+        self._worker_task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # 文字数制限のため前回のバッチに入りきらなかったメッセージ
+        self._carry_over: str | None = None
         if not self.webhook_url:
             logger.warning("DISCORD_WEBHOOK_URL環境変数が設定されていません。Discord送信機能は無効です。")
 
+    @property
+    def queue_depth(self) -> int:
+        """配信待ちのメッセージ数"""
+        pending = 1 if self._carry_over is not None else 0
+        return (self._queue.qsize() if self._queue is not None else 0) + pending
+
     def _escape_discord_markdown(self, text: str) -> str:
         """Discord Markdownの特殊文字をエスケープ"""
         special_chars = ["*", "_", "`", "~", "|", "\\", ">"]
@@ -42,78 +81,200 @@ class DiscordWebhookSender:
         logger.warning(f"Discord メッセージが長すぎるため切り詰めました: {len(message)} -> {len(truncated)} 文字")
         return truncated
 
-    def _check_rate_limit(self) -> bool:
-        """レート制限チェック（30件/分）"""
-        current_time = time.time()
+    def _format_message(self, ai_name: str, message_content: str) -> str:
+        """Discord送信用にメッセージを整形"""
+        # Markdown特殊文字をエスケープ
+        escaped_ai_name = self._escape_discord_markdown(ai_name)
+        escaped_message_content = self._escape_discord_markdown(message_content)
+
+        # Discord送信内容: 1行目にAI名、2行目にメッセージ本文、最下部に区切り線
+        discord_message = f"{escaped_ai_name}\n{escaped_message_content}\n{'-' * 20}"
 
-        # 60秒以内のタイムスタンプのみを保持
-        self.message_timestamps = [
-            timestamp for timestamp in self.message_timestamps if current_time - timestamp < self.RATE_LIMIT_WINDOW
-        ]
+        # メッセージ長制限チェック
+        return self._truncate_message(discord_message)
 
-        # レート制限チェック
-        if len(self.message_timestamps) >= self.RATE_LIMIT_MESSAGES:
-            logger.warning(
-                f"Discord API レート制限に達しました: {len(self.message_timestamps)}件/{self.RATE_LIMIT_WINDOW}秒"
+    def _get_client(self) -> httpx.AsyncClient:
+        """接続を使い回すための共有HTTPクライアントを取得"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.REQUEST_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+                headers={"Content-Type": "application/json"},
+                transport=self._transport,
             )
-            return False
+        return self._client
 
-        # 現在のタイムスタンプを追加
-        self.message_timestamps.append(current_time)
-        return True
+    def _ensure_worker(self) -> asyncio.Queue[str]:
+        """配信キューとワーカーを準備（イベントループが変わった場合は作り直す）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 別のイベントループに紐づいたキュー・接続は使えないため破棄
+            self._queue = None
+            self._worker_task = None
+            self._client = None
+            self._carry_over = None
+            self._loop = loop
 
-    async def send_ai_message(self, ai_name: str, message_content: str) -> bool:
-        """AIメッセージをDiscordに送信
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.QUEUE_MAX_SIZE)
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._delivery_loop())
+        return self._queue
+
+    def enqueue_ai_message(self, ai_name: str, message_content: str) -> bool:
+        """AIメッセージを配信キューに追加（送信完了は待たない）
 
         Args:
             ai_name: AI人格名（例: "レン", "ミナ"）
             message_content: メッセージ本文
 
         Returns:
-            送信成功: True, 失敗: False
+            キュー追加成功: True, 失敗: False
 
         """
         if not self.webhook_url:
             logger.debug("Discord Webhook URLが未設定のため送信をスキップ")
             return False
 
-        # レート制限チェック
-        if not self._check_rate_limit():
-            logger.warning("Discord レート制限のため送信をスキップ")
+        queue = self._ensure_worker()
+        try:
+            queue.put_nowait(self._format_message(ai_name, message_content))
+        except asyncio.QueueFull:
+            logger.warning(f"Discord 配信キューが満杯のため送信をスキップ: {ai_name}")
             return False
+        return True
 
-        # Markdown特殊文字をエスケープ
-        escaped_ai_name = self._escape_discord_markdown(ai_name)
-        escaped_message_content = self._escape_discord_markdown(message_content)
+    async def _next_batch(self, queue: asyncio.Queue[str]) -> list[str]:
+        """キューからメッセージを取り出し、文字数制限内でまとめる"""
+        first = self._carry_over if self._carry_over is not None else await queue.get()
+        self._carry_over = None
 
-        # Discord送信内容: 1行目にAI名、2行目にメッセージ本文、最下部に区切り線
-        discord_message = f"{escaped_ai_name}\n{escaped_message_content}\n{'-' * 20}"
+        batch = [first]
+        length = len(first)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.BATCH_WINDOW_SECONDS
 
-        # メッセージ長制限チェック
-        discord_message = self._truncate_message(discord_message)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except TimeoutError:
+                break
 
-        payload = {"content": discord_message}
+            # 改行1文字で連結するため+1
+            if length + 1 + len(message) > self.MAX_MESSAGE_LENGTH:
+                self._carry_over = message
+                break
+            batch.append(message)
+            length += 1 + len(message)
 
+        if len(batch) > 1:
+            logger.debug(f"Discord メッセージを結合: {len(batch)}件, {length}文字")
+        return batch
+
+    async def _delivery_loop(self) -> None:
+        """配信キューのメインループ"""
+        queue = self._queue
+        assert queue is not None
+        try:
+            while True:
+                batch = await self._next_batch(queue)
+                try:
+                    # レート制限（30件/分）に達している場合は枠が空くまで待機
+                    await self.rate_limiter.acquire()
+                    await self._post("\n".join(batch))
+                except Exception as e:
+                    logger.error(f"Discord Webhook送信エラー: {e!s}")
+                finally:
+                    for _ in batch:
+                        queue.task_done()
+        except asyncio.CancelledError:
+            logger.debug("Discord 配信ループが停止されました")
+            raise
+
+    async def _post(self, content: str) -> bool:
+        """Webhookに送信（429の場合はretry_afterだけ待って再送）"""
+        assert self.webhook_url is not None
+        client = self._get_client()
+
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            response = await client.post(self.webhook_url, json={"content": content})
+
+            if response.status_code == 204:
+                logger.info(f"Discord Webhook送信成功: {len(content)}文字")
+                return True
+
+            if response.status_code == 429 and attempt < self.MAX_RATE_LIMIT_RETRIES:
+                retry_after = self._parse_retry_after(response)
+                logger.warning(f"Discord API 429のため{retry_after:.2f}秒後に再送します")
+                await asyncio.sleep(retry_after)
+                continue
+
+            logger.error(f"Discord Webhook送信失敗: {response.status_code} - {response.text}")
+            return False
+
+        return False
+
+    @staticmethod
+    def _parse_retry_after(response: httpx.Response) -> float:
+        """429レスポンスから待機秒数を取得（本文のretry_after、なければRetry-Afterヘッダー）"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.webhook_url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=10.0,
-                )
+            retry_after = response.json().get("retry_after")
+            if retry_after is not None:
+                return max(float(retry_after), 0.0)
+        except Exception:
+            pass
 
-                if response.status_code == 204:
-                    logger.info(f"Discord Webhook送信成功: {escaped_ai_name}")
-                    return True
+        try:
+            return max(float(response.headers.get("Retry-After", "1")), 0.0)
+        except ValueError:
+            return 1.0
 
-                logger.error(f"Discord Webhook送信失敗: {response.status_code} - {response.text}")
-                return False
+    async def send_ai_message(self, ai_name: str, message_content: str) -> bool:
+        """AIメッセージをDiscordに即時送信（配信キューを経由しない）
 
+        Args:
+            ai_name: AI人格名（例: "レン", "ミナ"）
+            message_content: メッセージ本文
+
+        Returns:
+            送信成功: True, 失敗: False
+
+        """
+        if not self.webhook_url:
+            logger.debug("Discord Webhook URLが未設定のため送信をスキップ")
+            return False
+
+        try:
+            # レート制限（30件/分）に達している場合は枠が空くまで待機
+            await self.rate_limiter.acquire()
+            return await self._post(self._format_message(ai_name, message_content))
         except Exception as e:
             logger.error(f"Discord Webhook送信エラー: {e!s}")
             return False
 
+    async def close(self) -> None:
+        """配信待ちのメッセージを送り切ってから停止し、HTTPクライアントを閉じる"""
+        if self._worker_task is not None and not self._worker_task.done():
+            queue = self._queue
+            try:
+                if queue is not None:
+                    await asyncio.wait_for(queue.join(), timeout=self.SHUTDOWN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                logger.warning(f"Discord 配信キューに未送信のメッセージが残っています: {self.queue_depth}件")
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+        self._worker_task = None
+
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
 
 # グローバルインスタンス
 discord_sender = DiscordWebhookSender()
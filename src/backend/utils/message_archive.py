@@ -0,0 +1,361 @@
+"""古いメッセージのアーカイブ
+
+一定期間より古いメッセージをDBから取り出し、チャンネル・月ごとのgzip圧縮したNDJSONファイル
+（セグメント）としてローカルディスクに保存する。DBには直近のメッセージだけが残るため、
+よく読まれるインデックス・パーティションが小さく保たれる。
+
+- アーカイブは月単位で行う（PostgreSQLの月別パーティションを丸ごと削除できるようにする）
+- セグメント内は新しい順に並べ、crud.get_channel_messagesがDBの続きとして読み込む
+- 各セグメントの件数はmanifest.jsonにまとめ、件数の集計やページ位置の計算でファイルを開かずに済ませる
+- 処理の途中で終了しても、再実行時にIDで重複を除いてセグメントを作り直し、manifestはファイルから再作成する
+
+環境変数:
+    MESSAGE_ARCHIVE_DIR: アーカイブの保存先（デフォルト src/backend/message_archive。テスト環境では指定時のみ使用）
+"""
+
+import gzip
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+try:
+    # パッケージとして実行される場合
+    from ..models import Message
+except ImportError:
+    # 直接実行される場合
+    from models import Message
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = Path(__file__).parent.parent / "message_archive"
+MANIFEST_FILE = "manifest.json"
+SEGMENT_SUFFIX = ".ndjson.gz"
+# 1回のDELETEで削除するメッセージ数
+DELETE_BATCH_SIZE = 1000
+# 展開済みのセグメントを保持する数
+SEGMENT_CACHE_SIZE = 16
+
+_MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+_PARTITION_PATTERN = re.compile(r"^messages_(\d{4})_(\d{2})$")
+
+# セグメントに保存する列
+_ARCHIVED_COLUMNS = (
+    "id",
+    "channel_id",
+    "user_id",
+    "user_name",
+    "user_type",
+    "content",
+    "timestamp",
+    "is_own_message",
+    "created_at",
+)
+
+
+@dataclass(frozen=True)
+class ArchiveSegment:
+    """1チャンネル・1か月分のアーカイブファイル"""
+
+    channel_id: str
+    month: str  # YYYY-MM
+    count: int
+    path: Path
+
+
+def _message_to_record(message: Message) -> dict[str, Any]:
+    """メッセージをセグメントの1行（JSON）に変換"""
+    record = {column: getattr(message, column) for column in _ARCHIVED_COLUMNS}
+    record["timestamp"] = message.timestamp.isoformat()
+    record["created_at"] = message.created_at.isoformat()
+    return record
+
+
+def _record_to_message(record: dict[str, Any]) -> Message:
+    """セグメントの1行をメッセージ（セッションに属さないオブジェクト）に変換"""
+    return Message(
+        **{
+            **record,
+            "timestamp": datetime.fromisoformat(record["timestamp"]),
+            "created_at": datetime.fromisoformat(record["created_at"]),
+        }
+    )
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def _load_segment(path: Path, _mtime_ns: int) -> tuple[dict[str, Any], ...]:
+    """セグメントを展開して読み込む（更新日時をキーに含め、書き換えられたファイルは読み直す）"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return tuple(json.loads(line) for line in f)
+
+
+def _month_start(value: datetime) -> datetime:
+    """日時が属する月の初日"""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(value: datetime) -> datetime:
+    """翌月の初日"""
+    return _month_start(value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1, day=1))
+
+
+class MessageArchive:
+    """アーカイブファイルの読み書きを行うクラス"""
+
+    def __init__(self, root: str | Path) -> None:
+        """初期化
+
+        Args:
+            root: アーカイブの保存先ディレクトリ
+
+        """
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._manifest_mtime_ns: int | None = None
+        self._segments: dict[str, list[ArchiveSegment]] = {}
+
+    @property
+    def manifest_path(self) -> Path:
+        """manifest.jsonのパス"""
+        return self.root / MANIFEST_FILE
+
+    def _segment_path(self, channel_id: str, month: str) -> Path:
+        # チャンネルIDをそのままディレクトリ名に使わない（パス区切り文字等を含む場合に備える）
+        return self.root / channel_id.encode().hex() / f"{month}{SEGMENT_SUFFIX}"
+
+    def _channel_segments(self, channel_id: str) -> list[ArchiveSegment]:
+        """チャンネルのセグメントを新しい月から順に取得（manifestが更新されていれば読み直す）"""
+        try:
+            mtime_ns = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            if mtime_ns != self._manifest_mtime_ns:
+                manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+                self._segments = {
+                    channel: [
+                        ArchiveSegment(channel, entry["month"], entry["count"], self.root / entry["file"])
+                        for entry in entries
+                    ]
+                    for channel, entries in manifest["channels"].items()
+                }
+                self._manifest_mtime_ns = mtime_ns
+            return self._segments.get(channel_id, [])
+
+    def count(self, channel_id: str) -> int:
+        """チャンネルのアーカイブ済みメッセージ数"""
+        return sum(segment.count for segment in self._channel_segments(channel_id))
+
+    def read(self, channel_id: str, skip: int, limit: int) -> list[Message]:
+        """アーカイブ済みメッセージを新しい順に取得
+
+        Args:
+            channel_id: チャンネルID
+            skip: アーカイブ内の最も新しいメッセージから読み飛ばす件数
+            limit: 取得する最大件数
+
+        Returns:
+            新しい順のメッセージ（セッションに属さないオブジェクト）
+
+        """
+        messages: list[Message] = []
+        for segment in self._channel_segments(channel_id):
+            if len(messages) >= limit:
+                break
+            if skip >= segment.count:
+                skip -= segment.count
+                continue
+            records = _load_segment(segment.path, segment.path.stat().st_mtime_ns)
+            messages.extend(_record_to_message(record) for record in records[skip : skip + limit - len(messages)])
+            skip = 0
+        return messages
+
+    def iter_oldest_first(self, channel_id: str) -> Iterator[Message]:
+        """チャンネルのアーカイブ済みメッセージを古い順に取得（エクスポート用。展開したファイルはキャッシュしない）"""
+        for segment in reversed(self._channel_segments(channel_id)):
+            with gzip.open(segment.path, "rt", encoding="utf-8") as f:
+                records = f.readlines()
+            for line in reversed(records):
+                yield _record_to_message(json.loads(line))
+
+    def write_segment(self, channel_id: str, month: str, messages: Iterable[Message]) -> int:
+        """1チャンネル・1か月分のメッセージをセグメントに書き込む（既存のセグメントとはIDで重複を除いて統合）
+
+        Returns:
+            セグメントのメッセージ数
+
+        """
+        path = self._segment_path(channel_id, month)
+        records: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            records.update((record["id"], record) for record in _load_segment(path, path.stat().st_mtime_ns))
+        records.update((message.id, _message_to_record(message)) for message in messages)
+
+        ordered = sorted(records.values(), key=lambda record: (record["created_at"], record["id"]), reverse=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for record in ordered:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        tmp_path.replace(path)
+        return len(ordered)
+
+    def rebuild_manifest(self) -> None:
+        """セグメントファイルからmanifest.jsonを作り直す"""
+        channels: dict[str, list[dict[str, Any]]] = {}
+        for path in sorted(self.root.glob(f"*/*{SEGMENT_SUFFIX}"), reverse=True):
+            month = path.name.removesuffix(SEGMENT_SUFFIX)
+            if not _MONTH_PATTERN.match(month):
+                continue
+            channel_id = bytes.fromhex(path.parent.name).decode()
+            count = len(_load_segment(path, path.stat().st_mtime_ns))
+            channels.setdefault(channel_id, []).append(
+                {"month": month, "count": count, "file": path.relative_to(self.root).as_posix()}
+            )
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(MANIFEST_FILE + ".tmp")
+        tmp_path.write_text(json.dumps({"channels": channels}, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(self.manifest_path)
+
+
+def _iter_month_groups(db: Session, channel_id: str, before: datetime) -> Iterator[tuple[str, list[Message]]]:
+    """チャンネルのアーカイブ対象のメッセージを月ごとにまとめて取得"""
+    statement = (
+        select(Message)
+        .where(Message.channel_id == channel_id, Message.created_at < before)
+        .order_by(Message.created_at)
+        .execution_options(yield_per=DELETE_BATCH_SIZE)
+    )
+    for month, messages in itertools.groupby(db.scalars(statement), key=lambda m: m.created_at.strftime("%Y-%m")):
+        yield month, list(messages)
+
+
+def archive_messages(db: Session, archive: MessageArchive, before: datetime) -> int:
+    """指定日時より前の月のメッセージをアーカイブしてDBから削除
+
+    Args:
+        db: データベースセッション
+        archive: 保存先のアーカイブ
+        before: この日時が属する月より前のメッセージを対象にする（月の途中は切り捨て）
+
+    Returns:
+        アーカイブしたメッセージ数
+
+    """
+    # 中断された前回の処理で作成したセグメントもmanifestに反映しておく
+    archive.rebuild_manifest()
+    # DBのcreated_atはタイムゾーンなしのUTCで保存されている
+    cutoff = _month_start(before.astimezone(UTC).replace(tzinfo=None) if before.tzinfo else before)
+
+    archived = 0
+    channel_ids = list(db.scalars(select(Message.channel_id).where(Message.created_at < cutoff).distinct()))
+    for channel_id in channel_ids:
+        archived_ids: list[str] = []
+        for month, messages in _iter_month_groups(db, channel_id, cutoff):
+            archive.write_segment(channel_id, month, messages)
+            archived_ids.extend(message.id for message in messages)
+
+        # セグメントを書き終えてから削除する（削除前に終了した場合は再実行時に重複を除いて書き直す）
+        for start in range(0, len(archived_ids), DELETE_BATCH_SIZE):
+            batch = archived_ids[start : start + DELETE_BATCH_SIZE]
+            db.execute(delete(Message).where(Message.id.in_(batch), Message.created_at < cutoff))
+        db.commit()
+        archived += len(archived_ids)
+        logger.info(f"メッセージをアーカイブしました: channel_id={channel_id}, {len(archived_ids)}件")
+
+    archive.rebuild_manifest()
+    if db.get_bind().dialect.name == "postgresql" and is_partitioned(db):
+        drop_empty_partitions(db, cutoff)
+    return archived
+
+
+def is_partitioned(db: Session) -> bool:
+    """messagesテーブルが月別パーティションか（PostgreSQLのみ）"""
+    return db.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('messages')")).scalar() == "p"
+
+
+def ensure_partitions(db: Session, months_ahead: int = 3) -> list[str]:
+    """今月から指定した月数先までの月別パーティションを作成（PostgreSQLのみ）
+
+    Returns:
+        新たに作成したパーティション名
+
+    """
+    existing = set(_partition_names(db))
+    created = []
+    month = _month_start(datetime.now(UTC).replace(tzinfo=None))
+    for _ in range(months_ahead + 1):
+        name = f"messages_{month:%Y_%m}"
+        if name not in existing:
+            db.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF messages "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+                )
+            )
+            created.append(name)
+        month = _next_month(month)
+    db.commit()
+    return created
+
+
+def drop_empty_partitions(db: Session, before: datetime) -> list[str]:
+    """指定日時より前に終わる空の月別パーティションを削除（PostgreSQLのみ）
+
+    Returns:
+        削除したパーティション名
+
+    """
+    dropped = []
+    for name in _partition_names(db):
+        match = _PARTITION_PATTERN.match(name)
+        if match is None:
+            continue
+        month_end = _next_month(datetime(int(match.group(1)), int(match.group(2)), 1))
+        if month_end > before:
+            continue
+        if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    db.commit()
+    if dropped:
+        logger.info(f"空のパーティションを削除しました: {', '.join(dropped)}")
+    return dropped
+
+
+def _partition_names(db: Session) -> list[str]:
+    """messagesテーブルのパーティション名"""
+    statement = text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass('messages')"
+    )
+    return list(db.execute(statement).scalars())
+
+
+# グローバルインスタンス
+_message_archive: MessageArchive | None = None
+
+
+def get_message_archive() -> MessageArchive | None:
+    """アーカイブのシングルトンインスタンスを取得（テスト環境でMESSAGE_ARCHIVE_DIRが未指定の場合はNone）"""
+    global _message_archive
+    if _message_archive is None:
+        archive_dir = os.getenv("MESSAGE_ARCHIVE_DIR")
+        if archive_dir is None and os.getenv("TESTING") == "true":
+            return None
+        _message_archive = MessageArchive(archive_dir or DEFAULT_ARCHIVE_DIR)
+    return _message_archive
@@ -0,0 +1,115 @@
+"""チャンネル履歴の一括エクスポート
+
+チャンネルの全メッセージをNDJSONまたはCSVで古い順に書き出す（必要に応じてgzip圧縮）。
+DBはサーバーサイドカーソル（yield_per）で一定件数ずつ読み込み、書き出しも一定件数ずつ行うため、
+件数が増えてもメモリ使用量は一定になる。アーカイブ済みのメッセージ（message_archive）はDBより前に書き出す。
+
+`GET /api/channels/{channel_id}/export` と `export_messages.py`（CLI）で使用する。
+"""
+
+import csv
+import io
+import itertools
+import zlib
+from collections.abc import Iterable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+try:
+    # パッケージとして実行される場合
+    from ..models import Message
+    from ..schemas import MessageResponse
+    from .message_archive import get_message_archive
+except ImportError:
+    # 直接実行される場合
+    from models import Message
+    from schemas import MessageResponse
+    from utils.message_archive import get_message_archive
+
+# 出力形式とContent-Type
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+# DBから一度に読み込む件数・一度に書き出す件数
+EXPORT_BATCH_SIZE = 1000
+# CSVの列（APIレスポンスと同じキー）
+EXPORT_COLUMNS = tuple(field.alias or name for name, field in MessageResponse.model_fields.items())
+# gzip形式で圧縮する場合のzlibのwbits
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def iter_channel_history(db: Session, channel_id: str) -> Iterator[Message]:
+    """チャンネルの全メッセージを古い順に取得（アーカイブ済みのメッセージを含む）"""
+    archive = get_message_archive()
+    if archive is not None:
+        yield from archive.iter_oldest_first(channel_id)
+
+    statement = (
+        select(Message)
+        .where(Message.channel_id == channel_id)
+        .order_by(Message.created_at, Message.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    yield from db.scalars(statement)
+
+
+def _ndjson_chunk(batch: Iterable[Message]) -> bytes:
+    return b"".join(
+        MessageResponse.model_validate(message).model_dump_json(by_alias=True).encode() + b"\n" for message in batch
+    )
+
+
+def _csv_chunk(batch: Iterable[Message], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for message in batch:
+        writer.writerow(MessageResponse.model_validate(message).model_dump(mode="json", by_alias=True).values())
+    return buffer.getvalue().encode()
+
+
+def encode_export(messages: Iterable[Message], export_format: str, compress: bool = False) -> Iterator[bytes]:
+    """メッセージを指定の形式で一定件数ずつバイト列にする
+
+    Args:
+        messages: 書き出すメッセージ
+        export_format: 出力形式（EXPORT_FORMATSのキー）
+        compress: gzip圧縮するか
+
+    Yields:
+        出力するバイト列（先頭から順に連結すると1つのファイルになる）
+
+    Raises:
+        ValueError: 未対応の出力形式の場合
+
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"未対応の出力形式です: {export_format}（{' / '.join(EXPORT_FORMATS)}）")
+
+    def iter_chunks() -> Iterator[bytes]:
+        if export_format == "csv":
+            # メッセージが0件でもヘッダー行は出力する
+            yield _csv_chunk((), header=True)
+            for batch in itertools.batched(messages, EXPORT_BATCH_SIZE, strict=False):
+                yield _csv_chunk(batch, header=False)
+        else:
+            for batch in itertools.batched(messages, EXPORT_BATCH_SIZE, strict=False):
+                yield _ndjson_chunk(batch)
+
+    if not compress:
+        yield from iter_chunks()
+        return
+
+    compressor = zlib.compressobj(wbits=_GZIP_WBITS)
+    for chunk in iter_chunks():
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
+
+
+def export_filename(channel_id: str, export_format: str, compress: bool = False) -> str:
+    """エクスポートファイルの名前"""
+    return f"channel-{channel_id}.{export_format}" + (".gz" if compress else "")
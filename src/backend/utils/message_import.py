@@ -0,0 +1,231 @@
+"""メッセージの一括取り込み
+
+エクスポートしたNDJSON（message_export）や生成した会話を、大きなトランザクションでまとめてDBに保存する。
+ORMやSQLAlchemyの複数行INSERTを使わず、DBドライバーの一括投入を直接使う。
+
+- PostgreSQL: COPYで一時テーブルに投入し、INSERT ... SELECT ... ON CONFLICT DO NOTHINGで移す
+- SQLite: INSERT OR IGNOREをexecutemanyで実行（全文検索インデックスはまとめて更新）
+
+IDが既存のメッセージは読み飛ばすため、同じファイルを再度取り込んでも重複しない。
+開発用のデータ作成や負荷試験の準備に使う（`import_messages.py`）。
+"""
+
+import csv
+import gzip
+import io
+import itertools
+import json
+import operator
+import random
+from collections.abc import Callable, Iterable, Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+try:
+    # パッケージとして実行される場合
+    from ..models import MESSAGES_FTS_TABLE, Message
+    from ..schemas import MessageResponse
+    from .response_cache import CHANNEL_MESSAGES_KIND, response_cache
+except ImportError:
+    # 直接実行される場合
+    from models import MESSAGES_FTS_TABLE, Message
+    from schemas import MessageResponse
+    from utils.response_cache import CHANNEL_MESSAGES_KIND, response_cache
+
+# 1トランザクションで保存する件数
+IMPORT_BATCH_SIZE = 50_000
+# 保存する列（messagesテーブルの列順）
+IMPORT_COLUMNS = tuple(column.name for column in Message.__table__.columns)
+# エクスポートのキー（camelCase）→ 列名
+_EXPORT_KEYS: dict[str, str] = {(field.alias or name): name for name, field in MessageResponse.model_fields.items()}
+_DATETIME_COLUMNS = ("timestamp", "created_at")
+# SQLiteの全文検索インデックスを更新するトリガー（models.SQLITE_SEARCH_INDEX_DDL）
+_FTS_INSERT_TRIGGER = "messages_fts_insert"
+
+# 生成する会話の語彙
+_TOPICS = ("音楽", "ゲーム", "映画", "ラーメン", "カフェ", "旅行", "読書", "料理", "アニメ", "サッカー")
+_USER_LINES = ("{}の話をしよう", "最近{}にハマってる", "{}でおすすめある？", "昨日{}に行ってきた", "{}が気になってる")
+_AI_LINES = ("{}いいですね！", "{}なら色々話せますよ", "{}のどんなところが好きですか？", "{}、楽しそうですね")
+
+
+def read_export_file(path: Path) -> Iterator[dict[str, Any]]:
+    """エクスポートしたNDJSONファイル（.gzの場合は展開）を行データとして読み込む"""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record: dict[str, Any] = json.loads(line)
+            row = {_EXPORT_KEYS.get(key, key): value for key, value in record.items()}
+            for name in _DATETIME_COLUMNS:
+                row[name] = datetime.fromisoformat(row[name])
+            yield row
+
+
+def generate_conversations(
+    count: int,
+    channel_ids: Iterable[str],
+    seed: int = 0,
+    start: datetime | None = None,
+    interval: timedelta = timedelta(seconds=30),
+) -> Iterator[dict[str, Any]]:
+    """ユーザーとAIの会話を行データとして生成
+
+    Args:
+        count: 生成するメッセージ数
+        channel_ids: メッセージを振り分けるチャンネルID
+        seed: 乱数シード（同じシードでは同じ会話を生成する）
+        start: 最初のメッセージの作成日時（省略時は現在から遡って最後のメッセージが現在になる）
+        interval: メッセージの間隔（チャンネル全体での平均）
+
+    Yields:
+        messagesテーブルの列名をキーとする辞書
+
+    """
+    rng = random.Random(seed)
+    channels = list(channel_ids)
+    if start is None:
+        start = datetime.now(UTC) - interval * count
+    topics = {channel_id: rng.choice(_TOPICS) for channel_id in channels}
+    for i in range(count):
+        channel_id = rng.choice(channels)
+        # 4割はAIの返信、残りはユーザーの発言（ときどき話題が変わる）
+        is_ai = rng.random() < 0.4
+        if not is_ai and rng.random() < 0.2:
+            topics[channel_id] = rng.choice(_TOPICS)
+        user_number = rng.randrange(50)
+        created_at = start + interval * i
+        yield {
+            "id": f"seed_{seed}_{i}",
+            "channel_id": channel_id,
+            "user_id": "ai_assistant" if is_ai else f"seed_user_{user_number}",
+            "user_name": "AI" if is_ai else f"ユーザー{user_number}",
+            "user_type": "ai" if is_ai else "user",
+            "content": rng.choice(_AI_LINES if is_ai else _USER_LINES).format(topics[channel_id]),
+            "timestamp": created_at,
+            "is_own_message": False,
+            "created_at": created_at,
+        }
+
+
+def _sqlite_datetime(value: datetime | None) -> str | None:
+    """SQLiteの日時の保存形式（SQLAlchemyのDateTimeのデフォルト。タイムゾーンは付けない）に変換"""
+    return None if value is None else value.isoformat(" ", "microseconds")[:26]
+
+
+def _row_converter(db: Session) -> Callable[[dict[str, Any]], list[Any]]:
+    """行データをDBドライバーへ渡す値のリストにする関数を作成（変換はSQLAlchemyが通常行うものと同じ）"""
+    dialect = db.get_bind().dialect
+    # 変換が必要な列（SQLiteの日時等）のみ変換する
+    processors = [
+        (index, processor)
+        for index, column in enumerate(Message.__table__.columns)
+        if (processor := column.type.dialect_impl(dialect).bind_processor(dialect)) is not None
+    ]
+    if dialect.name == "sqlite":
+        # SQLAlchemyの変換（書式指定による文字列化）は1件あたり数マイクロ秒かかるため、同じ結果になる変換に置き換える
+        processors = [
+            (index, _sqlite_datetime if IMPORT_COLUMNS[index] in _DATETIME_COLUMNS else processor)
+            for index, processor in processors
+        ]
+    get_values = operator.itemgetter(*IMPORT_COLUMNS)
+
+    def convert(row: dict[str, Any]) -> list[Any]:
+        values = list(get_values(row))
+        for index, processor in processors:
+            values[index] = processor(values[index])
+        return values
+
+    return convert
+
+
+def _copy_batch(cursor: Any, batch: list[list[Any]]) -> int:  # noqa: ANN401
+    """PostgreSQL: COPYで一時テーブルに投入してからmessagesに移す"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(batch)
+    buffer.seek(0)
+    columns = ", ".join(IMPORT_COLUMNS)
+    cursor.copy_expert(f"COPY message_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cursor.execute(
+        f"INSERT INTO messages ({columns}) SELECT {columns} FROM message_import ON CONFLICT DO NOTHING",
+    )
+    return cursor.rowcount
+
+
+def _executemany_batch(cursor: Any, batch: list[list[Any]]) -> int:  # noqa: ANN401
+    """SQLite: INSERT OR IGNOREをexecutemanyで実行
+
+    全文検索インデックスを1行ずつ更新するトリガーは遅いため、同じトランザクション内で一時的に削除し、
+    新たに保存した行をまとめてインデックスに追加してからトリガーを作り直す（他の接続からは変化が見えない）。
+    """
+    trigger_sql = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (_FTS_INSERT_TRIGGER,)
+    ).fetchone()
+    last_rowid = 0
+    if trigger_sql is not None:
+        last_rowid = cursor.execute("SELECT coalesce(max(rowid), 0) FROM messages").fetchone()[0]
+        cursor.execute(f"DROP TRIGGER {_FTS_INSERT_TRIGGER}")
+
+    columns = ", ".join(IMPORT_COLUMNS)
+    placeholders = ", ".join("?" * len(IMPORT_COLUMNS))
+    cursor.executemany(f"INSERT OR IGNORE INTO messages ({columns}) VALUES ({placeholders})", batch)
+    imported = cursor.rowcount
+
+    if trigger_sql is not None:
+        cursor.execute(
+            f"INSERT INTO {MESSAGES_FTS_TABLE}(rowid, content) SELECT rowid, content FROM messages WHERE rowid > ?",
+            (last_rowid,),
+        )
+        cursor.execute(trigger_sql[0])
+    return imported
+
+
+def import_messages(db: Session, rows: Iterable[dict[str, Any]], batch_size: int = IMPORT_BATCH_SIZE) -> int:
+    """メッセージを一括で保存（IDが既存のメッセージは読み飛ばす）
+
+    Args:
+        db: データベースセッション
+        rows: messagesテーブルの列名をキーとする辞書（read_export_file / generate_conversations）
+        batch_size: 1トランザクションで保存する件数
+
+    Returns:
+        新たに保存したメッセージ数
+
+    Raises:
+        ValueError: 未対応のデータベースの場合
+
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        raise ValueError(f"未対応のデータベースです: {dialect}")
+
+    convert = _row_converter(db)
+
+    imported = 0
+    channel_ids: set[str] = set()
+    try:
+        for batch_rows in itertools.batched(rows, batch_size, strict=False):
+            batch = [convert(row) for row in batch_rows]
+            # ドライバーの接続を直接使う（セッションのトランザクション内で実行され、コミットで接続が返却される）
+            dbapi_connection = db.connection().connection.dbapi_connection
+            assert dbapi_connection is not None
+            cursor = dbapi_connection.cursor()
+            if dialect == "postgresql":
+                # コミットごとに中身が消える一時テーブル（接続ごとに作成。パーティションのテーブルからも作成できる）
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS message_import (LIKE messages) ON COMMIT DELETE ROWS")
+                imported += _copy_batch(cursor, batch)
+            else:
+                imported += _executemany_batch(cursor, batch)
+            db.commit()
+            channel_ids.update(row["channel_id"] for row in batch_rows)
+    except Exception:
+        db.rollback()
+        raise
+
+    for channel_id in channel_ids:
+        response_cache.invalidate(CHANNEL_MESSAGES_KIND, channel_id)
+    return imported
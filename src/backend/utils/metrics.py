@@ -0,0 +1,307 @@
+"""メトリクス収集ユーティリティ
+
+ホットパス（Gemini API呼び出し、DB保存、ブロードキャスト、WebSocket応答）の
+レイテンシをヒストグラムで記録し、Prometheusのテキスト形式で出力する。
+"""
+
+import math
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+
+# レイテンシ用のデフォルトバケット（秒）
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ラベル値のタプル（ラベルなしのメトリクスは空タプル）
+LabelValues = tuple[str, ...]
+# コールバック型メトリクスの戻り値: ラベルなしの値、またはラベル値ごとの値
+MetricCallback = Callable[[], float | dict[LabelValues, float]]
+
+
+def _escape_label_value(value: str) -> str:
+    """Prometheusのラベル値をエスケープ"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """ラベル部分（{a="1",b="2"}）を整形"""
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Prometheusの数値表記に整形"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """メトリクスの基底クラス"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        """初期化
+
+        Args:
+            name: メトリクス名
+            documentation: HELP行に出力する説明
+            labelnames: ラベル名
+
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"ラベルが一致しません: metric={self.name}, expected={self.labelnames}, got={tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        """Prometheusテキスト形式の行を出力"""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}", *self._samples()]
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """サンプル行を出力（サブクラスで実装）"""
+
+
+class _ValueMetric(Metric):
+    """単一の数値を持つメトリクス（Counter・Gauge）の共通実装"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: MetricCallback | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set_function(self, callback: MetricCallback) -> None:
+        """出力時に値を取得するコールバックを設定"""
+        self._callback = callback
+
+    def get(self, **labels: str) -> float:
+        """現在の値を取得"""
+        return self._collect().get(self._label_values(labels), 0.0)
+
+    def _collect(self) -> dict[LabelValues, float]:
+        if self._callback is not None:
+            result = self._callback()
+            return result if isinstance(result, dict) else {(): float(result)}
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._collect().items())
+        ]
+
+
+class Counter(_ValueMetric):
+    """単調増加するカウンター"""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """カウンターを増やす"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_ValueMetric):
+    """増減する現在値"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        """値を設定"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """観測値の分布を固定バケットで集計するヒストグラム"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        """初期化
+
+        Args:
+            name: メトリクス名
+            documentation: HELP行に出力する説明
+            labelnames: ラベル名
+            buckets: バケットの上限値（昇順）
+
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベル値ごとの [バケット別件数..., +Inf件数], 合計値
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """値を記録"""
+        key = self._label_values(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        """記録された件数を取得"""
+        with self._lock:
+            return sum(self._counts.get(self._label_values(labels), ()))
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            snapshot = {key: (list(counts), self._sums[key]) for key, counts in self._counts.items()}
+
+        lines = []
+        for key, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録・出力を管理するクラス"""
+
+    def __init__(self) -> None:
+        """初期化"""
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register[M: Metric](self, metric: M) -> M:
+        """メトリクスを登録（同名のメトリクスは置き換え）"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), callback: MetricCallback | None = None
+    ) -> Counter:
+        """カウンターを作成して登録"""
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), callback: MetricCallback | None = None
+    ) -> Gauge:
+        """ゲージを作成して登録"""
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """ヒストグラムを作成して登録"""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """全メトリクスをPrometheusテキスト形式で出力"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# グローバルレジストリ
+registry = MetricsRegistry()
+
+# ホットパスのレイテンシ
+GEMINI_REQUEST_DURATION = registry.histogram(
+    "gemini_request_duration_seconds", "Gemini API呼び出し1回あたりの所要時間", ("personality",)
+)
+DB_SAVE_DURATION = registry.histogram("db_save_duration_seconds", "メッセージのDB保存にかかった時間", ("source",))
+BROADCAST_DURATION = registry.histogram(
+    "broadcast_duration_seconds", "全接続へのブロードキャストにかかった時間", ("source",)
+)
+WRITE_BEHIND_BATCH_SIZE = registry.histogram(
+    "write_behind_batch_size",
+    "書き込みキューから1回のINSERTで保存したメッセージ数",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+WS_RECEIVE_TO_ACK_DURATION = registry.histogram(
+    "websocket_receive_to_ack_seconds", "WebSocketメッセージ受信から保存通知（message:saved）送信までの時間"
+)
+DB_POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "DB接続プールから接続を取得するまでの時間（空き待ち・新規接続を含む）", ("target",)
+)
+DB_POOL_CONNECTION_AGE = registry.histogram(
+    "db_pool_connection_age_seconds",
+    "取得したDB接続が作成されてからの経過時間",
+    ("target",),
+    buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200),
+)
+
+# 件数
+DB_POOL_CHECKOUT_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total", "DB接続プールの空き待ちがタイムアウトした回数", ("target",)
+)
+DUPLICATE_MESSAGES = registry.counter(
+    "duplicate_messages_total", "再送などで重複して受信したメッセージ数", ("detected_by",)
+)
+RESPONSE_CACHE_REQUESTS = registry.counter(
+    "response_cache_requests_total", "キャッシュ対象のGETリクエスト数（hit / miss）", ("result",)
+)
+WEBSOCKET_OUTGOING_BYTES = registry.counter(
+    "websocket_outgoing_bytes_total",
+    "WebSocketで送信したメッセージのバイト数（stage: before=圧縮前 / after=圧縮後）",
+    ("message_type", "stage"),
+)
+WEBSOCKET_OUTGOING_MESSAGES = registry.counter(
+    "websocket_outgoing_messages_total",
+    "WebSocketで送信したメッセージ数（compressed: 圧縮の有無）",
+    ("message_type", "compressed"),
+)
+
+# 現在値（コールバックはアプリケーション起動時に設定）
+WEBSOCKET_ACTIVE_CONNECTIONS = registry.gauge("websocket_active_connections", "接続中のWebSocketクライアント数")
+QUEUE_DEPTH = registry.gauge("queue_depth", "バックグラウンドキューの滞留件数", ("queue",))
+DB_POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections",
+    "接続先ごとのDB接続プールの接続数（state: size=保持する接続数 / checked_out=使用中 / idle=待機中 / overflow=上限超過分）",
+    ("target", "state"),
+)
+RATE_LIMITER_WAITS = registry.counter("rate_limiter_waits_total", "レート制限で待機した呼び出し数", ("limiter",))
+RATE_LIMITER_DROPS = registry.counter(
+    "rate_limiter_drops_total", "レート制限で許可されなかった呼び出し数", ("limiter",)
+)
@@ -0,0 +1,190 @@
+"""レート制限ユーティリティ
+
+外部API（Discord Webhook、Gemini API）の呼び出し回数を制限する。
+上限に達した場合は呼び出しを捨てずに、枠が空くまで待機する。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimiterStats:
+    """レート制限の統計情報"""
+
+    # 許可された呼び出し数
+    acquired: int = 0
+    # 枠が空くまで待機した呼び出し数
+    waits: int = 0
+    # タイムアウト等で許可されなかった呼び出し数
+    drops: int = 0
+    # 待機時間の合計（秒）
+    total_wait_seconds: float = 0.0
+
+
+class RateLimiter(ABC):
+    """レート制限の基底クラス
+
+    サブクラスは _reserve() で「今すぐ許可できるなら枠を消費して0を、
+    できないなら枠が空くまでの秒数を」返す。
+    待機中の呼び出しがある間は、新しい呼び出しも列に並ぶ（空いた枠を後から来た呼び出しが先に取らない）。
+    """
+
+    def __init__(self, name: str) -> None:
+        """初期化
+
+        Args:
+            name: ログ・メトリクス用の名前
+
+        """
+        self.name = name
+        self.stats = RateLimiterStats()
+        # 枠の計算はスレッドからも安全に行えるようにする
+        self._state_lock = threading.Lock()
+        # 待機中の呼び出しを到着順に処理する
+        self._waiters_lock: asyncio.Lock | None = None
+        # 待機中の呼び出し数
+        self._waiting = 0
+        _registry[name] = self
+
+    @abstractmethod
+    def _reserve(self, now: float) -> float:
+        """枠を予約（サブクラスで実装）"""
+
+    def _try_reserve(self) -> float:
+        with self._state_lock:
+            return self._reserve(time.monotonic())
+
+    def try_acquire(self) -> bool:
+        """待機せずに枠の取得を試みる
+
+        Returns:
+            取得できた場合True（できなかった場合・待機中の呼び出しがある場合はdropsに計上）
+
+        """
+        if self._waiting == 0 and self._try_reserve() == 0:
+            self.stats.acquired += 1
+            return True
+        self.stats.drops += 1
+        return False
+
+    async def acquire(self, timeout: float | None = None) -> bool:
+        """枠が空くまで待機して取得
+
+        Args:
+            timeout: 最大待機秒数（Noneの場合は無制限に待機）
+
+        Returns:
+            取得できた場合True、タイムアウトした場合False
+
+        """
+        # 待機中の呼び出しがなければ、すぐに取得を試みる
+        if self._waiting == 0:
+            wait = self._try_reserve()
+            if wait == 0:
+                self.stats.acquired += 1
+                return True
+            logger.info(f"レート制限により待機します: limiter={self.name}, wait={wait:.2f}s")
+
+        if self._waiters_lock is None:
+            self._waiters_lock = asyncio.Lock()
+
+        started = time.monotonic()
+        self.stats.waits += 1
+        self._waiting += 1
+        try:
+            async with self._waiters_lock:
+                while True:
+                    wait = self._try_reserve()
+                    if wait == 0:
+                        break
+                    if timeout is not None and time.monotonic() - started + wait > timeout:
+                        self.stats.drops += 1
+                        logger.warning(f"レート制限の待機がタイムアウトしました: limiter={self.name}")
+                        return False
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiting -= 1
+
+        self.stats.acquired += 1
+        self.stats.total_wait_seconds += time.monotonic() - started
+        return True
+
+
+class SlidingWindowRateLimiter(RateLimiter):
+    """スライディングウィンドウ方式のレート制限（window_seconds内にmax_calls回まで）"""
+
+    def __init__(self, max_calls: int, window_seconds: float, name: str = "sliding_window") -> None:
+        """初期化
+
+        Args:
+            max_calls: ウィンドウ内で許可する呼び出し数
+            window_seconds: ウィンドウの長さ（秒）
+            name: ログ・メトリクス用の名前
+
+        """
+        super().__init__(name)
+        self.max_calls = max_calls
+        self.window_seconds = window_seconds
+        self._timestamps: deque[float] = deque()
+
+    def _reserve(self, now: float) -> float:
+        # ウィンドウ外になった古いタイムスタンプを先頭から取り除く
+        while self._timestamps and now - self._timestamps[0] >= self.window_seconds:
+            self._timestamps.popleft()
+
+        if len(self._timestamps) < self.max_calls:
+            self._timestamps.append(now)
+            return 0
+
+        return self.window_seconds - (now - self._timestamps[0])
+
+    @property
+    def in_window(self) -> int:
+        """現在のウィンドウ内の呼び出し数"""
+        return len(self._timestamps)
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """トークンバケット方式のレート制限（平均rate回/秒、最大capacity回のバースト）"""
+
+    def __init__(self, rate: float, capacity: float, name: str = "token_bucket") -> None:
+        """初期化
+
+        Args:
+            rate: 1秒あたりに補充されるトークン数
+            capacity: バケットの容量（バーストで許可する呼び出し数）
+            name: ログ・メトリクス用の名前
+
+        """
+        super().__init__(name)
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _reserve(self, now: float) -> float:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+
+        return (1 - self._tokens) / self.rate
+
+
+# 名前ごとのレート制限インスタンス（メトリクス出力用）
+_registry: dict[str, RateLimiter] = {}
+
+
+def get_registered_rate_limiters() -> list[RateLimiter]:
+    """登録済みのレート制限インスタンスを取得"""
+    return list(_registry.values())
@@ -0,0 +1,60 @@
+"""最近受信したメッセージIDのキャッシュ
+
+再接続したクライアントが同じメッセージを再送した場合に、DBへ問い合わせる前に
+重複を検出するためのLRUキャッシュ。
+"""
+
+import threading
+from collections import OrderedDict
+
+# キャッシュするIDの最大件数
+DEFAULT_RECENT_ID_CACHE_SIZE = 10_000
+
+
+class RecentIdCache:
+    """最近使われたIDを上限件数まで保持するLRUキャッシュ"""
+
+    def __init__(self, max_size: int = DEFAULT_RECENT_ID_CACHE_SIZE) -> None:
+        """初期化
+
+        Args:
+            max_size: 保持するIDの最大件数（超えた場合は最も古いIDから削除）
+
+        """
+        self.max_size = max_size
+        self._ids: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """保持しているIDの件数"""
+        return len(self._ids)
+
+    def contains(self, item_id: str) -> bool:
+        """IDが含まれているか（含まれている場合は最新として扱う）"""
+        with self._lock:
+            if item_id not in self._ids:
+                return False
+            self._ids.move_to_end(item_id)
+            return True
+
+    def add(self, item_id: str) -> None:
+        """IDを追加"""
+        with self._lock:
+            self._ids[item_id] = None
+            self._ids.move_to_end(item_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def discard(self, item_id: str) -> None:
+        """IDを削除（保存に失敗した場合など）"""
+        with self._lock:
+            self._ids.pop(item_id, None)
+
+    def clear(self) -> None:
+        """全てのIDを削除"""
+        with self._lock:
+            self._ids.clear()
+
+
+# グローバルインスタンス（保存済みのメッセージID）
+recent_message_ids = RecentIdCache()
@@ -0,0 +1,113 @@
+"""APIレスポンスのキャッシュ
+
+チャンネル一覧や各チャンネルの最新ページのように、書き込みがない限り同じ内容を返す
+GETレスポンスを、シリアライズ済みのバイト列とETagごと保持する。
+
+- 書き込み（crud）側から対象のキーを無効化する
+- 無効化をまたいだ読み込み結果は保存しない（古い内容をキャッシュしないよう世代番号で判定）
+- プロセス内のキャッシュのため、複数プロセスで動かす場合は各プロセスの書き込みしか反映されない
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# キャッシュするレスポンスの最大件数
+DEFAULT_RESPONSE_CACHE_SIZE = 1024
+
+# キャッシュキー（先頭要素が種別、以降がチャンネルIDなどのパラメータ）
+CacheKey = tuple[str | int, ...]
+
+# キャッシュの種別
+CHANNELS_KEY: CacheKey = ("channels",)
+CHANNEL_MESSAGES_KIND = "channel_messages"
+
+
+def make_etag(body: bytes) -> str:
+    """レスポンス本文からETagを作成"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Matchヘッダーが指定したETagに一致するか（弱いETagも同一とみなす）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """シリアライズ済みのレスポンス"""
+
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """ETag付きレスポンスのLRUキャッシュ"""
+
+    def __init__(self, max_size: int = DEFAULT_RESPONSE_CACHE_SIZE) -> None:
+        """初期化
+
+        Args:
+            max_size: 保持するレスポンスの最大件数（超えた場合は最も古いものから削除）
+
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict[CacheKey, CachedResponse] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """無効化のたびに増える世代番号（読み込み開始前に取得してset()に渡す）"""
+        return self._generation
+
+    def get(self, key: CacheKey) -> CachedResponse | None:
+        """キャッシュされたレスポンスを取得"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: CacheKey, body: bytes, generation: int) -> CachedResponse:
+        """レスポンスを保存
+
+        Args:
+            key: キャッシュキー
+            body: シリアライズ済みのレスポンス本文
+            generation: 読み込み開始前に取得した世代番号（以降に無効化があった場合は保存しない）
+
+        Returns:
+            ETagを付けたレスポンス
+
+        """
+        entry = CachedResponse(body, make_etag(body))
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *prefix: str | int) -> None:
+        """先頭の要素が一致するキーのレスポンスを全て削除（引数なしの場合は全件）"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if key[: len(prefix)] == prefix]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """全てのレスポンスを削除"""
+        self.invalidate()
+
+
+# グローバルインスタンス
+response_cache = ResponseCache()
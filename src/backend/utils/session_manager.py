@@ -60,3 +60,65 @@ def save_message_with_session_management(
             raise
         finally:
             db.close()
+
+
+def read_with_session_management(
+    read_func: Callable[[Session], Any],
+    db_session: Session | None = None,
+) -> Any:  # noqa: ANN401
+    """読み込み専用のセッションで読み込むヘルパー関数（コミットせず、SQLiteの書き込みスレッドも使わない）
+
+    Args:
+        read_func: セッションを受け取って読み込む関数
+        db_session: オプショナルセッション。Noneの場合は読み込み専用のセッションを作成して閉じる
+
+    Returns:
+        read_funcの戻り値
+
+    """
+    if db_session is not None:
+        return read_func(db_session)
+
+    try:
+        # パッケージとして実行される場合
+        from ..database import ReadSessionLocal
+    except ImportError:
+        # 直接実行される場合
+        from database import ReadSessionLocal
+
+    with ReadSessionLocal() as db:
+        return read_func(db)
+
+
+async def save_message_with_writer(
+    message_create_func: Callable[[Session], Any],
+    db_session: Session | None = None,
+    auto_commit: bool = True,
+) -> MessageResult:
+    """SQLiteの書き込みスレッドが有効な場合はそちらで保存し、無効な場合は渡されたセッションで保存
+
+    書き込みスレッドでは専用のセッションで保存してコミットするため、db_sessionとauto_commitは使用しない。
+    db_sessionがアプリのDB（書き込み用・読み込み用の接続）以外に接続している場合（テスト用のDB等）は、db_sessionで保存する。
+
+    Args:
+        message_create_func: セッションを受け取ってメッセージを作成する関数
+        db_session: オプショナルセッション（書き込みスレッドが無効・別のDBの場合に使用）
+        auto_commit: 外部セッション使用時にcommitを実行するかどうか
+
+    Returns:
+        保存されたメッセージオブジェクト（書き込みスレッドで保存した場合はセッションから切り離された状態）
+
+    """
+    try:
+        # パッケージとして実行される場合
+        from ..database import engine, read_engine
+        from .sqlite_writer import get_sqlite_writer
+    except ImportError:
+        # 直接実行される場合
+        from database import engine, read_engine
+        from utils.sqlite_writer import get_sqlite_writer
+
+    writer = get_sqlite_writer()
+    if writer is not None and (db_session is None or db_session.get_bind() in (engine, read_engine)):
+        return await writer.run(message_create_func)
+    return save_message_with_session_management(message_create_func, db_session, auto_commit)
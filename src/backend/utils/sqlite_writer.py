@@ -0,0 +1,111 @@
+"""SQLiteの書き込みスレッド
+
+SQLiteは同時に1つの接続しか書き込めないため、複数のWebSocket接続から同時に保存すると
+ロック待ち（database is locked）が発生する。書き込みを専用の1スレッドのキューに集約し、
+書き込み用の接続を1本だけ使って順番に実行する。読み込みは別の読み込み専用接続で並行して行う。
+
+- SQLiteファイルの本番向け設定（database.IS_TUNED_SQLITE）が有効な場合のみ使用する
+- 書き込み関数の戻り値はセッションを閉じた後に返すため、ORMオブジェクトの属性は参照しないこと
+"""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteWriter:
+    """書き込みを1スレッドで順番に実行するキュー"""
+
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        """初期化
+
+        Args:
+            session_factory: 書き込み用のDBセッションを作成する関数
+
+        """
+        self._session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        """実行待ち・実行中の書き込み数"""
+        return self._pending
+
+    def _execute[T](self, func: Callable[[Session], T]) -> T:
+        """書き込みスレッドでセッションを作成して実行し、コミットする"""
+        db = self._session_factory()
+        try:
+            result = func(db)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+            with self._lock:
+                self._pending -= 1
+
+    def submit[T](self, func: Callable[[Session], T]) -> Future[T]:
+        """書き込みをキューに追加（どのスレッドからでも呼び出せる）
+
+        Args:
+            func: セッションを受け取って書き込む関数（終了後にコミットされる）
+
+        Returns:
+            書き込み関数の戻り値を返すFuture
+
+        """
+        with self._lock:
+            self._pending += 1
+        try:
+            return self._executor.submit(self._execute, func)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    async def run[T](self, func: Callable[[Session], T]) -> T:
+        """書き込みをキューに追加し、コミットまで待つ（イベントループはブロックしない）"""
+        return await asyncio.wrap_future(self.submit(func))
+
+    def close(self) -> None:
+        """実行待ちの書き込みを全て実行してから停止"""
+        self._executor.shutdown(wait=True)
+
+
+# グローバルインスタンス
+_sqlite_writer: SQLiteWriter | None = None
+
+
+def get_sqlite_writer() -> SQLiteWriter | None:
+    """書き込みスレッドのシングルトンインスタンスを取得（SQLiteの本番向け設定が無効の場合はNone）"""
+    global _sqlite_writer
+    if _sqlite_writer is None:
+        try:
+            # パッケージとして実行される場合
+            from ..database import IS_TUNED_SQLITE, SessionLocal
+        except ImportError:
+            # 直接実行される場合
+            from database import IS_TUNED_SQLITE, SessionLocal
+        if not IS_TUNED_SQLITE:
+            return None
+        _sqlite_writer = SQLiteWriter(SessionLocal)
+        logger.info("SQLiteの書き込みスレッドを開始しました")
+    return _sqlite_writer
+
+
+def stop_sqlite_writer() -> None:
+    """書き込みスレッドを停止"""
+    global _sqlite_writer
+    if _sqlite_writer is not None:
+        _sqlite_writer.close()
+        _sqlite_writer = None
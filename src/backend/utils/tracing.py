@@ -0,0 +1,388 @@
+"""リクエストトレーシングユーティリティ
+
+WebSocket受信 → DB保存 → Gemini API呼び出し → ブロードキャストの各段階をスパンとして記録し、
+どの段階で時間がかかっているかを追跡できるようにする。
+
+- トレースIDはcontextvarで伝播するため、関数の引数を変えずに呼び出し階層を記録できる
+- ルートスパンでサンプリングを判定し、対象外のトレースはほぼコストなしで素通りさせる
+- 記録したスパンはバックグラウンドスレッドでまとめて出力する（JSON Lines または OTLP/HTTP）
+
+環境変数:
+    TRACING_EXPORTER: none（デフォルト） / jsonl / otlp
+    TRACING_SAMPLE_RATE: サンプリング率（0.0〜1.0、デフォルト0.1）
+    TRACING_JSONL_PATH: JSON Lines出力先（デフォルト traces.jsonl）
+    TRACING_OTLP_ENDPOINT: OTLP/HTTPの送信先（デフォルト http://localhost:4318/v1/traces）
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 出力先の種類
+EXPORTER_NONE = "none"
+EXPORTER_JSONL = "jsonl"
+EXPORTER_OTLP = "otlp"
+
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_JSONL_PATH = "traces.jsonl"
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318/v1/traces"
+SERVICE_NAME = "ai-community-backend"
+
+# スパン属性に設定できる値
+AttributeValue = str | int | float | bool
+
+
+@dataclass
+class Span:
+    """処理区間の記録"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    sampled: bool
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: int | None = None
+    attributes: dict[str, AttributeValue] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float | None:
+        """所要時間（ミリ秒）"""
+        if self.end_time_ns is None:
+            return None
+        return (self.end_time_ns - self.start_time_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        """属性を追加（サンプリング対象外の場合は何もしない）"""
+        if self.sampled:
+            self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON出力用の辞書に変換"""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+# 現在のスパン（asyncioタスクごとに独立し、create_taskした子タスクにも引き継がれる）
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def get_current_span() -> Span | None:
+    """現在のスパンを取得"""
+    return _current_span.get()
+
+
+def get_current_trace_id() -> str | None:
+    """現在のトレースIDを取得（ログとの突き合わせ用）"""
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+class SpanExporter(ABC):
+    """スパン出力の基底クラス"""
+
+    @abstractmethod
+    def export(self, spans: list[Span]) -> None:
+        """スパンを出力（サブクラスで実装）"""
+
+    def shutdown(self) -> None:  # noqa: B027
+        """終了処理（後処理が必要なサブクラスで上書きする）"""
+
+
+class JsonLinesExporter(SpanExporter):
+    """スパンを1行1件のJSONとしてファイルに追記する"""
+
+    def __init__(self, path: str | Path) -> None:
+        """初期化
+
+        Args:
+            path: 出力先ファイル
+
+        """
+        self.path = Path(path)
+
+    def export(self, spans: list[Span]) -> None:
+        """スパンをファイルに追記"""
+        lines = "".join(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n" for span in spans)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OTLPHttpExporter(SpanExporter):
+    """OTLP/HTTP（JSONエンコーディング）互換の形式でコレクターに送信する"""
+
+    REQUEST_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, endpoint: str, transport: httpx.BaseTransport | None = None) -> None:
+        """初期化
+
+        Args:
+            endpoint: 送信先URL（例: http://localhost:4318/v1/traces）
+            transport: HTTPトランスポート（テスト用）
+
+        """
+        self.endpoint = endpoint
+        self._client = httpx.Client(timeout=self.REQUEST_TIMEOUT_SECONDS, transport=transport)
+
+    @staticmethod
+    def _attribute(key: str, value: AttributeValue) -> dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _to_otlp(self, span: Span) -> dict[str, Any]:
+        otlp_span: dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns or span.start_time_ns),
+            "attributes": [self._attribute(key, value) for key, value in span.attributes.items()],
+            # STATUS_CODE_OK: 1, STATUS_CODE_ERROR: 2
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+        }
+        if span.parent_span_id:
+            otlp_span["parentSpanId"] = span.parent_span_id
+        return otlp_span
+
+    def export(self, spans: list[Span]) -> None:
+        """スパンをコレクターに送信"""
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [self._attribute("service.name", SERVICE_NAME)]},
+                    "scopeSpans": [
+                        {"scope": {"name": __name__}, "spans": [self._to_otlp(span) for span in spans]},
+                    ],
+                }
+            ]
+        }
+        response = self._client.post(self.endpoint, json=payload)
+        if response.status_code >= 400:
+            logger.warning(f"トレース送信失敗: {response.status_code}")
+
+    def shutdown(self) -> None:
+        """HTTPクライアントを閉じる"""
+        self._client.close()
+
+
+class BatchSpanProcessor:
+    """終了したスパンをキューに溜め、バックグラウンドスレッドでまとめて出力する"""
+
+    MAX_QUEUE_SIZE = 2048
+    MAX_BATCH_SIZE = 256
+    FLUSH_INTERVAL_SECONDS = 2.0
+    SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, exporter: SpanExporter) -> None:
+        """初期化
+
+        Args:
+            exporter: スパンの出力先
+
+        """
+        self.exporter = exporter
+        self.dropped = 0
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=self.MAX_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._worker, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        """終了したスパンを受け取る（キューが満杯の場合は捨てる）"""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _export(self, batch: list[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"トレース出力エラー: {e!s}")
+
+    def _worker(self) -> None:
+        batch: list[Span] = []
+        deadline = time.monotonic() + self.FLUSH_INTERVAL_SECONDS
+        while True:
+            try:
+                span = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                pass  # 出力間隔に達したため溜まっている分を出力
+            else:
+                if span is None:
+                    # 終了要求: 残りを出力して終了
+                    if batch:
+                        self._export(batch)
+                    return
+                batch.append(span)
+                if len(batch) < self.MAX_BATCH_SIZE and time.monotonic() < deadline:
+                    continue
+
+            if batch:
+                self._export(batch)
+                batch = []
+            deadline = time.monotonic() + self.FLUSH_INTERVAL_SECONDS
+
+    def shutdown(self) -> None:
+        """キューに残ったスパンを出力して停止"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=self.SHUTDOWN_TIMEOUT_SECONDS)
+        self.exporter.shutdown()
+
+
+class Tracer:
+    """スパンの作成とサンプリングを行うクラス"""
+
+    def __init__(self, processor: BatchSpanProcessor | None = None, sample_rate: float = DEFAULT_SAMPLE_RATE) -> None:
+        """初期化
+
+        Args:
+            processor: スパンの出力処理（Noneの場合はトレース無効）
+            sample_rate: ルートスパンをサンプリングする確率（0.0〜1.0）
+
+        """
+        self.processor = processor
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+
+    @property
+    def enabled(self) -> bool:
+        """トレースが有効かどうか"""
+        return self.processor is not None and self.sample_rate > 0
+
+    @contextmanager
+    def span(self, name: str, **attributes: AttributeValue) -> Iterator[Span | None]:
+        """スパンを開始し、ブロックを抜けた時点で終了する
+
+        親スパンがあればそのトレースに含め、なければ新しいトレースを開始する。
+        サンプリング対象外のトレース内では新しいスパンを作らず親スパンをそのまま返す。
+
+        Args:
+            name: スパン名（例: "gemini.generate"）
+            **attributes: スパンの属性
+
+        Yields:
+            作成したスパン（トレース無効時はNone）
+
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        if parent is not None and not parent.sampled:
+            yield parent
+            return
+
+        if parent is None:
+            sampled = random.random() < self.sample_rate
+            span = Span(name, secrets.token_hex(16), secrets.token_hex(8), None, sampled)
+        else:
+            span = Span(name, parent.trace_id, secrets.token_hex(8), parent.span_id, True)
+
+        if span.sampled:
+            span.attributes.update(attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e!s}"
+            raise
+        finally:
+            _current_span.reset(token)
+            if span.sampled and self.processor is not None:
+                span.end_time_ns = time.time_ns()
+                self.processor.on_end(span)
+
+    def shutdown(self) -> None:
+        """出力処理を停止"""
+        if self.processor is not None:
+            self.processor.shutdown()
+
+
+def _create_exporter(exporter_type: str) -> SpanExporter | None:
+    """環境変数の設定から出力先を作成"""
+    if exporter_type == EXPORTER_JSONL:
+        return JsonLinesExporter(os.environ.get("TRACING_JSONL_PATH", DEFAULT_JSONL_PATH))
+    if exporter_type == EXPORTER_OTLP:
+        return OTLPHttpExporter(os.environ.get("TRACING_OTLP_ENDPOINT", DEFAULT_OTLP_ENDPOINT))
+    if exporter_type != EXPORTER_NONE:
+        logger.warning(f"不明なTRACING_EXPORTERです。トレースを無効にします: {exporter_type}")
+    return None
+
+
+def _load_sample_rate() -> float:
+    """環境変数からサンプリング率を取得"""
+    value = os.environ.get("TRACING_SAMPLE_RATE")
+    if value is None:
+        return DEFAULT_SAMPLE_RATE
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"TRACING_SAMPLE_RATEが不正です。デフォルト値を使用します: {value}")
+        return DEFAULT_SAMPLE_RATE
+
+
+# グローバルインスタンス
+_tracer: Tracer | None = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """トレーサーのシングルトンインスタンスを取得"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                exporter = _create_exporter(os.environ.get("TRACING_EXPORTER", EXPORTER_NONE).lower())
+                processor = BatchSpanProcessor(exporter) if exporter is not None else None
+                _tracer = Tracer(processor, _load_sample_rate())
+                if processor is not None:
+                    logger.info(
+                        f"トレースを有効化: exporter={type(exporter).__name__}, sample_rate={_tracer.sample_rate}"
+                    )
+    return _tracer
+
+
+def shutdown_tracing() -> None:
+    """トレーサーを停止し、未出力のスパンを書き出す"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is not None:
+            _tracer.shutdown()
+            _tracer = None
@@ -0,0 +1,419 @@
+"""メッセージの非同期一括保存（ライトビハインド）
+
+WebSocketで受信したメッセージを1件ずつコミットする代わりに、ローカルのジャーナル
+ファイルに追記してキューに積み、件数または時間の上限に達したら複数行INSERTで
+まとめて保存する。
+
+- ジャーナルはコミット前にプロセスが落ちた場合の再実行用で、起動時に未保存分を保存し直す
+- ジャーナルの追記・fsync・圧縮は専用の1スレッドで行い、イベントループを止めない
+- コミット済みの行が溜まったら未保存の行だけを残して書き直すため、ジャーナルは際限なく大きくならない
+- 保存はメッセージIDで冪等（再実行・再送されたメッセージは二重に保存されない）
+- submit() が返すFutureはバッチのコミット後に完了し、保存通知（message:saved）の送信に使う
+
+環境変数:
+    MESSAGE_WRITE_BEHIND: true で有効化（デフォルト false）
+    MESSAGE_JOURNAL_PATH: ジャーナルファイルのパス（デフォルト src/backend/message_journal.jsonl）
+    MESSAGE_JOURNAL_FSYNC: false でジャーナルをfsyncしない（デフォルト true。バッチの保存前に1回fsyncする。
+        無効にするとOSのクラッシュ・電源断時に未コミットのメッセージを復旧できない場合がある）
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO, Any
+
+from sqlalchemy.orm import Session
+
+try:
+    # パッケージとして実行される場合
+    from .. import crud
+    from ..schemas import MessageCreate
+    from .metrics import DB_SAVE_DURATION, WRITE_BEHIND_BATCH_SIZE
+    from .sqlite_writer import get_sqlite_writer
+except ImportError:
+    # 直接実行される場合
+    import crud
+    from schemas import MessageCreate
+    from utils.metrics import DB_SAVE_DURATION, WRITE_BEHIND_BATCH_SIZE
+    from utils.sqlite_writer import get_sqlite_writer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = Path(__file__).parent.parent / "message_journal.jsonl"
+
+
+@dataclass
+class _PendingWrite:
+    """保存待ちのメッセージ"""
+
+    row: dict[str, Any]
+    # 新たに保存された場合True、既存のIDだった場合False
+    future: asyncio.Future[bool]
+    # ジャーナルの行の番号（未保存の行の管理用）
+    seq: int
+
+
+class MessageWriteBehind:
+    """メッセージをまとめて保存する書き込みキュー"""
+
+    MAX_BATCH_SIZE = 500
+    FLUSH_INTERVAL_SECONDS = 0.05  # 最初のメッセージから保存までの最大待ち時間
+    MAX_RETRIES = 3
+    RETRY_BACKOFF_SECONDS = 0.5
+    SHUTDOWN_TIMEOUT_SECONDS = 10.0
+    # ジャーナルがこのサイズ以上で、半分以上がコミット済みの行になったら未保存の行だけに書き直す（バイト）
+    JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+    def __init__(
+        self,
+        journal_path: str | Path = DEFAULT_JOURNAL_PATH,
+        session_factory: Callable[[], Session] | None = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        fsync: bool = True,
+        journal_compact_bytes: int = JOURNAL_COMPACT_BYTES,
+    ) -> None:
+        """初期化
+
+        Args:
+            journal_path: ジャーナルファイルのパス
+            session_factory: DBセッションを作成する関数（省略時はSessionLocal。SQLiteの書き込みスレッドが有効な場合はそちらで保存）
+            max_batch_size: 1回のINSERTで保存する最大件数
+            flush_interval: 最初のメッセージから保存までの最大待ち時間（秒）
+            fsync: バッチの保存前にジャーナルをfsyncするか
+            journal_compact_bytes: ジャーナルを未保存の行だけに書き直す最小サイズ（バイト）
+
+        """
+        self.journal_path = Path(journal_path)
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.journal_compact_bytes = journal_compact_bytes
+        self._session_factory = session_factory
+        self._use_sqlite_writer = session_factory is None
+        self._journal: IO[str] | None = None
+        # ジャーナルのファイル操作（追記・fsync・書き直し）は投入順に1スレッドで実行する
+        self._journal_executor: ThreadPoolExecutor | None = None
+        self._queue: asyncio.Queue[_PendingWrite] | None = None
+        self._worker_task: asyncio.Task | None = None
+        # キュー投入済みでコミットが完了していない件数
+        self._uncommitted = 0
+        # コミットが完了していない（保存に失敗した分を含む）ジャーナルの行と、その合計サイズ
+        self._seq = itertools.count()
+        self._unsaved_lines: dict[int, str] = {}
+        self._unsaved_bytes = 0
+        # 前回の書き直し以降にジャーナルへ書き込んだサイズ
+        self._journal_bytes = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """保存待ちのメッセージ数"""
+        return self._uncommitted
+
+    def _get_session(self) -> Session:
+        if self._session_factory is None:
+            try:
+                # パッケージとして実行される場合
+                from ..database import SessionLocal
+            except ImportError:
+                # 直接実行される場合
+                from database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _insert_rows(self, rows: list[dict[str, Any]]) -> set[str]:
+        """行データを1回のINSERTで保存（run_in_executor用）"""
+        if self._use_sqlite_writer and (writer := get_sqlite_writer()) is not None:
+            return writer.submit(lambda db: crud.bulk_insert_messages(db, rows)).result()
+        db = self._get_session()
+        try:
+            return crud.bulk_insert_messages(db, rows)
+        finally:
+            db.close()
+
+    def recover(self) -> int:
+        """前回の終了時に保存されなかったジャーナルのメッセージを保存し直す
+
+        Returns:
+            新たに保存された件数
+
+        """
+        if not self.journal_path.exists():
+            return 0
+
+        rows: list[dict[str, Any]] = []
+        with self.journal_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    message = MessageCreate.model_validate(entry["message"])
+                    rows.append(crud.message_to_row(message, datetime.fromisoformat(entry["created_at"])))
+                except Exception as e:
+                    # 書き込み途中で終了した最終行などは読み飛ばす
+                    logger.warning(f"ジャーナルの不正な行を読み飛ばします: {e!s}")
+
+        inserted = 0
+        for start in range(0, len(rows), self.max_batch_size):
+            inserted += len(self._insert_rows(rows[start : start + self.max_batch_size]))
+        self.journal_path.unlink()
+        if rows:
+            logger.info(f"ジャーナルから未保存のメッセージを復旧: {inserted}/{len(rows)}件")
+        return inserted
+
+    async def start(self) -> None:
+        """ジャーナルを復旧してから書き込みキューを開始"""
+        await asyncio.get_running_loop().run_in_executor(None, self.recover)
+        self._ensure_worker()
+        logger.info(f"メッセージの一括保存を開始: journal={self.journal_path}")
+
+    def _ensure_worker(self) -> asyncio.Queue[_PendingWrite]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._flush_loop())
+        return self._queue
+
+    def _get_journal_executor(self) -> ThreadPoolExecutor:
+        if self._journal_executor is None:
+            self._journal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message-journal")
+        return self._journal_executor
+
+    @staticmethod
+    def _journal_line(row: dict[str, Any], message: MessageCreate) -> str:
+        """ジャーナルの1行を作成"""
+        entry = {"message": message.model_dump(mode="json"), "created_at": row["created_at"].isoformat()}
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def _open_journal(self) -> IO[str]:
+        if self._journal is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = self.journal_path.open("a", encoding="utf-8")
+        return self._journal
+
+    def _append_journal(self, line: str) -> None:
+        """ジャーナルに1行追記（ジャーナルのスレッドで実行。OSへの書き出しまで行い、プロセスが落ちても失われないようにする）"""
+        try:
+            journal = self._open_journal()
+            journal.write(line)
+            journal.flush()
+        except OSError as e:
+            logger.error(f"ジャーナルへの追記に失敗: {e!s}")
+
+    def _sync_journal(self) -> None:
+        """ジャーナルをディスクに書き出す（ジャーナルのスレッドで実行）"""
+        if self._journal is not None:
+            try:
+                os.fsync(self._journal.fileno())
+            except OSError as e:
+                logger.error(f"ジャーナルのfsyncに失敗: {e!s}")
+
+    def _rewrite_journal(self, lines: list[str]) -> None:
+        """ジャーナルを未保存の行だけに書き直す（ジャーナルのスレッドで実行）"""
+        try:
+            self._replace_journal(lines)
+        except OSError as e:
+            logger.error(f"ジャーナルの書き直しに失敗: {e!s}")
+
+    def _replace_journal(self, lines: list[str]) -> None:
+        journal = self._open_journal()
+        if not lines:
+            journal.seek(0)
+            journal.truncate()
+            return
+        # 書き直しの途中で落ちても元のジャーナルが残るよう、別ファイルに書いてから置き換える
+        temp_path = self.journal_path.with_name(self.journal_path.name + ".tmp")
+        with temp_path.open("w", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        journal.close()
+        self._journal = None
+        temp_path.replace(self.journal_path)
+        self._open_journal()
+
+    def _compact_journal(self) -> None:
+        """コミット済みの行が溜まっていれば、未保存の行だけを残してジャーナルを書き直す
+
+        ジャーナルのスレッドは投入順に実行するため、ここで取得した未保存の行より前に投入した追記は
+        書き直しの前に、後に投入した追記は書き直し後のジャーナルに書き込まれる。
+        """
+        if not self._unsaved_lines:
+            if self._journal_bytes == 0:
+                return
+        elif self._journal_bytes < max(self.journal_compact_bytes, 2 * self._unsaved_bytes):
+            return
+        self._get_journal_executor().submit(self._rewrite_journal, list(self._unsaved_lines.values()))
+        self._journal_bytes = self._unsaved_bytes
+
+    def submit(self, message: MessageCreate) -> asyncio.Future[bool]:
+        """メッセージを書き込みキューに追加
+
+        Args:
+            message: 保存するメッセージ
+
+        Returns:
+            バッチのコミット後に完了するFuture（新たに保存された場合True、既存IDの場合False）
+
+        """
+        queue = self._ensure_worker()
+        row = crud.message_to_row(message, datetime.now(UTC))
+        line = self._journal_line(row, message)
+        size = len(line.encode())
+        seq = next(self._seq)
+        self._unsaved_lines[seq] = line
+        self._unsaved_bytes += size
+        self._journal_bytes += size
+        self._get_journal_executor().submit(self._append_journal, line)
+
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        queue.put_nowait(_PendingWrite(row, future, seq))
+        self._uncommitted += 1
+        return future
+
+    async def _next_batch(self, queue: asyncio.Queue[_PendingWrite]) -> list[_PendingWrite]:
+        """キューから件数・時間の上限までメッセージを取り出す"""
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.max_batch_size:
+            # 既に溜まっている分は待たずに取り出す
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _write_batch(self, batch: list[_PendingWrite]) -> bool:
+        """バッチを保存し、各メッセージのFutureを完了させる
+
+        Returns:
+            保存できた場合True
+
+        """
+        loop = asyncio.get_running_loop()
+        # 同じバッチ内で重複したIDは最初の1件のみ保存する
+        first_by_id = {pending.row["id"]: pending for pending in reversed(batch)}
+        rows = [pending.row for pending in batch if first_by_id[pending.row["id"]] is pending]
+        error: Exception | None = None
+
+        for attempt in range(self.MAX_RETRIES):
+            start = time.perf_counter()
+            try:
+                inserted_ids = await loop.run_in_executor(None, self._insert_rows, rows)
+            except Exception as e:
+                error = e
+                logger.warning(f"メッセージの一括保存に失敗（{attempt + 1}/{self.MAX_RETRIES}）: {e!s}")
+                await asyncio.sleep(self.RETRY_BACKOFF_SECONDS * (2**attempt))
+                continue
+
+            DB_SAVE_DURATION.observe(time.perf_counter() - start, source="write_behind")
+            WRITE_BEHIND_BATCH_SIZE.observe(len(batch))
+            for pending in batch:
+                self._unsaved_bytes -= len(self._unsaved_lines.pop(pending.seq).encode())
+                if not pending.future.done():
+                    is_first = first_by_id[pending.row["id"]] is pending
+                    pending.future.set_result(is_first and pending.row["id"] in inserted_ids)
+            return True
+
+        # 保存できなかったメッセージはジャーナルに残し、次回起動時に再実行する
+        logger.error(f"メッセージの一括保存を中止: {len(batch)}件")
+        for pending in batch:
+            if not pending.future.done():
+                pending.future.set_exception(error or RuntimeError("write-behind failed"))
+        return False
+
+    async def _flush_loop(self) -> None:
+        """書き込みキューのメインループ"""
+        queue = self._queue
+        assert queue is not None
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = await self._next_batch(queue)
+                try:
+                    # バッチの行の追記が終わるのを待ち、保存前にまとめてディスクに書き出す
+                    if self.fsync:
+                        await loop.run_in_executor(self._get_journal_executor(), self._sync_journal)
+                    # 保存に失敗したメッセージは未保存の行としてジャーナルに残し、次回起動時に再実行する
+                    await self._write_batch(batch)
+                finally:
+                    self._uncommitted -= len(batch)
+                    for _ in batch:
+                        queue.task_done()
+                self._compact_journal()
+        except asyncio.CancelledError:
+            logger.debug("メッセージの一括保存ループが停止されました")
+            raise
+
+    async def close(self) -> None:
+        """保存待ちのメッセージを保存し切ってから停止"""
+        if self._worker_task is not None and not self._worker_task.done():
+            queue = self._queue
+            try:
+                if queue is not None:
+                    await asyncio.wait_for(queue.join(), timeout=self.SHUTDOWN_TIMEOUT_SECONDS)
+            except TimeoutError:
+                logger.warning(f"保存されていないメッセージが残っています（次回起動時に復旧）: {self.queue_depth}件")
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+        self._worker_task = None
+        self._queue = None
+
+        if self._journal_executor is not None:
+            self._journal_executor.shutdown(wait=True)
+            self._journal_executor = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+def is_write_behind_enabled() -> bool:
+    """環境変数で一括保存が有効化されているか"""
+    return os.getenv("MESSAGE_WRITE_BEHIND", "false").lower() in ("true", "1", "yes", "on")
+
+
+# グローバルインスタンス
+_message_writer: MessageWriteBehind | None = None
+
+
+def get_message_writer() -> MessageWriteBehind | None:
+    """書き込みキューのシングルトンインスタンスを取得（無効の場合はNone）"""
+    global _message_writer
+    if _message_writer is None and is_write_behind_enabled():
+        _message_writer = MessageWriteBehind(
+            os.getenv("MESSAGE_JOURNAL_PATH", DEFAULT_JOURNAL_PATH),
+            fsync=os.getenv("MESSAGE_JOURNAL_FSYNC", "true").lower() in ("true", "1", "yes", "on"),
+        )
+    return _message_writer
+
+
+async def start_message_writer() -> None:
+    """書き込みキューを開始（無効の場合は何もしない）"""
+    writer = get_message_writer()
+    if writer is not None:
+        await writer.start()
+
+
+async def stop_message_writer() -> None:
+    """書き込みキューを停止"""
+    if _message_writer is not None:
+        await _message_writer.close()
@@ -0,0 +1,171 @@
+"""WebSocketメッセージのエンコード形式（コーデック）
+
+クライアントは接続時のサブプロトコル（Sec-WebSocket-Protocol）でメッセージの形式を選ぶ。
+同じConnectionManagerにJSONとバイナリのクライアントが混在でき、送信時は接続ごとの形式でエンコードする。
+
+- サブプロトコルなし / ai-community.json: JSONのテキストフレーム（従来の形式）
+- ai-community.msgpack: MessagePackのバイナリフレーム。キーを短縮名（SHORT_KEYS）にして送受信する
+
+ブロードキャストはOutgoingMessageにまとめ、接続数に関係なく形式ごとに1回だけエンコードする。
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any, ClassVar
+
+import msgpack
+
+# 各形式のサブプロトコル名
+JSON_SUBPROTOCOL = "ai-community.json"
+MSGPACK_SUBPROTOCOL = "ai-community.msgpack"
+
+# バイナリ形式で使うキーの短縮名（階層に関係なく、辞書のキーを置き換える）
+SHORT_KEYS = {
+    "type": "t",
+    "data": "d",
+    "id": "i",
+    "channel_id": "c",
+    "user_id": "u",
+    "user_name": "n",
+    "user_type": "ut",
+    "content": "m",
+    "timestamp": "ts",
+    "is_own_message": "o",
+    "seq": "s",
+    "epoch": "e",
+    "success": "ok",
+    "error": "err",
+    "message": "msg",
+    "last_seq": "ls",
+    "last_message_id": "lm",
+    "has_more": "hm",
+    "source": "src",
+    "count": "cnt",
+    "messages": "ms",
+    "batch_id": "b",
+    "results": "r",
+}
+_LONG_KEYS = {short: key for key, short in SHORT_KEYS.items()}
+
+
+class MessageDecodeError(ValueError):
+    """受信したフレームを解析できない場合のエラー"""
+
+
+def _rename_keys(value: Any, names: dict[str, str]) -> Any:  # noqa: ANN401
+    """辞書のキーを入れ子の辞書・リストも含めて置き換える（対応表にないキーはそのまま）"""
+    if isinstance(value, dict):
+        return {names.get(key, key): _rename_keys(item, names) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rename_keys(item, names) for item in value]
+    return value
+
+
+class MessageCodec(ABC):
+    """メッセージのエンコード形式の基底クラス"""
+
+    # サブプロトコル名・ログやエラーメッセージに使う形式名
+    subprotocol: ClassVar[str]
+    label: ClassVar[str]
+
+    @abstractmethod
+    def encode(self, message: dict[str, Any]) -> str | bytes:
+        """送信するメッセージをフレームにする"""
+
+    @abstractmethod
+    def decode(self, frame: str | bytes) -> Any:  # noqa: ANN401
+        """受信したフレームをメッセージにする
+
+        Raises:
+            MessageDecodeError: フレームを解析できない場合
+
+        """
+
+
+class JsonCodec(MessageCodec):
+    """JSONのテキストフレーム"""
+
+    subprotocol = JSON_SUBPROTOCOL
+    label = "JSON"
+
+    def encode(self, message: dict[str, Any]) -> str:
+        """送信するメッセージをJSONにする"""
+        return json.dumps(message)
+
+    def decode(self, frame: str | bytes) -> Any:  # noqa: ANN401
+        """受信したJSONを解析"""
+        try:
+            return json.loads(frame)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise MessageDecodeError(str(e)) from e
+
+
+class MsgpackCodec(MessageCodec):
+    """キーを短縮名にしたMessagePackのバイナリフレーム"""
+
+    subprotocol = MSGPACK_SUBPROTOCOL
+    label = "MessagePack"
+
+    def encode(self, message: dict[str, Any]) -> bytes:
+        """送信するメッセージをMessagePackにする"""
+        packed = msgpack.packb(_rename_keys(message, SHORT_KEYS))
+        # Packerを使わない場合は必ずbytesが返る（型定義上はNoneを含む）
+        assert packed is not None
+        return packed
+
+    def decode(self, frame: str | bytes) -> Any:  # noqa: ANN401
+        """受信したMessagePackを解析し、キーを元の名前に戻す"""
+        if isinstance(frame, str):
+            raise MessageDecodeError("MessagePackはバイナリフレームで送信してください")
+        try:
+            return _rename_keys(msgpack.unpackb(frame), _LONG_KEYS)
+        except Exception as e:
+            raise MessageDecodeError(str(e)) from e
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgpackCodec()
+CODECS: dict[str, MessageCodec] = {codec.subprotocol: codec for codec in (JSON_CODEC, MSGPACK_CODEC)}
+
+
+def negotiate_codec(subprotocols: list[str]) -> tuple[MessageCodec, str | None]:
+    """クライアントが提示したサブプロトコルから形式を選ぶ
+
+    Args:
+        subprotocols: クライアントが提示したサブプロトコル（優先する順）
+
+    Returns:
+        (使用する形式, 応答するサブプロトコル)。対応する形式がない場合はJSONで、サブプロトコルはNone
+
+    """
+    for subprotocol in subprotocols:
+        codec = CODECS.get(subprotocol)
+        if codec is not None:
+            return codec, subprotocol
+    return JSON_CODEC, None
+
+
+class OutgoingMessage:
+    """送信するメッセージと、形式ごとにエンコード済みのフレーム
+
+    同じメッセージを複数の接続に送る場合に、形式ごとのエンコードを1回にする。
+    """
+
+    __slots__ = ("_frames", "message")
+
+    def __init__(self, message: dict[str, Any]) -> None:
+        """初期化
+
+        Args:
+            message: 送信するメッセージ
+
+        """
+        self.message = message
+        self._frames: dict[str, str | bytes] = {}
+
+    def frame(self, codec: MessageCodec) -> str | bytes:
+        """指定した形式のフレームを取得（初回のみエンコードする）"""
+        frame = self._frames.get(codec.subprotocol)
+        if frame is None:
+            frame = self._frames[codec.subprotocol] = codec.encode(self.message)
+        return frame
@@ -0,0 +1,200 @@
+"""WebSocketの圧縮転送（permessage-deflate）
+
+uvicornのWebSocket実装はpermessage-deflateを固定の設定で有効にするため、ウィンドウサイズ等を
+環境変数で調整でき、小さいフレームは圧縮せずに送るプロトコルクラスを提供する。
+送信メッセージの圧縮前後のバイト数はメッセージタイプごとにメトリクスへ記録する。
+
+使い方:
+    uvicorn src.backend.main:app --ws src.backend.websocket.compression:CompressedWebSocketProtocol
+
+環境変数:
+    WS_DEFLATE_ENABLED: false で圧縮を無効化（デフォルト true）
+    WS_DEFLATE_WINDOW_BITS: 圧縮ウィンドウサイズ（2の累乗の指数、9-15。デフォルト 12）
+    WS_DEFLATE_MEM_LEVEL: zlibのメモリレベル（1-9。デフォルト 5）
+    WS_DEFLATE_LEVEL: zlibの圧縮レベル（0-9。デフォルト 6）
+    WS_DEFLATE_MIN_SIZE: これより小さいメッセージは圧縮しない（バイト。デフォルト 256）
+"""
+
+import asyncio
+import logging
+import os
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cache
+from typing import Any
+
+from uvicorn.config import Config
+from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+from uvicorn.server import ServerState
+from websockets import frames
+from websockets.extensions.base import Extension
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.server import ServerProtocol
+from websockets.typing import ExtensionParameter
+
+try:
+    # パッケージとして実行される場合
+    from ..utils.metrics import WEBSOCKET_OUTGOING_BYTES, WEBSOCKET_OUTGOING_MESSAGES
+except ImportError:
+    # 直接実行される場合
+    from utils.metrics import WEBSOCKET_OUTGOING_BYTES, WEBSOCKET_OUTGOING_MESSAGES
+
+# 送信するJSONは先頭が {"type": "..."} のため、先頭部分からメッセージタイプを取り出す
+_MESSAGE_TYPE_PATTERN = re.compile(rb'^\{"type":\s*"([a-z_:]{1,40})"')
+# MessagePack（websocket.codec）の場合は先頭が {"t": "..."}（fixmap・fixstrのキー・fixstrの値）
+_MSGPACK_MESSAGE_TYPE_PATTERN = re.compile(rb"^[\x80-\x8f]\xa1t[\xa0-\xbf]([a-z_:]{1,31})")
+_MESSAGE_TYPE_PEEK_BYTES = 64
+
+
+@dataclass(frozen=True)
+class DeflateSettings:
+    """permessage-deflateの設定"""
+
+    enabled: bool = True
+    window_bits: int = 12
+    mem_level: int = 5
+    level: int = 6
+    min_size: int = 256
+
+    @classmethod
+    def from_env(cls) -> "DeflateSettings":
+        """環境変数から設定を読み込む"""
+        return cls(
+            enabled=os.getenv("WS_DEFLATE_ENABLED", "true").lower() in ("true", "1", "yes", "on"),
+            window_bits=int(os.getenv("WS_DEFLATE_WINDOW_BITS", str(cls.window_bits))),
+            mem_level=int(os.getenv("WS_DEFLATE_MEM_LEVEL", str(cls.mem_level))),
+            level=int(os.getenv("WS_DEFLATE_LEVEL", str(cls.level))),
+            min_size=int(os.getenv("WS_DEFLATE_MIN_SIZE", str(cls.min_size))),
+        )
+
+
+@cache
+def get_deflate_settings() -> DeflateSettings:
+    """環境変数の圧縮設定を取得（起動後は変更されないため1度だけ読み込む）"""
+    return DeflateSettings.from_env()
+
+
+def _message_type(data: bytes | bytearray | memoryview) -> str:
+    """フレームの先頭からメッセージタイプを取得（取得できない場合はother）"""
+    head = bytes(data[:_MESSAGE_TYPE_PEEK_BYTES])
+    match = _MESSAGE_TYPE_PATTERN.match(head) or _MSGPACK_MESSAGE_TYPE_PATTERN.match(head)
+    return match.group(1).decode() if match else "other"
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """小さいメッセージを圧縮せずに送り、圧縮前後のバイト数を記録するpermessage-deflate
+
+    RFC 7692ではメッセージごとにRSV1ビットで圧縮の有無を示すため、
+    一部のメッセージだけ非圧縮で送ってもクライアント側の変更は不要。
+    """
+
+    def __init__(
+        self,
+        remote_no_context_takeover: bool,
+        local_no_context_takeover: bool,
+        remote_max_window_bits: int,
+        local_max_window_bits: int,
+        compress_settings: dict[str, int] | None = None,
+        min_size: int = 0,
+    ) -> None:
+        """初期化
+
+        Args:
+            remote_no_context_takeover: クライアントが圧縮状態をメッセージ間で引き継がないか
+            local_no_context_takeover: サーバーが圧縮状態をメッセージ間で引き継がないか
+            remote_max_window_bits: クライアントの圧縮ウィンドウサイズ
+            local_max_window_bits: サーバーの圧縮ウィンドウサイズ
+            compress_settings: zlib.compressobjの設定
+            min_size: これより小さいメッセージは圧縮しない（バイト）
+
+        """
+        super().__init__(
+            remote_no_context_takeover,
+            local_no_context_takeover,
+            remote_max_window_bits,
+            local_max_window_bits,
+            compress_settings,
+        )
+        self.min_size = min_size
+
+    def encode(self, frame: frames.Frame) -> frames.Frame:
+        """送信フレームを圧縮"""
+        if frame.opcode in frames.CTRL_OPCODES:
+            return frame
+
+        message_type = _message_type(frame.data) if frame.opcode is not frames.OP_CONT else "other"
+        # 分割されていない小さいメッセージは圧縮しない（分割されたメッセージは途中で切り替えられない）
+        if frame.fin and frame.opcode is not frames.OP_CONT and len(frame.data) < self.min_size:
+            encoded = frame
+        else:
+            encoded = super().encode(frame)
+
+        WEBSOCKET_OUTGOING_BYTES.inc(len(frame.data), message_type=message_type, stage="before")
+        WEBSOCKET_OUTGOING_BYTES.inc(len(encoded.data), message_type=message_type, stage="after")
+        if frame.opcode is not frames.OP_CONT:
+            WEBSOCKET_OUTGOING_MESSAGES.inc(message_type=message_type, compressed=str(encoded is not frame).lower())
+        return encoded
+
+
+class ThresholdServerPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    """ThresholdPerMessageDeflateを作成するサーバー側のネゴシエーション"""
+
+    def __init__(self, window_bits: int, compress_settings: dict[str, int], min_size: int = 0) -> None:
+        """初期化
+
+        Args:
+            window_bits: サーバー・クライアントの圧縮ウィンドウサイズの上限
+            compress_settings: zlib.compressobjの設定
+            min_size: これより小さいメッセージは圧縮しない（バイト）
+
+        """
+        super().__init__(
+            server_max_window_bits=window_bits,
+            client_max_window_bits=window_bits,
+            compress_settings=compress_settings,
+        )
+        self.min_size = min_size
+
+    def process_request_params(
+        self, params: Sequence[ExtensionParameter], accepted_extensions: Sequence[Extension]
+    ) -> tuple[list[ExtensionParameter], ThresholdPerMessageDeflate]:
+        """クライアントの要求を受け入れ、ネゴシエーション結果の設定で拡張を作成"""
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        assert isinstance(extension, PerMessageDeflate)
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+def create_deflate_factory(settings: DeflateSettings) -> ThresholdServerPerMessageDeflateFactory:
+    """設定からpermessage-deflateのネゴシエーションを作成"""
+    return ThresholdServerPerMessageDeflateFactory(
+        settings.window_bits,
+        {"memLevel": settings.mem_level, "level": settings.level},
+        settings.min_size,
+    )
+
+
+class CompressedWebSocketProtocol(WebSocketsSansIOProtocol):
+    """設定可能なpermessage-deflateを使うuvicornのWebSocketプロトコル"""
+
+    def __init__(
+        self,
+        config: Config,
+        server_state: ServerState,
+        app_state: dict[str, Any],
+        _loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        """初期化（uvicorn標準の圧縮設定を環境変数の設定で置き換える）"""
+        super().__init__(config, server_state, app_state, _loop)
+        settings = get_deflate_settings()
+        extensions = [create_deflate_factory(settings)] if settings.enabled else []
+        self.conn = ServerProtocol(
+            extensions=extensions, max_size=config.ws_max_size, logger=logging.getLogger("uvicorn.error")
+        )
@@ -1,13 +1,18 @@
 """WebSocketメッセージハンドリング"""
 
-import json
+import asyncio
 import logging
 import os
+import time
 import traceback
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
 from typing import Any, NotRequired, Required, TypedDict
 
 from fastapi import WebSocket
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import ErrorDetails
+from sqlalchemy import Connection, Engine
 from sqlalchemy.orm import Session
 from starlette.websockets import WebSocketState
 
@@ -15,22 +20,41 @@ try:
     # パッケージとして実行される場合
     from .. import crud
     from ..ai.message_handlers import handle_ai_response
-    from ..schemas import MessageCreate
-    from ..utils.session_manager import save_message_with_session_management
+    from ..schemas import IncomingMessage, MessageCreate, serialize_datetime_to_utc_iso
+    from ..utils.metrics import (
+        BROADCAST_DURATION,
+        DB_SAVE_DURATION,
+        DUPLICATE_MESSAGES,
+        WS_RECEIVE_TO_ACK_DURATION,
+    )
+    from ..utils.recent_ids import recent_message_ids
+    from ..utils.session_manager import read_with_session_management, save_message_with_writer
+    from ..utils.tracing import get_tracer
+    from ..utils.write_behind import get_message_writer
+    from .codec import OutgoingMessage
     from .manager import manager
+    from .replay import replay_buffer
 except ImportError:
     # 直接実行される場合
     import crud
     from ai.message_handlers import handle_ai_response
-    from schemas import MessageCreate
-    from utils.session_manager import save_message_with_session_management
+    from schemas import IncomingMessage, MessageCreate, serialize_datetime_to_utc_iso
+    from utils.metrics import BROADCAST_DURATION, DB_SAVE_DURATION, DUPLICATE_MESSAGES, WS_RECEIVE_TO_ACK_DURATION
+    from utils.recent_ids import recent_message_ids
+    from utils.session_manager import read_with_session_management, save_message_with_writer
+    from utils.tracing import get_tracer
+    from utils.write_behind import get_message_writer
+    from websocket.codec import OutgoingMessage
     from websocket.manager import manager
+    from websocket.replay import replay_buffer
 
 
 class MessageTypes:
     """サポートされるWebSocketメッセージタイプの定数クラス."""
 
     SEND = "message:send"
+    SEND_BATCH = "message:send_batch"
+    RESUME = "message:resume"
     # 将来的に追加される予定
     # EDIT = "message:edit"
     # DELETE = "message:delete"
@@ -39,48 +63,70 @@ class MessageTypes:
 # サポートされているメッセージタイプ
 SUPPORTED_MESSAGE_TYPES = {
     MessageTypes.SEND,
+    MessageTypes.SEND_BATCH,
+    MessageTypes.RESUME,
+}
+
+# 必須フィールドと期待する型（エラーメッセージは先頭のフィールドから順に判定する）
+REQUIRED_MESSAGE_FIELDS: dict[str, type] = {
+    "id": str,
+    "channel_id": str,
+    "user_id": str,
+    "user_name": str,
+    "content": str,
+    "timestamp": str,
+    "is_own_message": bool,
 }
+# 型の誤りとして扱う検証エラーの種類
+_TYPE_ERROR_TYPES = {"string_type", "bool_type"}
+# 本文の検証エラーの種類（schemas._validate_content）
+_CONTENT_ERROR_TYPES = {"content_empty", "content_too_long"}
+
+# 再送ログから差分が消えている場合にDBから再送する最大件数
+MAX_RESUME_DB_MESSAGES = 100
+# 一括送信（message:send_batch）で1回に受け付ける最大件数
+MAX_BATCH_MESSAGES = 500
 
-# メッセージ長制限
-MAX_MESSAGE_LENGTH = 10000
+# 一括送信されたメッセージをまとめて検証するアダプター
+_INCOMING_BATCH_ADAPTER = TypeAdapter(list[IncomingMessage])
 
 logger = logging.getLogger(__name__)
 
+# 保存完了を待って通知するタスク（実行中にGCされないよう参照を保持）
+_pending_ack_tasks: set[asyncio.Task] = set()
+
 
 def is_production() -> bool:
     """本番環境かどうかを判定"""
     return os.getenv("ENVIRONMENT", "development").lower() == "production"
 
 
-def validate_message_data(message_data: dict[str, Any]) -> tuple[bool, str | None]:
-    """メッセージデータの詳細バリデーション"""
-    required_fields = {
-        "id": str,
-        "channel_id": str,
-        "user_id": str,
-        "user_name": str,
-        "content": str,
-        "timestamp": str,
-        "is_own_message": bool,
-    }
+def describe_validation_error(error_details: list[ErrorDetails]) -> str | None:
+    """受信メッセージの検証エラーをクライアントに返すエラー内容にする
 
-    for field_name, field_type in required_fields.items():
-        if field_name not in message_data:
-            return False, f"必須フィールド '{field_name}' が不足しています"
+    必須フィールドの不足・型の誤り（フィールドの順）、本文の空・長さの順に判定する。
 
-        value = message_data[field_name]
-        if not isinstance(value, field_type):
-            return False, f"フィールド '{field_name}' の型が正しくありません（期待値: {field_type.__name__}）"
+    Returns:
+        エラー内容（いずれにも該当しない形式の誤りの場合はNone）
 
-    # 追加的なバリデーション
-    content = message_data["content"]
-    if not content.strip():
-        return False, "メッセージ内容は空にできません"
+    """
+    errors: dict[Any, ErrorDetails] = {}
+    for detail in error_details:
+        errors.setdefault(detail["loc"][0] if detail["loc"] else None, detail)
 
-    if len(content) > MAX_MESSAGE_LENGTH:
-        return False, "メッセージが長すぎます"
+    for field_name, field_type in REQUIRED_MESSAGE_FIELDS.items():
+        detail = errors.get(field_name)
+        if detail is None:
+            continue
+        if detail["type"] == "missing":
+            return f"必須フィールド '{field_name}' が不足しています"
+        if detail["type"] in _TYPE_ERROR_TYPES:
+            return f"フィールド '{field_name}' の型が正しくありません（期待値: {field_type.__name__}）"
 
-    return True, None
+    content_error = errors.get("content")
+    if content_error is not None and content_error["type"] in _CONTENT_ERROR_TYPES:
+        return content_error["msg"]
+    return None
 
 
 class WebSocketMessage(TypedDict):
@@ -99,8 +145,8 @@ def is_websocket_connected(websocket: WebSocket) -> bool:
         return False
 
 
-async def safe_send_message(websocket: WebSocket, message: str) -> bool:
-    """WebSocket接続が有効な場合のみメッセージを送信"""
+async def safe_send_message(websocket: WebSocket, message: dict[str, Any] | OutgoingMessage) -> bool:
+    """WebSocket接続が有効な場合のみメッセージを送信（接続の形式でエンコードする）"""
     if not is_websocket_connected(websocket):
         logger.warning("WebSocket接続が切断されているため、メッセージ送信をスキップ")
         return False
@@ -123,62 +169,187 @@ async def _send_error_response(websocket: WebSocket, message_id: str | None, err
             "error": error_message,
         },
     }
-    await safe_send_message(websocket, json.dumps(error_response))
+    await safe_send_message(websocket, error_response)
 
 
-async def _validate_and_parse_message(message_data: dict[str, Any]) -> tuple[MessageCreate | None, str | None]:
-    """メッセージデータのバリデーションとパース処理."""
-    # 詳細なメッセージデータバリデーション
-    is_valid, validation_error = validate_message_data(message_data)
-    if not is_valid:
-        return None, f"メッセージデータが無効です: {validation_error}"
+def _invalid_message_error(error_details: list[ErrorDetails], summary: str) -> str:
+    """検証エラーをクライアントに返すエラーメッセージにする（形式の誤りはログに出力）."""
+    if (validation_error := describe_validation_error(error_details)) is not None:
+        return f"メッセージデータが無効です: {validation_error}"
+    logger.warning(f"Pydanticバリデーションエラー: {summary}")
+    if not is_production():
+        logger.debug(f"バリデーション詳細: {error_details}")
+    return "メッセージフォーマットが正しくありません"
 
+
+def parse_message_data(message_data: dict[str, Any]) -> tuple[MessageCreate | None, str | None]:
+    """メッセージデータのバリデーションとパース処理（1回の検証で行う）."""
     try:
-        # Pydanticバリデーション
-        message_create = MessageCreate.model_validate(message_data)
-        return message_create, None
+        return IncomingMessage.model_validate(message_data), None
     except ValidationError as ve:
-        logger.warning(f"Pydanticバリデーションエラー: {ve!s}")
-        if not is_production():
-            logger.debug(f"バリデーション詳細: {ve.errors()}")
-        return None, "メッセージフォーマットが正しくありません"
+        return None, _invalid_message_error(ve.errors(), str(ve))
+
+
+def parse_message_batch(items: list[Any]) -> list[tuple[MessageCreate | None, str | None]]:
+    """一括送信されたメッセージのバリデーションとパース処理.
+
+    全件をまとめて1回で検証し、誤りがある場合のみ、エラーのないメッセージを個別に検証し直す。
+
+    Returns:
+        送信された順の (パース結果, エラー内容) のリスト
+    """
+    try:
+        return [(message, None) for message in _INCOMING_BATCH_ADAPTER.validate_python(items)]
+    except ValidationError as ve:
+        # エラーの位置（先頭が何番目のメッセージか）でメッセージごとに分ける
+        errors_by_index: dict[int, list[ErrorDetails]] = defaultdict(list)
+        for detail in ve.errors():
+            index = detail["loc"][0]
+            assert isinstance(index, int)
+            errors_by_index[index].append({**detail, "loc": detail["loc"][1:]})
+
+    results: list[tuple[MessageCreate | None, str | None]] = []
+    for index, item in enumerate(items):
+        error_details = errors_by_index.get(index)
+        if error_details is None:
+            results.append((IncomingMessage.model_validate(item), None))
+        else:
+            summary = f"{index}番目のメッセージ: {'; '.join(detail['msg'] for detail in error_details)}"
+            results.append((None, _invalid_message_error(error_details, summary)))
+    return results
+
+
+async def _send_saved_response(websocket: WebSocket, message_id: str) -> None:
+    """保存成功をクライアントに通知."""
+    response = {"type": "message:saved", "data": {"id": message_id, "success": True}}
+    await safe_send_message(websocket, response)
 
 
 async def _save_and_notify_success(
     websocket: WebSocket,
     message_create: MessageCreate,
     db_session: Session | None,
-) -> None:
-    """メッセージ保存と成功通知処理."""
-    save_message_with_session_management(
-        lambda session: crud.create_message(session, message_create),
-        db_session,
-        auto_commit=(db_session is None),
-    )
+) -> bool:
+    """メッセージ保存と成功通知処理.
+
+    Returns:
+        新たに保存された場合True（IDが既に保存されていた場合False）
+    """
+    db_start = time.perf_counter()
+    with get_tracer().span("db.save_message", source="user", message_id=message_create.id):
+        saved_message = await save_message_with_writer(
+            lambda session: crud.create_message(session, message_create),
+            db_session,
+            auto_commit=(db_session is None),
+        )
+    DB_SAVE_DURATION.observe(time.perf_counter() - db_start, source="user")
+    recent_message_ids.add(message_create.id)
+
+    # 保存成功をクライアントに通知（再送されたメッセージも保存済みとして扱う）
+    await _send_saved_response(websocket, message_create.id)
+    if saved_message is None:
+        DUPLICATE_MESSAGES.inc(detected_by="database")
+        logger.info(f"保存済みのメッセージを再受信しました: {message_create.id}")
+        return False
 
-    # 保存成功をクライアントに通知
-    response = {"type": "message:saved", "data": {"id": message_create.id, "success": True}}
-    await safe_send_message(websocket, json.dumps(response))
     logger.info(f"メッセージが保存されました: {message_create.id}")
+    return True
 
 
-async def _broadcast_message_to_others(websocket: WebSocket, message_create: MessageCreate) -> None:
-    """送信者以外の全クライアントにメッセージをブロードキャスト."""
-    broadcast_data = {
+async def _notify_when_committed(
+    websocket: WebSocket,
+    message_create: MessageCreate,
+    message_data: dict[str, Any],
+    db_bind: Engine | Connection | None,
+    committed: asyncio.Future[bool],
+    received_at: float,
+) -> None:
+    """一括保存のコミット完了を待って保存成功（または失敗）を通知し、新たに保存された場合のみブロードキャスト・AI応答を行う."""
+    message_id = message_create.id
+    try:
+        with get_tracer().span("db.write_behind_commit", message_id=message_id):
+            inserted = await committed
+    except Exception as e:
+        logger.error(f"メッセージの一括保存エラー: {e!s}")
+        # 再送時に保存し直せるようにする
+        recent_message_ids.discard(message_id)
+        await _send_error_response(websocket, message_id, "メッセージの保存に失敗しました")
+        return
+
+    await _send_saved_response(websocket, message_id)
+    WS_RECEIVE_TO_ACK_DURATION.observe(time.perf_counter() - received_at)
+    if not inserted:
+        # 保存済みのメッセージの再送（ブロードキャスト・AI応答は初回受信時に実行済み）
+        DUPLICATE_MESSAGES.inc(detected_by="database")
+        logger.info(f"保存済みのメッセージを再受信しました: {message_id}")
+        return
+    logger.debug(f"メッセージが保存されました: {message_id}")
+
+    try:
+        await _broadcast_message_to_others(websocket, message_create)
+    except Exception as e:
+        logger.error(f"ブロードキャストエラー: {e!s}")
+
+    # 受信処理のセッションは応答後に閉じられるため、同じ接続先で新しいセッションを作成する
+    db_session = Session(bind=db_bind) if db_bind is not None else None
+    try:
+        await _handle_ai_response_safely(websocket, message_data, db_session)
+    finally:
+        if db_session is not None:
+            db_session.close()
+
+
+def _submit_to_write_behind(
+    websocket: WebSocket,
+    message_create: MessageCreate,
+    message_data: dict[str, Any],
+    db_session: Session | None,
+    received_at: float,
+) -> bool:
+    """一括保存が有効な場合は書き込みキューに追加し、コミット後に保存通知・ブロードキャスト・AI応答を行う.
+
+    Returns:
+        書き込みキューに追加した場合True（一括保存が無効の場合False）
+    """
+    writer = get_message_writer()
+    if writer is None:
+        return False
+
+    committed = writer.submit(message_create)
+    recent_message_ids.add(message_create.id)
+    db_bind = db_session.get_bind() if db_session is not None else None
+    task = asyncio.create_task(
+        _notify_when_committed(websocket, message_create, message_data, db_bind, committed, received_at)
+    )
+    _pending_ack_tasks.add(task)
+    task.add_done_callback(_pending_ack_tasks.discard)
+    return True
+
+
+def _to_broadcast_data(message_create: MessageCreate) -> dict[str, Any]:
+    """ユーザーメッセージをブロードキャストするdataにする."""
+    return {
         "id": message_create.id,
         "channel_id": message_create.channel_id,
         "user_id": message_create.user_id,
         "user_name": message_create.user_name,
+        "user_type": message_create.user_type.value,
         "content": message_create.content,
         "timestamp": message_create.timestamp.isoformat(),
         "is_own_message": False,  # 他のクライアントにとっては他人のメッセージ
     }
 
+
+async def _broadcast_message_to_others(websocket: WebSocket, message_create: MessageCreate) -> None:
+    """送信者以外の全クライアントにメッセージをブロードキャスト."""
     user_broadcast_message = {
         "type": "message:broadcast",
-        "data": broadcast_data,
+        "data": _to_broadcast_data(message_create),
     }
-    await manager.broadcast(json.dumps(user_broadcast_message), exclude_websocket=websocket)
+    broadcast_start = time.perf_counter()
+    with get_tracer().span("websocket.broadcast", source="user", connections=len(manager.active_connections)):
+        await manager.broadcast_message(user_broadcast_message, exclude_websocket=websocket)
+    BROADCAST_DURATION.observe(time.perf_counter() - broadcast_start, source="user")
     logger.info(f"ユーザーメッセージをブロードキャスト（送信者除く）: {message_create.id}")
 
 
@@ -198,7 +369,7 @@ async def _handle_ai_response_safely(
             "type": "ai:error",
             "data": {"message": "AI応答の生成に失敗しました。しばらく時間をおいてから再度お試しください。"},
         }
-        await safe_send_message(websocket, json.dumps(ai_error_response))
+        await safe_send_message(websocket, ai_error_response)
         # AI応答エラーはユーザーメッセージ保存に影響しないため継続
 
 
@@ -208,20 +379,37 @@ async def _handle_message_send(
     db_session: Session | None,
 ) -> None:
     """メッセージ送信処理の実装."""
+    received_at = time.perf_counter()
+
     # メッセージデータの存在を検証
     if not message_data or not isinstance(message_data, dict):
         await _send_error_response(websocket, None, "無効なメッセージデータです")
         return
 
     # バリデーションとパース
-    message_create, error_message = await _validate_and_parse_message(message_data)
+    message_create, error_message = parse_message_data(message_data)
     if error_message or message_create is None:
         await _send_error_response(websocket, message_data.get("id"), error_message or "メッセージの解析に失敗しました")
         return
 
     try:
+        # 再送されたメッセージはDBに問い合わせず、保存済みとして応答する
+        # （ブロードキャスト・AI応答は初回受信時に実行済みのため行わない）
+        if recent_message_ids.contains(message_create.id):
+            DUPLICATE_MESSAGES.inc(detected_by="cache")
+            logger.info(f"再送されたメッセージを検出しました: {message_create.id}")
+            await _send_saved_response(websocket, message_create.id)
+            return
+
+        # 一括保存が有効な場合は、コミット後に非同期で通知・ブロードキャスト・AI応答を行う
+        if _submit_to_write_behind(websocket, message_create, message_data, db_session, received_at):
+            return
+
         # メッセージ保存と成功通知
-        await _save_and_notify_success(websocket, message_create, db_session)
+        inserted = await _save_and_notify_success(websocket, message_create, db_session)
+        WS_RECEIVE_TO_ACK_DURATION.observe(time.perf_counter() - received_at)
+        if not inserted:
+            return
 
         # 他のクライアントにブロードキャスト
         await _broadcast_message_to_others(websocket, message_create)
@@ -242,6 +430,215 @@ async def _handle_message_send(
         await _send_error_response(websocket, message_id, "メッセージの保存に失敗しました")
 
 
+async def _save_message_batch(messages: list[MessageCreate], db_session: Session | None) -> set[str]:
+    """メッセージを1トランザクションでまとめて保存.
+
+    作成日時は送信された順に1マイクロ秒ずつずらし、同じチャンネルの表示順を送信順にする。
+
+    Returns:
+        新たに保存されたメッセージのID
+    """
+    created_at = datetime.now(UTC)
+    rows = [
+        crud.message_to_row(message, created_at + timedelta(microseconds=index))
+        for index, message in enumerate(messages)
+    ]
+    db_start = time.perf_counter()
+    with get_tracer().span("db.save_message_batch", source="user", count=len(rows)):
+        inserted_ids = await save_message_with_writer(
+            lambda session: crud.bulk_insert_messages(session, rows),
+            db_session,
+            auto_commit=(db_session is None),
+        )
+    DB_SAVE_DURATION.observe(time.perf_counter() - db_start, source="user_batch")
+    return inserted_ids
+
+
+async def _handle_message_send_batch(
+    websocket: WebSocket,
+    batch_data: dict[str, Any] | None,
+    db_session: Session | None,
+) -> None:
+    """複数メッセージの一括送信処理.
+
+    まとめて検証し、正しいメッセージを1トランザクションで保存して、送信者以外に1つのフレーム
+    （message:broadcast_batch）でブロードキャストする。メッセージごとの結果は1つの message:batch_result で通知する。
+    一括保存（ライトビハインド）が有効な場合も、書き込みキューを経由せずに保存する。
+    """
+    received_at = time.perf_counter()
+
+    if not isinstance(batch_data, dict):
+        await _send_error_response(websocket, None, "無効な一括送信データです")
+        return
+    items = batch_data.get("messages")
+    batch_id = batch_data.get("batch_id")
+    if not isinstance(items, list) or not items:
+        await _send_error_response(websocket, None, "無効な一括送信データです")
+        return
+    if len(items) > MAX_BATCH_MESSAGES:
+        await _send_error_response(websocket, None, f"一度に送信できるメッセージは{MAX_BATCH_MESSAGES}件までです")
+        return
+
+    # 送信された順のメッセージごとの結果
+    results: list[dict[str, Any]] = []
+    # 保存するメッセージ（ID -> (パース結果, 受信したdata)）
+    pending: dict[str, tuple[MessageCreate, dict[str, Any]]] = {}
+    for item, (message_create, error_message) in zip(items, parse_message_batch(items), strict=True):
+        if message_create is None:
+            message_id = item.get("id") if isinstance(item, dict) else None
+            results.append({"id": message_id, "success": False, "error": error_message})
+            continue
+        results.append({"id": message_create.id, "success": True})
+        # 再送されたメッセージ・同じ一括送信内で重複したメッセージは保存済みとして扱う
+        if recent_message_ids.contains(message_create.id):
+            DUPLICATE_MESSAGES.inc(detected_by="cache")
+        elif message_create.id not in pending:
+            pending[message_create.id] = (message_create, item)
+
+    inserted: list[tuple[MessageCreate, dict[str, Any]]] = []
+    if pending:
+        try:
+            inserted_ids = await _save_message_batch([message for message, _ in pending.values()], db_session)
+        except Exception as e:
+            if is_production():
+                logger.error("メッセージの一括保存処理でエラーが発生しました")
+            else:
+                logger.error(f"メッセージの一括保存エラー: {e!s}")
+                logger.error(f"詳細なエラー情報: {traceback.format_exc()}")
+            for result in results:
+                if result["success"] and result["id"] in pending:
+                    result.update(success=False, error="メッセージの保存に失敗しました")
+            pending.clear()
+            inserted_ids = set()
+
+        for message_id, entry in pending.items():
+            recent_message_ids.add(message_id)
+            if message_id in inserted_ids:
+                inserted.append(entry)
+            else:
+                DUPLICATE_MESSAGES.inc(detected_by="database")
+
+    # メッセージごとの結果をまとめて通知
+    batch_result = {
+        "type": "message:batch_result",
+        "data": {"batch_id": batch_id, "results": results},
+    }
+    await safe_send_message(websocket, batch_result)
+    WS_RECEIVE_TO_ACK_DURATION.observe(time.perf_counter() - received_at)
+    logger.info(f"メッセージを一括保存しました: 受信={len(items)}件, 保存={len(inserted)}件")
+    if not inserted:
+        return
+
+    # 新たに保存されたメッセージを1つのフレームで他のクライアントにブロードキャスト
+    broadcast_start = time.perf_counter()
+    with get_tracer().span("websocket.broadcast", source="user_batch", connections=len(manager.active_connections)):
+        await manager.broadcast_messages(
+            [_to_broadcast_data(message) for message, _ in inserted], exclude_websocket=websocket
+        )
+    BROADCAST_DURATION.observe(time.perf_counter() - broadcast_start, source="user_batch")
+
+    # AI応答処理（@AIメンションを含むメッセージのみ応答する）
+    for _, message_data in inserted:
+        await _handle_ai_response_safely(websocket, message_data, db_session)
+
+
+def _fetch_resume_messages_from_db(
+    db_session: Session | None, channel_id: str, last_message_id: str
+) -> tuple[list[OutgoingMessage], bool]:
+    """再送ログにない差分をDBから取得し、ブロードキャストと同じ形式のメッセージにする.
+
+    Returns:
+        (送信するメッセージのリスト, 取得件数の上限を超えて残りがあるか)
+    """
+
+    def fetch(session: Session) -> tuple[list[OutgoingMessage], bool]:
+        watermark = crud.parse_message_watermark(last_message_id)
+        messages, has_more = crud.get_messages_since(session, {channel_id: watermark}, MAX_RESUME_DB_MESSAGES)[
+            channel_id
+        ]
+        # セッションを閉じる前に送信するメッセージにしておく
+        payloads = [
+            OutgoingMessage(
+                {
+                    "type": "message:broadcast",
+                    "data": {
+                        "id": message.id,
+                        "channel_id": message.channel_id,
+                        "user_id": message.user_id,
+                        "user_name": message.user_name,
+                        "user_type": message.user_type,
+                        "content": message.content,
+                        "timestamp": serialize_datetime_to_utc_iso(message.timestamp),
+                        "is_own_message": False,
+                    },
+                }
+            )
+            for message in messages
+        ]
+        return payloads, has_more
+
+    return read_with_session_management(fetch, db_session)
+
+
+async def _handle_resume(
+    websocket: WebSocket,
+    resume_data: dict[str, Any] | None,
+    db_session: Session | None,
+) -> None:
+    """再接続したクライアントに、最後に受け取った連番以降のブロードキャストを再送.
+
+    再送ログに差分が残っていればそのまま送り、古くなって消えている場合（またはサーバーの
+    再起動でepochが変わった場合）は、クライアントが最後に受け取ったメッセージIDを基準にDBから取得する。
+    最後に message:resumed で現在の連番を通知し、has_moreがtrueの場合はクライアントがREST APIで取得し直す。
+    """
+    if not resume_data or not isinstance(resume_data.get("channel_id"), str):
+        await _send_error_response(websocket, None, "無効な再開リクエストです")
+        return
+
+    channel_id = resume_data["channel_id"]
+    last_seq = resume_data.get("last_seq")
+    last_message_id = resume_data.get("last_message_id")
+
+    # 連番の取得は再送より先に行い、再送中のブロードキャストとの間で抜けが出ないようにする
+    latest_seq = replay_buffer.latest_seq(channel_id)
+    payloads = None
+    if isinstance(last_seq, int):
+        payloads = replay_buffer.since(channel_id, last_seq, resume_data.get("epoch"))
+
+    source = "buffer"
+    has_more = False
+    if payloads is None:
+        source = "database"
+        if isinstance(last_message_id, str) and last_message_id:
+            try:
+                with get_tracer().span("db.fetch_resume", channel_id=channel_id):
+                    payloads, has_more = _fetch_resume_messages_from_db(db_session, channel_id, last_message_id)
+            except Exception as e:
+                logger.error(f"再開時のメッセージ取得エラー: {e!s}")
+                payloads, has_more = [], True
+        else:
+            # 基準となるメッセージがない場合は再送できないため、全件取得し直してもらう
+            payloads, has_more = [], True
+
+    for payload in payloads:
+        if not await safe_send_message(websocket, payload):
+            return
+
+    resumed_response = {
+        "type": "message:resumed",
+        "data": {
+            "channel_id": channel_id,
+            "seq": latest_seq,
+            "epoch": replay_buffer.epoch,
+            "source": source,
+            "count": len(payloads),
+            "has_more": has_more,
+        },
+    }
+    await safe_send_message(websocket, resumed_response)
+    logger.info(f"再接続クライアントに再送: channel={channel_id}, source={source}, count={len(payloads)}")
+
+
 async def _handle_unsupported_message_type(websocket: WebSocket, message_type: str) -> None:
     """未サポートメッセージタイプの処理."""
     logger.warning(f"未サポートのメッセージタイプ: {message_type}. サポートタイプ: {SUPPORTED_MESSAGE_TYPES}")
@@ -264,6 +661,13 @@ async def handle_websocket_message(
     message_data = data.get("data")
 
     if message_type == MessageTypes.SEND:
-        await _handle_message_send(websocket, message_data, db_session)
+        # 受信からAI応答のブロードキャストまでを1つのトレースとして記録
+        with get_tracer().span("websocket.message_send"):
+            await _handle_message_send(websocket, message_data, db_session)
+    elif message_type == MessageTypes.SEND_BATCH:
+        with get_tracer().span("websocket.message_send_batch"):
+            await _handle_message_send_batch(websocket, message_data, db_session)
+    elif message_type == MessageTypes.RESUME:
+        await _handle_resume(websocket, message_data, db_session)
     else:
         await _handle_unsupported_message_type(websocket, message_type)
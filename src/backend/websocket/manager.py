@@ -1,9 +1,19 @@
 """WebSocket接続管理"""
 
 import logging
+from typing import Any
 
 from fastapi import WebSocket
 
+try:
+    # パッケージとして実行される場合
+    from .codec import JSON_CODEC, MessageCodec, OutgoingMessage, negotiate_codec
+    from .replay import replay_buffer
+except ImportError:
+    # 直接実行される場合
+    from websocket.codec import JSON_CODEC, MessageCodec, OutgoingMessage, negotiate_codec
+    from websocket.replay import replay_buffer
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,30 +23,49 @@ class ConnectionManager:
     def __init__(self) -> None:
         """初期化"""
         self.active_connections: list[WebSocket] = []
+        # 接続ごとのメッセージ形式（サブプロトコルで選択。登録されていない接続はJSON）
+        self.codecs: dict[WebSocket, MessageCodec] = {}
 
     async def connect(self, websocket: WebSocket) -> None:
-        """新しいWebSocket接続を追加"""
-        await websocket.accept()
+        """新しいWebSocket接続を追加（クライアントが提示したサブプロトコルでメッセージ形式を決める）"""
+        codec, subprotocol = negotiate_codec(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
         self.active_connections.append(websocket)
-        logger.info(f"新しいWebSocket接続が登録されました。総数: {len(self.active_connections)}")
+        self.codecs[websocket] = codec
+        logger.info(f"新しいWebSocket接続が登録されました（{codec.label}）。総数: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket) -> None:
         """指定WebSocket接続を削除"""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        self.codecs.pop(websocket, None)
         logger.info(f"WebSocket接続が切断されました。総数: {len(self.active_connections)}")
 
-    async def send_personal_message(self, message: str, websocket: WebSocket) -> None:
+    def codec_for(self, websocket: WebSocket) -> MessageCodec:
+        """接続のメッセージ形式を取得"""
+        return self.codecs.get(websocket, JSON_CODEC)
+
+    async def _send(self, websocket: WebSocket, message: OutgoingMessage) -> None:
+        """接続の形式でエンコードしたフレームを送信"""
+        frame = message.frame(self.codec_for(websocket))
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+
+    async def send_personal_message(self, message: dict[str, Any] | OutgoingMessage, websocket: WebSocket) -> None:
         """特定のクライアントにメッセージを送信"""
         try:
-            await websocket.send_text(message)
+            await self._send(websocket, message if isinstance(message, OutgoingMessage) else OutgoingMessage(message))
         except Exception:
             # 接続が切断されている場合は削除
             self.disconnect(websocket)
 
-    async def broadcast(self, message: str, exclude_websocket: WebSocket | None = None) -> None:
+    async def broadcast(self, message: OutgoingMessage, exclude_websocket: WebSocket | None = None) -> None:
         """全ての接続中のクライアントにメッセージをブロードキャスト
 
+        メッセージは接続ごとの形式で送信する（エンコードは形式ごとに1回）。
+
         接続状態の管理:
         1. 接続リストのコピーを作成して、イテレート中の変更を防ぐ
         2. 各接続の状態を事前にチェックし、切断済みの接続をマーク
@@ -59,7 +88,7 @@ class ConnectionManager:
                     connections_to_remove.add(connection)
                     continue
                 # メッセージ送信を試行
-                await connection.send_text(message)
+                await self._send(connection, message)
             except Exception:
                 # 送信に失敗した場合は接続が切断されているとみなす
                 connections_to_remove.add(connection)
@@ -68,6 +97,35 @@ class ConnectionManager:
         for conn in connections_to_remove:
             self.disconnect(conn)
 
+    async def broadcast_message(self, message: dict[str, Any], exclude_websocket: WebSocket | None = None) -> None:
+        """メッセージをブロードキャスト
+
+        チャンネル宛てのmessage:broadcastは再送ログに記録し、連番（seq）とepochを付けて送信する。
+        再接続したクライアントはこの連番を提示して、切断中のメッセージを受け取り直す。
+        """
+        data = message.get("data")
+        if message.get("type") == "message:broadcast" and isinstance(data, dict) and "channel_id" in data:
+            outgoing = replay_buffer.record(message)
+        else:
+            outgoing = OutgoingMessage(message)
+        await self.broadcast(outgoing, exclude_websocket=exclude_websocket)
+
+    async def broadcast_messages(
+        self, messages: list[dict[str, Any]], exclude_websocket: WebSocket | None = None
+    ) -> None:
+        """チャンネル宛ての複数のメッセージを1つのフレーム（message:broadcast_batch）でブロードキャスト
+
+        再送ログにはメッセージごとのmessage:broadcastとして記録し、それぞれ連番（seq）とepochを付けて送信する。
+
+        Args:
+            messages: ブロードキャストするメッセージのdata（channel_idを含む）
+            exclude_websocket: 送信しない接続
+
+        """
+        recorded = [replay_buffer.record({"type": "message:broadcast", "data": data}) for data in messages]
+        batch = {"type": "message:broadcast_batch", "data": {"messages": [entry.message["data"] for entry in recorded]}}
+        await self.broadcast(OutgoingMessage(batch), exclude_websocket=exclude_websocket)
+
 
 manager = ConnectionManager()
 
@@ -0,0 +1,133 @@
+"""チャンネルごとのブロードキャスト再送ログ
+
+WebSocketの再接続中にブロードキャストされたメッセージを、再接続したクライアントへ
+REST APIを経由せずに直接再送するためのリングバッファ。ブロードキャストごとに
+チャンネル内の連番（seq）を振り、クライアントは最後に受け取ったseqを提示して差分を受け取る。
+
+- 連番はプロセス内でのみ有効なため、起動ごとに異なるepochを付けて区別する
+- 保持件数を超えて古くなった差分はバッファから返せないため、呼び出し側でDBから取得する
+- 記録したメッセージは送信先の形式（codec）ごとに1回だけエンコードし、再送時にも使い回す
+"""
+
+import threading
+import uuid
+from collections import deque
+from typing import Any
+
+try:
+    # パッケージとして実行される場合
+    from .codec import OutgoingMessage
+except ImportError:
+    # 直接実行される場合
+    from websocket.codec import OutgoingMessage
+
+# チャンネルごとに保持するブロードキャストの最大件数
+DEFAULT_REPLAY_LOG_SIZE = 500
+
+
+class ChannelReplayLog:
+    """1チャンネル分の連番付きブロードキャストログ"""
+
+    def __init__(self, max_size: int = DEFAULT_REPLAY_LOG_SIZE) -> None:
+        """初期化
+
+        Args:
+            max_size: 保持する最大件数（超えた場合は古いものから削除）
+
+        """
+        # (seq, 送信するメッセージ) を古い順に保持
+        self._entries: deque[tuple[int, OutgoingMessage]] = deque(maxlen=max_size)
+        self.last_seq = 0
+
+    def append(self, payload: OutgoingMessage) -> None:
+        """ブロードキャストを次の連番（last_seq + 1）で記録"""
+        self.last_seq += 1
+        self._entries.append((self.last_seq, payload))
+
+    def since(self, seq: int) -> list[OutgoingMessage] | None:
+        """指定した連番より後のブロードキャストを取得
+
+        Returns:
+            送信するメッセージのリスト（差分がバッファから消えている場合はNone）
+
+        """
+        if seq >= self.last_seq:
+            return []
+        oldest_seq = self._entries[0][0] if self._entries else self.last_seq + 1
+        if seq + 1 < oldest_seq:
+            return None
+        return [payload for entry_seq, payload in self._entries if entry_seq > seq]
+
+
+class ReplayBuffer:
+    """全チャンネルの再送ログを管理するクラス"""
+
+    def __init__(self, max_size: int = DEFAULT_REPLAY_LOG_SIZE, epoch: str | None = None) -> None:
+        """初期化
+
+        Args:
+            max_size: チャンネルごとに保持する最大件数
+            epoch: 連番の世代を表す識別子（省略時は起動ごとにランダムに生成）
+
+        """
+        self.max_size = max_size
+        self.epoch = epoch or uuid.uuid4().hex[:12]
+        self._logs: dict[str, ChannelReplayLog] = {}
+        self._lock = threading.Lock()
+
+    def record(self, message: dict[str, Any]) -> OutgoingMessage:
+        """message:broadcastに連番（seq）とepochを付けて記録し、送信するメッセージを返す
+
+        Args:
+            message: ブロードキャストするメッセージ（dataにchannel_idを含む）
+
+        Returns:
+            送信するメッセージ
+
+        """
+        data = message["data"]
+        channel_id = data["channel_id"]
+        with self._lock:
+            log = self._logs.get(channel_id)
+            if log is None:
+                log = self._logs[channel_id] = ChannelReplayLog(self.max_size)
+            payload = OutgoingMessage({**message, "data": {**data, "seq": log.last_seq + 1, "epoch": self.epoch}})
+            log.append(payload)
+        return payload
+
+    def latest_seq(self, channel_id: str) -> int:
+        """チャンネルの最新の連番（ブロードキャストがない場合は0）"""
+        with self._lock:
+            log = self._logs.get(channel_id)
+            return log.last_seq if log else 0
+
+    def since(self, channel_id: str, seq: int, epoch: str | None) -> list[OutgoingMessage] | None:
+        """クライアントが最後に受け取った連番より後のブロードキャストを取得
+
+        Args:
+            channel_id: チャンネルID
+            seq: クライアントが最後に受け取った連番
+            epoch: クライアントが受け取った連番のepoch
+
+        Returns:
+            送信するメッセージのリスト（epochが異なる、または差分が古くなって消えている場合はNone）
+
+        """
+        if epoch != self.epoch or seq < 0:
+            return None
+        with self._lock:
+            log = self._logs.get(channel_id)
+            if log is None:
+                return [] if seq == 0 else None
+            if seq > log.last_seq:
+                return None
+            return log.since(seq)
+
+    def clear(self) -> None:
+        """全てのログを削除"""
+        with self._lock:
+            self._logs.clear()
+
+
+# グローバルインスタンス
+replay_buffer = ReplayBuffer()
@@ -5,9 +5,22 @@ import { nanoid } from 'nanoid';
 import { ChannelList } from './ChannelList';
 import { ChatArea } from './ChatArea';
 import { initialChannels } from '../data/channels';
-import type { Message, MessageResponse } from '../types/chat';
+import type { BroadcastMessageData, Message, MessageResponse, SyncResponse } from '../types/chat';
 import { API_CONFIG, WEBSOCKET_CONFIG } from '../config/constants';
 
+// バックエンドから取得したメッセージを適合させる
+// PydanticスキーマでcamelCaseに変換されているため、camelCaseで参照
+const adaptMessage = (msg: MessageResponse): Message => ({
+  id: msg.id,
+  channelId: msg.channelId,
+  userId: msg.userId,
+  userName: msg.userName,
+  userType: msg.userType || 'user', // デフォルトはuser
+  content: msg.content,
+  timestamp: new Date(msg.timestamp),
+  isOwnMessage: msg.isOwnMessage,
+});
+
 export function Layout() {
   const [opened, { toggle, close }] = useDisclosure();
   const [activeChannelId, setActiveChannelId] = useState(
@@ -17,14 +30,86 @@ export function Layout() {
   const wsRef = useRef<WebSocket | null>(null);
   const retryTimeoutRef = useRef<number | null>(null);
   const retryCountRef = useRef(0);
+  const hasConnectedRef = useRef(false);
+  // チャンネルごとに最後に受け取ったブロードキャストの連番（再接続時の再送要求に使用）
+  const lastSeqRef = useRef<Map<string, { seq: number; epoch: string }>>(new Map());
+  // WebSocketのコールバックから最新の状態を参照するためのref
+  const activeChannelIdRef = useRef(activeChannelId);
+  const messagesRef = useRef<Message[]>(messages);
+
+  useEffect(() => {
+    activeChannelIdRef.current = activeChannelId;
+    messagesRef.current = messages;
+  }, [activeChannelId, messages]);
 
   const currentChannel = useMemo(
     () => initialChannels.find((ch) => ch.id === activeChannelId),
     [activeChannelId],
   );
 
+  // 再接続時に、切断中に届かなかったメッセージだけを差分同期で取得
+  const syncMessages = useCallback(async () => {
+    const channelId = activeChannelIdRef.current;
+    if (!channelId) return;
+
+    const current = messagesRef.current;
+    const lastMessage = current.length > 0 ? current[current.length - 1] : undefined;
+    try {
+      const res = await fetch(`${API_CONFIG.BASE_URL}/api/sync`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ channels: [{ channelId, since: lastMessage?.id ?? null }] }),
+      });
+      const data: SyncResponse = await res.json();
+      const result = data.channels.find((channel) => channel.channelId === channelId);
+      // 同期中にチャンネルが切り替わった場合は反映しない
+      if (!result || channelId !== activeChannelIdRef.current) return;
+
+      const synced = result.messages.map(adaptMessage);
+      setMessages((prev) => {
+        // 間が抜けている場合は最新分で置き換え、それ以外は未取得のメッセージのみ追加
+        if (result.hasMore) return synced;
+        const knownIds = new Set(prev.map((msg) => msg.id));
+        return [...prev, ...synced.filter((msg) => !knownIds.has(msg.id))];
+      });
+    } catch (error) {
+      console.error('Error syncing messages:', error);
+    }
+  }, []);
+
   // WebSocket接続の初期化
   useEffect(() => {
+    // ブロードキャストされたメッセージを追加し、チャンネルごとの連番を更新
+    const receiveBroadcasts = (items: BroadcastMessageData[]) => {
+      const newMessages: Message[] = items.map((item) => {
+        const lastSeq = lastSeqRef.current.get(item.channel_id);
+        if (
+          typeof item.seq === 'number' &&
+          typeof item.epoch === 'string' &&
+          (!lastSeq || lastSeq.epoch !== item.epoch || lastSeq.seq < item.seq)
+        ) {
+          lastSeqRef.current.set(item.channel_id, { seq: item.seq, epoch: item.epoch });
+        }
+        return {
+          id: item.id,
+          channelId: item.channel_id,
+          userId: item.user_id,
+          userName: item.user_name,
+          userType: item.user_type || 'user', // デフォルトはuser
+          content: item.content,
+          timestamp: new Date(item.timestamp),
+          isOwnMessage: item.is_own_message,
+        };
+      });
+
+      // 重複チェック：同じIDのメッセージが既に存在する場合は追加しない
+      setMessages((prev) => {
+        const knownIds = new Set(prev.map((msg) => msg.id));
+        const added = newMessages.filter((msg) => !knownIds.has(msg.id));
+        return added.length > 0 ? [...prev, ...added] : prev;
+      });
+    };
+
     // バックエンドの起動を待ってからWebSocket接続
     const connectWebSocket = async () => {
       try {
@@ -37,13 +122,42 @@ export function Layout() {
         ws.onopen = () => {
           // 接続成功時は再試行カウントをリセット
           retryCountRef.current = 0;
+          // 再接続の場合は切断中のメッセージをサーバーの再送ログから受け取る
+          const channelId = activeChannelIdRef.current;
+          if (hasConnectedRef.current && channelId) {
+            const lastSeq = lastSeqRef.current.get(channelId);
+            const current = messagesRef.current;
+            ws.send(
+              JSON.stringify({
+                type: 'message:resume',
+                data: {
+                  channel_id: channelId,
+                  last_seq: lastSeq?.seq ?? null,
+                  epoch: lastSeq?.epoch ?? null,
+                  last_message_id: current.length > 0 ? current[current.length - 1].id : null,
+                },
+              }),
+            );
+          }
+          hasConnectedRef.current = true;
         };
 
         ws.onmessage = (event) => {
           try {
             const data = JSON.parse(event.data);
 
-            if (data.type === 'message:saved') {
+            if (data.type === 'message:resumed') {
+              if (data.data) {
+                lastSeqRef.current.set(data.data.channel_id, {
+                  seq: data.data.seq,
+                  epoch: data.data.epoch,
+                });
+                // 再送しきれなかった場合は差分同期APIで取得し直す
+                if (data.data.has_more) {
+                  syncMessages();
+                }
+              }
+            } else if (data.type === 'message:saved') {
               // メッセージ保存成功 - 特に処理不要（楽観的更新のため）
             } else if (data.type === 'message:error') {
               console.error('Message save error:', data.data);
@@ -54,24 +168,12 @@ export function Layout() {
             } else if (data.type === 'message:broadcast') {
               // 新しいメッセージ（ユーザーメッセージまたはAI応答）をリアルタイムで追加
               if (data.data) {
-                const newMessage: Message = {
-                  id: data.data.id,
-                  channelId: data.data.channel_id,
-                  userId: data.data.user_id,
-                  userName: data.data.user_name,
-                  userType: data.data.user_type || 'user', // デフォルトはuser
-                  content: data.data.content,
-                  timestamp: new Date(data.data.timestamp),
-                  isOwnMessage: data.data.is_own_message,
-                };
-
-                // 重複チェック：同じIDのメッセージが既に存在する場合は追加しない
-                setMessages((prev) => {
-                  if (prev.some((msg) => msg.id === newMessage.id)) {
-                    return prev;
-                  }
-                  return [...prev, newMessage];
-                });
+                receiveBroadcasts([data.data]);
+              }
+            } else if (data.type === 'message:broadcast_batch') {
+              // 一括送信されたメッセージをまとめて追加
+              if (Array.isArray(data.data?.messages)) {
+                receiveBroadcasts(data.data.messages);
               }
             }
           } catch (error) {
@@ -123,7 +225,7 @@ export function Layout() {
         window.clearTimeout(retryTimeoutRef.current);
       }
     };
-  }, []);
+  }, [syncMessages]);
 
   // チャンネル変更時にメッセージ履歴を取得
   useEffect(() => {
@@ -131,19 +233,7 @@ export function Layout() {
       fetch(`${API_CONFIG.BASE_URL}/api/channels/${activeChannelId}/messages`)
         .then((res) => res.json())
         .then((data) => {
-          // バックエンドから取得したメッセージを適合させる
-          // PydanticスキーマでcamelCaseに変換されているため、camelCaseで参照
-          const adaptedMessages: Message[] = data.messages.map((msg: MessageResponse) => ({
-            id: msg.id,
-            channelId: msg.channelId,
-            userId: msg.userId,
-            userName: msg.userName,
-            userType: msg.userType || 'user', // デフォルトはuser
-            content: msg.content,
-            timestamp: new Date(msg.timestamp),
-            isOwnMessage: msg.isOwnMessage,
-          }));
-          setMessages(adaptedMessages);
+          setMessages(data.messages.map(adaptMessage));
         })
         .catch((err) => console.error('Error loading messages:', err));
     }
@@ -25,3 +25,28 @@ export interface MessageResponse {
   timestamp: string;
   isOwnMessage: boolean;
 }
+
+// WebSocketでブロードキャストされるメッセージ（message:broadcast / message:broadcast_batch のdata）
+export interface BroadcastMessageData {
+  id: string;
+  channel_id: string;
+  user_id: string;
+  user_name: string;
+  user_type?: 'user' | 'ai';
+  content: string;
+  timestamp: string;
+  is_own_message: boolean;
+  seq?: number;
+  epoch?: string;
+}
+
+// 差分同期API（POST /api/sync）のレスポンス
+export interface SyncChannelMessages {
+  channelId: string;
+  messages: MessageResponse[];
+  hasMore: boolean;
+}
+
+export interface SyncResponse {
+  channels: SyncChannelMessages[];
+}
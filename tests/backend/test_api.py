@@ -1,6 +1,10 @@
 """API基本テスト（最小限・実用版）"""
 
-from datetime import UTC, datetime
+import csv
+import gzip
+import io
+import json
+from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING
 
 import pytest
@@ -9,6 +13,8 @@ from httpx import AsyncClient
 from src.backend.models import Message
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
     from sqlalchemy.orm import Session
 
     from src.backend.models import Channel
@@ -34,6 +40,32 @@ async def test_get_channels(async_client: AsyncClient, seed_channels: list["Chan
     assert "ニュース" in channel_names
 
 
+@pytest.mark.asyncio
+async def test_get_channels_is_cached_from_primary(async_client: AsyncClient, seed_channels: list["Channel"]) -> None:
+    """チャンネル一覧はキャッシュするため、遅延したレプリカではなくプライマリから取得するテスト"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from src.backend.database import Base, get_replica_db
+    from src.backend.main import app
+
+    # まだ何も反映されていないレプリカ
+    replica = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=replica)
+
+    def override_get_replica_db() -> "Generator[Session]":
+        with Session(bind=replica) as db:
+            yield db
+
+    app.dependency_overrides[get_replica_db] = override_get_replica_db
+    response = await async_client.get("/api/channels")
+    replica.dispose()
+
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+
 @pytest.mark.asyncio
 async def test_get_messages(async_client: AsyncClient, seed_channels: list["Channel"], test_db: "Session") -> None:
     """メッセージ履歴取得APIのテスト"""
@@ -90,3 +122,151 @@ async def test_invalid_channel(async_client: AsyncClient) -> None:
 
     assert response.status_code == 404
     assert response.json()["detail"] == "チャンネルが見つかりません"
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client: AsyncClient) -> None:
+    """Prometheus形式のメトリクス出力テスト"""
+    response = await async_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE gemini_request_duration_seconds histogram" in response.text
+    assert "websocket_active_connections 0" in response.text
+    assert 'queue_depth{queue="discord_webhook"} 0' in response.text
+
+
+@pytest.mark.asyncio
+async def test_sync_returns_only_newer_messages(
+    async_client: AsyncClient, seed_channels: list["Channel"], test_db: "Session"
+) -> None:
+    """差分同期APIが基準より新しいメッセージのみを返すテスト"""
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    for channel in seed_channels[:2]:
+        for i in range(3):
+            test_db.add(
+                Message(
+                    id=f"sync_{channel.id}_{i}",
+                    channel_id=channel.id,
+                    user_id="user",
+                    user_name="ユーザー",
+                    content=f"メッセージ{i}",
+                    timestamp=base,
+                    created_at=base + timedelta(seconds=i),
+                )
+            )
+    test_db.commit()
+    first, second = seed_channels[0].id, seed_channels[1].id
+
+    response = await async_client.post(
+        "/api/sync",
+        json={
+            "channels": [
+                {"channelId": first, "since": f"sync_{first}_0"},
+                {"channelId": second, "since": (base + timedelta(seconds=1)).isoformat()},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    channels = {channel["channelId"]: channel for channel in response.json()["channels"]}
+    assert [msg["id"] for msg in channels[first]["messages"]] == [f"sync_{first}_1", f"sync_{first}_2"]
+    assert [msg["id"] for msg in channels[second]["messages"]] == [f"sync_{second}_2"]
+    assert channels[first]["hasMore"] is False
+
+    # 件数上限を超える場合は最新分を返し、残りがあることを通知する
+    response = await async_client.get(f"/api/channels/{first}/messages", params={"since": "unknown_id", "limit": 2})
+    data = response.json()
+    assert [msg["id"] for msg in data["messages"]] == [f"sync_{first}_1", f"sync_{first}_2"]
+    assert data["hasMore"] is True
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_with_etag(
+    async_client: AsyncClient, seed_channels: list["Channel"], test_db: "Session", sample_message_data: dict
+) -> None:
+    """ETagが一致する場合は304を返し、メッセージ保存後は新しい内容を返すテスト"""
+    from src.backend import crud
+    from src.backend.schemas import MessageCreate
+
+    response = await async_client.get("/api/channels")
+    etag = response.headers["etag"]
+    response = await async_client.get("/api/channels", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    url = f"/api/channels/{sample_message_data['channel_id']}/messages"
+    etag = (await async_client.get(url)).headers["etag"]
+    assert (await async_client.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    # 保存するとキャッシュが無効化され、新しいETagで返される
+    crud.create_message(test_db, MessageCreate.model_validate(sample_message_data))
+    response = await async_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [msg["id"] for msg in response.json()["messages"]] == [sample_message_data["id"]]
+
+
+@pytest.mark.asyncio
+async def test_search_messages(async_client: AsyncClient, seed_channels: list["Channel"], test_db: "Session") -> None:
+    """全文検索APIが全ての語を含むメッセージを新しい順に返すテスト"""
+    from src.backend import crud
+    from src.backend.schemas import MessageCreate
+
+    contents = ["今日は音楽の話をしよう", "音楽フェスに行きたい", "ゲームの新作が出た", "音楽とゲーム、どっちが好き？"]
+    for i, content in enumerate(contents):
+        message = MessageCreate(
+            id=f"search_{i}",
+            channel_id=seed_channels[i % 2].id,
+            user_id="user",
+            user_name="ユーザー",
+            content=content,
+            timestamp=datetime.now(UTC),
+            is_own_message=True,
+        )
+        crud.create_message(test_db, message)
+
+    async def search(**params: str | int) -> dict:
+        response = await async_client.get("/api/search", params=params)
+        assert response.status_code == 200
+        return response.json()
+
+    # 3文字以上はFTS5（trigram）、2文字以下は部分一致で検索する
+    assert [msg["id"] for msg in (await search(q="音楽の話"))["messages"]] == ["search_0"]
+    assert [msg["id"] for msg in (await search(q="音楽"))["messages"]] == ["search_3", "search_1", "search_0"]
+    assert [msg["id"] for msg in (await search(q="音楽　ゲーム"))["messages"]] == ["search_3"]
+    assert [msg["id"] for msg in (await search(q="音楽", channel_id=seed_channels[1].id))["messages"]] == [
+        "search_3",
+        "search_1",
+    ]
+
+    page = await search(q="音楽", limit=2, offset=2)
+    assert [msg["id"] for msg in page["messages"]] == ["search_0"]
+    assert page["hasMore"] is False
+    assert (await async_client.get("/api/search", params={"q": " "})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_channel_messages(
+    async_client: AsyncClient,
+    seed_channels: list["Channel"],
+    create_test_messages: "Callable[[str, int], list[Message]]",
+) -> None:
+    """チャンネル履歴のエクスポートAPIがNDJSON・gzip圧縮したCSVを古い順に返すテスト"""
+    channel_id = seed_channels[0].id
+    messages = create_test_messages(channel_id, 3)
+
+    response = await async_client.get(f"/api/channels/{channel_id}/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [message.id for message in messages]
+    assert rows[0]["channelId"] == channel_id
+
+    response = await async_client.get(f"/api/channels/{channel_id}/export", params={"format": "csv", "gzip": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith(f"channel-{channel_id}.csv.gz")
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.content).decode())))
+    assert [row["id"] for row in rows] == [message.id for message in messages]
+
+    assert (await async_client.get(f"/api/channels/{channel_id}/export", params={"format": "xml"})).status_code == 400
+    assert (await async_client.get("/api/channels/missing/export")).status_code == 404
@@ -0,0 +1,32 @@
+"""WebSocket圧縮テスト（最小限・実用版）"""
+
+import json
+import zlib
+
+from websockets.frames import OP_TEXT, Frame
+
+from src.backend.utils.metrics import WEBSOCKET_OUTGOING_BYTES, WEBSOCKET_OUTGOING_MESSAGES
+from src.backend.websocket.compression import DeflateSettings, create_deflate_factory
+
+
+def test_small_messages_are_sent_uncompressed() -> None:
+    """閾値未満のメッセージは非圧縮で、それ以上は圧縮して送られ、バイト数が記録されるテスト"""
+    factory = create_deflate_factory(DeflateSettings(window_bits=10, min_size=256))
+    response_params, extension = factory.process_request_params([], [])
+    assert ("server_max_window_bits", "10") in response_params
+
+    saved = json.dumps({"type": "message:saved", "data": {"id": "msg_1", "success": True}}).encode()
+    broadcast = json.dumps({"type": "message:broadcast", "data": {"content": "こんにちは" * 200}}).encode()
+    before = WEBSOCKET_OUTGOING_BYTES.get(message_type="message:broadcast", stage="before")
+    after = WEBSOCKET_OUTGOING_BYTES.get(message_type="message:broadcast", stage="after")
+    uncompressed = WEBSOCKET_OUTGOING_MESSAGES.get(message_type="message:saved", compressed="false")
+
+    small = extension.encode(Frame(OP_TEXT, saved))
+    large = extension.encode(Frame(OP_TEXT, broadcast))
+
+    assert small.rsv1 is False and small.data == saved
+    assert large.rsv1 is True and len(large.data) < len(broadcast) // 10
+    assert zlib.decompressobj(wbits=-10).decompress(bytes(large.data) + b"\x00\x00\xff\xff") == broadcast
+    assert WEBSOCKET_OUTGOING_BYTES.get(message_type="message:broadcast", stage="before") - before == len(broadcast)
+    assert WEBSOCKET_OUTGOING_BYTES.get(message_type="message:broadcast", stage="after") - after == len(large.data)
+    assert WEBSOCKET_OUTGOING_MESSAGES.get(message_type="message:saved", compressed="false") - uncompressed == 1
@@ -0,0 +1,46 @@
+"""CRUD操作テスト（最小限・実用版）"""
+
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.backend import crud
+from src.backend.models import Message
+from src.backend.schemas import MessageCreate
+
+
+def test_create_message_without_refresh(test_db: Session) -> None:
+    """保存時にINSERT以外のSQL（refreshのSELECT）が発行されないテスト"""
+    statements: list[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:  # noqa: ANN401
+        statements.append(statement.split()[0].upper())
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        message = crud.create_message(
+            test_db,
+            MessageCreate(
+                id="crud_msg_1",
+                channel_id="1",
+                user_id="user_1",
+                user_name="テストユーザー",
+                content="テストメッセージ",
+                timestamp=datetime.now(UTC),
+                is_own_message=True,
+            ),
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert statements == ["INSERT"]
+    assert message is not None
+    assert message.id == "crud_msg_1"
+    assert isinstance(message.created_at, datetime)
+
+    saved = test_db.get(Message, "crud_msg_1")
+    assert saved is not None
+    assert saved.content == "テストメッセージ"
@@ -0,0 +1,77 @@
+"""DB接続（レプリカへの振り分け・接続プール）テスト（最小限・実用版）"""
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+from src.backend import database
+from src.backend.database import Base, RoutingSession
+from src.backend.models import Channel
+from src.backend.utils.db_pool import InstrumentedQueuePool, PoolProfile, instrument_engine
+from src.backend.utils.metrics import DB_POOL_CHECKOUT_TIMEOUTS, DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTION_AGE
+
+
+def test_reads_go_to_replica_until_first_write(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """読み込みはレプリカ、書き込み後の読み込みはプライマリで行われるテスト"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        Base.metadata.create_all(engine)
+    # レプリカにだけ存在するチャンネルで接続先を判別する
+    with sessionmaker(bind=replica)() as db:
+        db.add(Channel(id="replica_only", name="レプリカ"))
+        db.commit()
+    monkeypatch.setattr(database, "replica_engines", [replica])
+
+    session_factory = sessionmaker(bind=primary, class_=RoutingSession)
+    with session_factory() as db:
+        assert [channel.id for channel in db.query(Channel).all()] == ["replica_only"]
+
+        db.add(Channel(id="written", name="プライマリ"))
+        db.commit()
+        # 書き込んだセッションは自分の書き込みを読めるようプライマリから読み込む
+        assert [channel.id for channel in db.query(Channel).all()] == ["written"]
+
+    # 新しいセッションは再びレプリカから読み込む
+    with session_factory() as db:
+        assert [channel.id for channel in db.query(Channel).all()] == ["replica_only"]
+
+    primary.dispose()
+    replica.dispose()
+
+
+def test_pool_records_checkout_wait_and_timeouts(tmp_path: Path) -> None:
+    """接続の取得時間・タイムアウト・接続の経過時間が記録されるテスト"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    instrument_engine(engine, "test_pool")
+
+    # 唯一の接続が使用中のため、空き待ちがタイムアウトする
+    with engine.connect(), pytest.raises(PoolTimeoutError):
+        engine.connect()
+    with engine.connect():
+        pass
+
+    assert DB_POOL_CHECKOUT_TIMEOUTS.get(target="test_pool") == 1
+    assert DB_POOL_CHECKOUT_WAIT.count(target="test_pool") == 3
+    assert DB_POOL_CONNECTION_AGE.count(target="test_pool") == 2
+    engine.dispose()
+
+
+def test_pool_profile_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    """プロファイルの値が個別の環境変数で上書きされるテスト"""
+    monkeypatch.setenv("DB_POOL_PROFILE", "production")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "2.5")
+    assert PoolProfile.from_env() == PoolProfile(pool_size=20, max_overflow=20, pool_timeout=2.5, pool_recycle=1800)
+
+    monkeypatch.setenv("DB_POOL_PROFILE", "unknown")
+    with pytest.raises(ValueError):
+        PoolProfile.from_env()
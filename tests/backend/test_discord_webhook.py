@@ -0,0 +1,44 @@
+"""Discord Webhook送信テスト（最小限・実用版）"""
+
+import json
+
+import httpx
+import pytest
+
+from src.backend.utils.discord_webhook import DiscordWebhookSender
+
+
+@pytest.mark.asyncio
+async def test_queued_messages_are_batched_and_retried(monkeypatch: pytest.MonkeyPatch) -> None:
+    """連続したメッセージが1回の送信にまとめられ、429の場合はretry_after後に再送されるテスト"""
+    monkeypatch.setenv("DISCORD_WEBHOOK_URL", "https://discord.test/webhook")
+    requests: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content)["content"])
+        if len(requests) == 1:
+            return httpx.Response(429, json={"retry_after": 0.01})
+        return httpx.Response(204)
+
+    sender = DiscordWebhookSender(transport=httpx.MockTransport(handler))
+    sender.BATCH_WINDOW_SECONDS = 0.05
+
+    assert sender.enqueue_ai_message("タカシ", "おはよう")
+    assert sender.enqueue_ai_message("エミ", "おはよー！")
+    assert sender.enqueue_ai_message("ケンタ", "眠い…")
+    await sender.close()
+
+    assert len(requests) == 2
+    assert requests[0] == requests[1]
+    assert requests[1].count("-" * 20) == 3
+    assert sender.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_enqueue_without_webhook_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Webhook URL未設定の場合はキューに追加しないテスト"""
+    monkeypatch.delenv("DISCORD_WEBHOOK_URL", raising=False)
+    sender = DiscordWebhookSender()
+
+    assert sender.enqueue_ai_message("タカシ", "おはよう") is False
+    await sender.close()
@@ -0,0 +1,19 @@
+"""フェイクモデルバックエンドテスト（最小限・実用版）"""
+
+import pytest
+
+from src.backend.ai.gemini_client import GeminiAPIClient
+
+
+@pytest.mark.asyncio
+async def test_fake_model_backend(monkeypatch: pytest.MonkeyPatch) -> None:
+    """フェイクモデルバックエンドではAPIキーなしで応答が生成されるテスト"""
+    monkeypatch.setenv("AI_MODEL_BACKEND", "fake")
+    monkeypatch.setenv("AI_FAKE_LATENCY_MS", "0")
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+
+    gemini_client = GeminiAPIClient()
+    response_text, personality = await gemini_client.generate_response("@AI 今日の天気は？", max_retries=1)
+
+    assert "今日の天気は？" in response_text
+    assert personality.user_id.startswith("ai_")
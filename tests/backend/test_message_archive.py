@@ -0,0 +1,52 @@
+"""メッセージアーカイブテスト（最小限・実用版）"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import Session
+
+from src.backend import crud
+from src.backend.models import Message
+from src.backend.utils import message_archive
+from src.backend.utils.message_archive import MessageArchive, archive_messages
+
+
+def test_archived_messages_are_read_through(test_db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """古い月のメッセージがアーカイブに移され、ページングでDBの続きとして読み込まれるテスト"""
+    archive = MessageArchive(tmp_path)
+    monkeypatch.setattr(message_archive, "_message_archive", archive)
+
+    now = datetime(2026, 10, 15, 12, 0, 0)
+    # 1日おきに20件（9月〜10月）
+    for i in range(20):
+        created_at = now - timedelta(days=2 * (19 - i))
+        test_db.add(
+            Message(
+                id=f"archive_msg_{i}",
+                channel_id="1",
+                user_id="user_1",
+                user_name="テストユーザー",
+                content=f"メッセージ {i}",
+                timestamp=created_at,
+                is_own_message=False,
+                created_at=created_at,
+            )
+        )
+    test_db.commit()
+    expected_ids = [f"archive_msg_{i}" for i in range(20)]
+
+    # 10月より前（9月）のメッセージが移される
+    archived = archive_messages(test_db, archive, datetime(2026, 10, 3))
+    assert archived == 12
+    assert test_db.query(Message).count() == 8
+    assert archive.count("1") == 12
+    assert crud.get_channel_messages_count(test_db, "1") == 20
+
+    # DBとアーカイブにまたがるページ、アーカイブのみのページ
+    pages = [crud.get_channel_messages(test_db, "1", skip, 6) for skip in (0, 6, 12, 18)]
+    assert [message.id for page in reversed(pages) for message in page] == expected_ids
+
+    # 再実行しても重複しない
+    assert archive_messages(test_db, archive, datetime(2026, 10, 3)) == 0
+    assert archive.count("1") == 12
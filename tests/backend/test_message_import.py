@@ -0,0 +1,38 @@
+"""メッセージ一括取り込みテスト（最小限・実用版）"""
+
+import gzip
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.backend import crud
+from src.backend.models import Message
+from src.backend.utils.message_export import encode_export, iter_channel_history
+from src.backend.utils.message_import import generate_conversations, import_messages, read_export_file
+
+
+def test_import_generated_and_exported_messages(test_db: Session, tmp_path: Path) -> None:
+    """生成した会話とエクスポートしたファイルが重複なく保存され、全文検索できるテスト"""
+    rows = list(generate_conversations(30, ["1", "2"], seed=1))
+    assert import_messages(test_db, rows, batch_size=8) == 30
+    # 同じメッセージは読み飛ばす
+    assert import_messages(test_db, rows, batch_size=8) == 0
+
+    # 全文検索インデックスも更新され、インデックス更新用のトリガーも残っている
+    hits, _ = crud.search_messages(test_db, rows[-1]["content"], limit=100)
+    assert rows[-1]["id"] in {message.id for message in hits}
+    trigger = "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'messages_fts_insert'"
+    assert test_db.execute(text(trigger)).scalar() == 1
+
+    # エクスポートしたファイルを取り込み直すと同じ内容になる
+    path = tmp_path / "channel-1.ndjson.gz"
+    path.write_bytes(b"".join(encode_export(iter_channel_history(test_db, "1"), "ndjson", compress=True)))
+    exported = [(m.id, m.content, m.created_at) for m in test_db.query(Message).filter(Message.channel_id == "1")]
+    test_db.query(Message).delete()
+    test_db.commit()
+
+    assert import_messages(test_db, read_export_file(path)) == len(exported)
+    imported = [(m.id, m.content, m.created_at) for m in test_db.query(Message).filter(Message.channel_id == "1")]
+    assert sorted(imported) == sorted(exported)
+    assert gzip.decompress(path.read_bytes()).count(b"\n") == len(exported)
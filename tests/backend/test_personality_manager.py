@@ -0,0 +1,155 @@
+"""AI人格管理テスト（最小限・実用版）"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.backend.ai.gemini_client import build_mention_pattern
+from src.backend.ai.personality_manager import PersonalityManager
+from src.backend.ai.personality_watcher import PersonalityWatcher
+
+
+def _write_personality(directory: Path, filename: str, content: str) -> Path:
+    path = directory / filename
+    path.write_text(content, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def people_dir(tmp_path: Path) -> Path:
+    """テスト用の人格ディレクトリ"""
+    _write_personality(tmp_path, "common_prompt.md", "共通ルール: 丁寧に話すこと")
+    _write_personality(tmp_path, "001_タカシ.md", "タカシは現実的なリーダータイプです。")
+    _write_personality(tmp_path, "002_エミ.md", "エミは明るいムードメーカーです。")
+    return tmp_path
+
+
+def test_reload_only_changed_personalities(people_dir: Path) -> None:
+    """変更されたファイルのみ再読み込みされ、スナップショットが差し替わるテスト"""
+    manager = PersonalityManager(personalities_dir=people_dir)
+    old_personalities = manager.personalities
+    takashi = manager.get_personality_by_name("タカシ")
+    assert takashi is not None
+    assert takashi.prompt_content.startswith("共通ルール")
+
+    _write_personality(people_dir, "002_エミ.md", "エミは明るいムードメーカーで、音楽が好きです。")
+    assert manager.has_changes()
+    manager.reload_personalities()
+
+    # 変更のない人格は同じオブジェクトを再利用
+    assert manager.get_personality_by_name("タカシ") is takashi
+    emi = manager.get_personality_by_name("エミ")
+    assert emi is not None
+    assert "音楽が好き" in emi.prompt_content
+
+    # 再読み込み前に取得したスナップショットは変更されない
+    assert "音楽が好き" not in old_personalities["エミ"].prompt_content
+    assert not manager.has_changes()
+
+
+def test_reload_handles_removed_personality(people_dir: Path) -> None:
+    """削除された人格ファイルがスナップショットから除外されるテスト"""
+    manager = PersonalityManager(personalities_dir=people_dir)
+    (people_dir / "002_エミ.md").unlink()
+
+    manager.reload_personalities()
+
+    assert manager.list_available_personalities() == ["タカシ"]
+
+
+@pytest.mark.asyncio
+async def test_watcher_polling_detects_changes(people_dir: Path) -> None:
+    """ポーリング監視で新しい人格ファイルが反映されるテスト"""
+    manager = PersonalityManager(personalities_dir=people_dir)
+    watcher = PersonalityWatcher(manager, poll_interval=0.01, use_file_events=False)
+    await watcher.start()
+    try:
+        _write_personality(people_dir, "003_ケンタ.md", "ケンタはゲーム好きの大学生です。")
+        for _ in range(100):
+            if manager.get_personality_by_name("ケンタ"):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await watcher.stop()
+
+    assert manager.get_personality_by_name("ケンタ") is not None
+    assert not watcher.is_running()
+
+
+def test_front_matter_weight(people_dir: Path) -> None:
+    """front-matterのweightが読み込まれ、本文から除外されるテスト"""
+    _write_personality(people_dir, "003_ケンタ.md", "---\nweight: 3\n---\nケンタはゲーム好きの大学生です。")
+    manager = PersonalityManager(personalities_dir=people_dir)
+
+    kenta = manager.get_personality_by_user_id("ai_003")
+    assert kenta is not None
+    assert kenta.weight == 3.0
+    assert "weight" not in kenta.prompt_content
+    assert manager.get_personality_by_name("タカシ").weight == 1.0  # type: ignore[union-attr]
+
+
+def test_weighted_selection_respects_exclusions(people_dir: Path) -> None:
+    """重み付き抽選で除外対象が選ばれないテスト"""
+    _write_personality(people_dir, "003_ケンタ.md", "---\nweight: 50\n---\nケンタはゲーム好きの大学生です。")
+    manager = PersonalityManager(personalities_dir=people_dir, selection_strategy="weighted")
+
+    selected = {manager.get_random_personality(exclude_user_ids={"ai_003", "ai_001"}).name for _ in range(50)}  # type: ignore[union-attr]
+    assert selected == {"エミ"}
+
+    # 全員を除外した場合は全人格からのフォールバック
+    assert manager.get_random_personality(exclude_user_ids={"ai_001", "ai_002", "ai_003"}) is not None
+
+
+def test_least_recent_selection(people_dir: Path) -> None:
+    """最も長く発言していない人格が選ばれるテスト"""
+    manager = PersonalityManager(personalities_dir=people_dir, selection_strategy="least_recent")
+
+    first = manager.get_random_personality()
+    assert first is not None
+    manager.mark_spoken(first.user_id)
+
+    second = manager.get_random_personality()
+    assert second is not None
+    assert second.user_id != first.user_id
+    manager.mark_spoken(second.user_id)
+
+    assert manager.get_random_personality() == first
+    assert manager.get_random_personality(exclude_user_id=first.user_id) == second
+
+
+def test_mention_routes_to_named_personality() -> None:
+    """@AI メンションで指名された人格名を抽出するテスト"""
+    pattern = build_mention_pattern(["タカシ", "エミ", "エミリ"])
+
+    match = pattern.search("@AI タカシ 明日の予定どうする？")
+    assert match is not None
+    assert match.group("name") == "タカシ"
+
+    # 前方一致する名前は長い方を優先
+    match = pattern.search("ねえ　@ai エミリさん")
+    assert match is not None
+    assert match.group("name") == "エミリ"
+
+    # 名前の後が句読点・敬称の場合も指名として扱う
+    for text in ("@AI タカシ、聞いてる？", "@AI タカシ!", "@AI タカシ君どう思う？", "@AI タカシ"):
+        match = pattern.search(text)
+        assert match is not None
+        assert match.group("name") == "タカシ"
+
+    # 前方一致するだけの別の名前は指名として扱わない
+    match = pattern.search("@AI タカシマ 元気？")
+    assert match is not None
+    assert match.group("name") is None
+    match = build_mention_pattern(["タカシ", "タカシマ"]).search("@AI タカシマ 元気？")
+    assert match is not None
+    assert match.group("name") == "タカシマ"
+
+    # 指名なしのメンション
+    match = pattern.search("@AI 元気？")
+    assert match is not None
+    assert match.group("name") is None
+
+    # メンションではない
+    assert pattern.search("@aiko タカシ") is None
+    assert pattern.search("mail@ai タカシ") is None
@@ -0,0 +1,65 @@
+"""レート制限テスト（最小限・実用版）"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.backend.utils.rate_limiter import SlidingWindowRateLimiter, TokenBucketRateLimiter
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_waits_instead_of_dropping() -> None:
+    """上限到達後の呼び出しが捨てられず、ウィンドウが空くまで待機するテスト"""
+    limiter = SlidingWindowRateLimiter(max_calls=2, window_seconds=0.1, name="test_sliding")
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(limiter.acquire() for _ in range(4)))
+    elapsed = time.monotonic() - started
+
+    assert results == [True, True, True, True]
+    assert elapsed >= 0.09
+    assert limiter.stats.acquired == 4
+    assert limiter.stats.waits == 2
+    assert limiter.stats.drops == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_timeout_counts_drop() -> None:
+    """タイムアウトした呼び出しがdropとして計上されるテスト"""
+    limiter = SlidingWindowRateLimiter(max_calls=1, window_seconds=10, name="test_timeout")
+
+    assert await limiter.acquire()
+    assert await limiter.acquire(timeout=0.01) is False
+    assert limiter.try_acquire() is False
+    assert limiter.stats.drops == 2
+
+
+def test_token_bucket_allows_burst_then_limits() -> None:
+    """トークンバケットでバースト分のみ即時に許可されるテスト"""
+    limiter = TokenBucketRateLimiter(rate=1, capacity=3, name="test_bucket")
+
+    assert [limiter.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert limiter.stats.acquired == 3
+    assert limiter.stats.drops == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_arrival_order() -> None:
+    """待機中の呼び出しがある間に枠が空いても、後から来た呼び出しが先に取得しないテスト"""
+    limiter = SlidingWindowRateLimiter(max_calls=1, window_seconds=0.05, name="test_fifo")
+    order: list[str] = []
+
+    async def call(name: str) -> None:
+        assert await limiter.acquire()
+        order.append(name)
+
+    assert await limiter.acquire()
+    first = asyncio.create_task(call("first"))
+    await asyncio.sleep(0.01)
+    # 待機中の呼び出しが起きる前に枠が空いた状態
+    limiter._timestamps.clear()
+    assert limiter.try_acquire() is False
+    await asyncio.gather(first, call("second"))
+
+    assert order == ["first", "second"]
@@ -0,0 +1,88 @@
+"""SQLite書き込みスレッドテスト（最小限・実用版）"""
+
+import asyncio
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.backend import crud
+from src.backend.database import Base, _apply_sqlite_pragmas
+from src.backend.models import Message
+from src.backend.schemas import MessageCreate
+from src.backend.utils.session_manager import save_message_with_writer
+from src.backend.utils.sqlite_writer import SQLiteWriter
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_are_serialized(tmp_path: Path) -> None:
+    """同時に投入した書き込みが書き込みスレッドで全て保存され、読み込み専用接続から参照できるテスト"""
+    url = f"sqlite:///{tmp_path / 'chat.db'}"
+    write_engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=1, max_overflow=0)
+    read_engine = create_engine(url, connect_args={"check_same_thread": False})
+    _apply_sqlite_pragmas(write_engine)
+    _apply_sqlite_pragmas(read_engine, read_only=True)
+    Base.metadata.create_all(write_engine)
+    writer = SQLiteWriter(sessionmaker(bind=write_engine))
+
+    messages = [
+        MessageCreate(
+            id=f"writer_{i}",
+            channel_id="1",
+            user_id="user_1",
+            user_name="テストユーザー",
+            content=f"メッセージ {i}",
+            timestamp=datetime.now(UTC),
+            is_own_message=True,
+        )
+        for i in range(50)
+    ]
+    results = await asyncio.gather(
+        *(writer.run(lambda db, message=message: crud.create_message(db, message)) for message in messages)
+    )
+    writer.close()
+    assert all(result is not None for result in results)
+    assert writer.queue_depth == 0
+
+    with sessionmaker(bind=read_engine)() as db:
+        assert db.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.query(Message).count() == 50
+        # 読み込み専用の接続では書き込めない
+        with pytest.raises(OperationalError):
+            db.execute(text("DELETE FROM messages"))
+
+    write_engine.dispose()
+    read_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_passed_session_on_another_db_is_not_routed_to_writer(
+    tmp_path: Path, test_db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """TESTING未指定時のように書き込みスレッドが有効でも、別のDBのセッションを渡した場合はそのセッションで保存するテスト"""
+    from src.backend.utils import sqlite_writer
+
+    # テーブルのないchat.dbを使う書き込みスレッド（TESTING未指定時のフォールバックと同じ状態）
+    writer_engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    writer = SQLiteWriter(sessionmaker(bind=writer_engine))
+    monkeypatch.setattr(sqlite_writer, "_sqlite_writer", writer)
+    message = MessageCreate(
+        id="writer_passed_session",
+        channel_id="1",
+        user_id="user_1",
+        user_name="テストユーザー",
+        content="渡したセッションで保存",
+        timestamp=datetime.now(UTC),
+        is_own_message=True,
+    )
+
+    saved = await save_message_with_writer(lambda db: crud.create_message(db, message), test_db)
+    assert saved.id == "writer_passed_session"
+    assert test_db.query(Message).filter(Message.id == "writer_passed_session").count() == 1
+    assert writer.queue_depth == 0
+
+    writer.close()
+    writer_engine.dispose()
@@ -0,0 +1,47 @@
+"""トレーシングテスト（最小限・実用版）"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from src.backend.utils.tracing import BatchSpanProcessor, JsonLinesExporter, Tracer, get_current_trace_id
+
+
+@pytest.mark.asyncio
+async def test_nested_spans_exported_as_jsonl(tmp_path: Path) -> None:
+    """入れ子のスパンが同じトレースIDで親子関係付きで出力されるテスト"""
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(BatchSpanProcessor(JsonLinesExporter(path)), sample_rate=1.0)
+
+    with tracer.span("websocket.message_send") as root:
+        with tracer.span("db.save_message", source="user"):
+            assert get_current_trace_id() == root.trace_id  # type: ignore[union-attr]
+        with pytest.raises(RuntimeError), tracer.span("gemini.request"):
+            raise RuntimeError("timeout")
+    assert get_current_trace_id() is None
+    tracer.shutdown()
+
+    spans = {span["name"]: span for span in map(json.loads, path.read_text(encoding="utf-8").splitlines())}
+    assert set(spans) == {"websocket.message_send", "db.save_message", "gemini.request"}
+    assert {span["trace_id"] for span in spans.values()} == {root.trace_id}  # type: ignore[union-attr]
+    assert spans["db.save_message"]["parent_span_id"] == spans["websocket.message_send"]["span_id"]
+    assert spans["db.save_message"]["attributes"] == {"source": "user"}
+    assert spans["gemini.request"]["status"] == "error"
+
+
+def test_unsampled_trace_is_not_exported(tmp_path: Path) -> None:
+    """サンプリング対象外のトレースは出力されないテスト"""
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(BatchSpanProcessor(JsonLinesExporter(path)), sample_rate=0.0)
+
+    with tracer.span("websocket.message_send") as root:
+        assert root is None
+
+    tracer.sample_rate = 1e-12
+    with tracer.span("websocket.message_send") as root, tracer.span("db.save_message") as child:
+        # 対象外のトレース内では新しいスパンを作らない
+        assert child is root
+    tracer.shutdown()
+
+    assert not path.exists()
@@ -1,10 +1,16 @@
 """WebSocket基本テスト（最小限・実用版）"""
 
+import asyncio
+import json
+from pathlib import Path
 from typing import TYPE_CHECKING, Any
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+import pytest
 from fastapi import WebSocket
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from starlette.websockets import WebSocketState
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
@@ -54,3 +60,236 @@ def test_websocket_message_send(client: TestClient, seed_channels: list["Channel
         assert response["type"] == "message:saved"
         assert response["data"]["success"] is True
         assert response["data"]["id"] == "ws_test_msg_1"
+
+
+def test_msgpack_and_json_clients_coexist(
+    client: TestClient, seed_channels: list["Channel"], test_db: "Session", sample_message_data: dict[str, Any]
+) -> None:
+    """MessagePackのクライアントとJSONのクライアントがそれぞれの形式で送受信できるテスト"""
+    import msgpack
+
+    from src.backend.websocket import handle_websocket_message
+    from src.backend.websocket.codec import MSGPACK_CODEC, MSGPACK_SUBPROTOCOL
+
+    async def mock_handle_websocket_message(websocket: WebSocket, data: Any, db_session: Any = None) -> Any:
+        return await handle_websocket_message(websocket, data, db_session=test_db)
+
+    with (
+        patch("src.backend.main.handle_websocket_message", side_effect=mock_handle_websocket_message),
+        patch("src.backend.websocket.handler.handle_ai_response", new_callable=AsyncMock),
+        client.websocket_connect("/ws") as json_ws,
+        client.websocket_connect("/ws", subprotocols=[MSGPACK_SUBPROTOCOL, "ai-community.json"]) as binary_ws,
+    ):
+        assert binary_ws.accepted_subprotocol == MSGPACK_SUBPROTOCOL
+        binary_ws.send_bytes(MSGPACK_CODEC.encode({"type": "message:send", "data": sample_message_data}))
+
+        # キーは短縮名で送られる
+        saved = msgpack.unpackb(binary_ws.receive_bytes())
+        assert saved == {"t": "message:saved", "d": {"i": sample_message_data["id"], "ok": True}}
+        broadcast = json_ws.receive_json()
+        assert broadcast["type"] == "message:broadcast"
+        assert broadcast["data"]["content"] == sample_message_data["content"]
+
+        binary_ws.send_bytes(b"\xc1")
+        assert MSGPACK_CODEC.decode(binary_ws.receive_bytes())["data"]["error"] == "無効なMessagePack形式"
+
+
+def test_message_send_batch(
+    client: TestClient, seed_channels: list["Channel"], test_db: "Session", sample_message_data: dict[str, Any]
+) -> None:
+    """一括送信したメッセージがまとめて保存され、結果とブロードキャストがそれぞれ1つのフレームで届くテスト"""
+    from src.backend import crud
+    from src.backend.websocket import handle_websocket_message
+    from src.backend.websocket.replay import replay_buffer
+
+    async def mock_handle_websocket_message(websocket: WebSocket, data: Any, db_session: Any = None) -> Any:
+        return await handle_websocket_message(websocket, data, db_session=test_db)
+
+    items = [{**sample_message_data, "id": f"batch_{i}", "content": f"一括送信{i}"} for i in range(3)]
+    # 不正なメッセージと、同じ一括送信内で重複したメッセージ
+    items += [{**sample_message_data, "id": "batch_empty", "content": " "}, "not a message", items[0]]
+
+    with (
+        patch("src.backend.main.handle_websocket_message", side_effect=mock_handle_websocket_message),
+        patch("src.backend.websocket.handler.handle_ai_response", new_callable=AsyncMock) as ai_response,
+        client.websocket_connect("/ws") as sender,
+        client.websocket_connect("/ws") as receiver,
+    ):
+        sender.send_json({"type": "message:send_batch", "data": {"batch_id": "batch_1", "messages": items}})
+
+        result = sender.receive_json()
+        assert result["type"] == "message:batch_result"
+        assert result["data"]["batch_id"] == "batch_1"
+        assert [(r["id"], r["success"]) for r in result["data"]["results"]] == [
+            ("batch_0", True),
+            ("batch_1", True),
+            ("batch_2", True),
+            ("batch_empty", False),
+            (None, False),
+            ("batch_0", True),
+        ]
+        assert result["data"]["results"][3]["error"] == "メッセージデータが無効です: メッセージ内容は空にできません"
+
+        broadcast = receiver.receive_json()
+        assert broadcast["type"] == "message:broadcast_batch"
+        assert [(m["id"], m["seq"]) for m in broadcast["data"]["messages"]] == [
+            ("batch_0", 1),
+            ("batch_1", 2),
+            ("batch_2", 3),
+        ]
+
+        # 再送した場合は保存済みとして応答し、再度ブロードキャストしない
+        sender.send_json({"type": "message:send_batch", "data": {"messages": items[:1]}})
+        assert sender.receive_json()["data"] == {"batch_id": None, "results": [{"id": "batch_0", "success": True}]}
+        assert replay_buffer.latest_seq("1") == 3
+
+    # 送信した順に保存される
+    assert [m.id for m in crud.get_channel_messages(test_db, "1")] == ["batch_0", "batch_1", "batch_2"]
+    assert ai_response.await_count == 3
+
+
+@pytest.mark.parametrize(
+    ("changes", "expected_error"),
+    [
+        ({}, None),
+        ({"user_name": None}, "メッセージデータが無効です: 必須フィールド 'user_name' が不足しています"),
+        (
+            {"channelId": "1", "channel_id": None},
+            "メッセージデータが無効です: 必須フィールド 'channel_id' が不足しています",
+        ),
+        (
+            {"is_own_message": "true"},
+            "メッセージデータが無効です: フィールド 'is_own_message' の型が正しくありません（期待値: bool）",
+        ),
+        (
+            {"timestamp": 1700000000},
+            "メッセージデータが無効です: フィールド 'timestamp' の型が正しくありません（期待値: str）",
+        ),
+        # 先頭のフィールドのエラーを返す
+        ({"id": 1, "content": 2}, "メッセージデータが無効です: フィールド 'id' の型が正しくありません（期待値: str）"),
+        ({"content": "   ", "timestamp": "yesterday"}, "メッセージデータが無効です: メッセージ内容は空にできません"),
+        ({"content": "あ" * 10001}, "メッセージデータが無効です: メッセージが長すぎます"),
+        ({"timestamp": "yesterday"}, "メッセージフォーマットが正しくありません"),
+        ({"user_type": "bot"}, "メッセージフォーマットが正しくありません"),
+    ],
+)
+def test_parse_message_data_errors(
+    sample_message_data: dict[str, Any], changes: dict[str, Any], expected_error: str | None
+) -> None:
+    """受信メッセージの検証が1回の検証で従来と同じエラー内容を返すテスト"""
+    from src.backend.websocket.handler import parse_message_data
+
+    message_data = {**sample_message_data, **changes}
+    message_data = {key: value for key, value in message_data.items() if value is not None}
+    message_create, error = parse_message_data(message_data)
+    assert error == expected_error
+    assert (message_create is None) == (expected_error is not None)
+
+
+class _FakeWebSocket:
+    """送信内容を記録するWebSocketのスタブ"""
+
+    client_state = WebSocketState.CONNECTED
+
+    def __init__(self) -> None:
+        self.sent: list[dict[str, Any]] = []
+
+    async def send_text(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+
+
+@pytest.mark.asyncio
+async def test_resent_message_is_acked_without_reprocessing(
+    test_db: "Session", seed_channels: list["Channel"], sample_message_data: dict[str, Any]
+) -> None:
+    """再送されたメッセージが重複保存・再ブロードキャストされず保存済みとして応答されるテスト"""
+    from src.backend.utils.recent_ids import recent_message_ids
+    from src.backend.websocket.handler import handle_websocket_message
+
+    websocket = _FakeWebSocket()
+    data = {"type": "message:send", "data": sample_message_data}
+
+    with patch("src.backend.websocket.handler.handle_ai_response", new_callable=AsyncMock) as ai_response:
+        await handle_websocket_message(websocket, data, db_session=test_db)  # type: ignore[arg-type]
+        # 再接続後の再送（キャッシュで検出）
+        await handle_websocket_message(websocket, data, db_session=test_db)  # type: ignore[arg-type]
+        # プロセス再起動後の再送（DBで検出）
+        recent_message_ids.clear()
+        await handle_websocket_message(websocket, data, db_session=test_db)  # type: ignore[arg-type]
+
+    assert [response["type"] for response in websocket.sent] == ["message:saved"] * 3
+    assert ai_response.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_write_behind_broadcasts_only_after_insert(
+    test_db: "Session", seed_channels: list["Channel"], sample_message_data: dict[str, Any], tmp_path: Path
+) -> None:
+    """一括保存時はコミット後に新たに保存された場合のみブロードキャスト・AI応答を行うテスト"""
+    from src.backend.utils.recent_ids import recent_message_ids
+    from src.backend.utils.write_behind import MessageWriteBehind
+    from src.backend.websocket import handler
+
+    writer = MessageWriteBehind(tmp_path / "journal.jsonl", sessionmaker(bind=test_db.get_bind()))
+    websocket = _FakeWebSocket()
+    data = {"type": "message:send", "data": sample_message_data}
+
+    with (
+        patch("src.backend.websocket.handler.get_message_writer", return_value=writer),
+        patch("src.backend.websocket.handler.handle_ai_response", new_callable=AsyncMock) as ai_response,
+        patch("src.backend.websocket.handler.manager.broadcast_message", new_callable=AsyncMock) as broadcast,
+    ):
+        await handler.handle_websocket_message(websocket, data, db_session=test_db)  # type: ignore[arg-type]
+        # コミット前はブロードキャスト・AI応答を行わない
+        assert broadcast.await_count == 0
+        await asyncio.gather(*handler._pending_ack_tasks)
+        assert broadcast.await_count == 1
+        assert ai_response.await_count == 1
+
+        # 再送IDのキャッシュが空でもDBに保存済みの場合は、保存済みの応答のみ
+        recent_message_ids.clear()
+        await handler.handle_websocket_message(websocket, data, db_session=test_db)  # type: ignore[arg-type]
+        await asyncio.gather(*handler._pending_ack_tasks)
+
+    await writer.close()
+    assert [response["type"] for response in websocket.sent] == ["message:saved"] * 2
+    assert broadcast.await_count == 1
+    assert ai_response.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_broadcasts(
+    test_db: "Session", seed_channels: list["Channel"], create_test_messages: Any
+) -> None:
+    """再接続時に切断中のブロードキャストが再送ログ（古い場合はDB）から再送されるテスト"""
+    from src.backend.websocket.handler import handle_websocket_message
+    from src.backend.websocket.manager import manager
+    from src.backend.websocket.replay import replay_buffer
+
+    for i in range(3):
+        data = {"id": f"replay_{i}", "channel_id": "1", "content": f"メッセージ{i}"}
+        await manager.broadcast_message({"type": "message:broadcast", "data": data})
+
+    websocket = _FakeWebSocket()
+    resume = {"channel_id": "1", "last_seq": 1, "epoch": replay_buffer.epoch}
+    await handle_websocket_message(websocket, {"type": "message:resume", "data": resume}, db_session=test_db)  # type: ignore[arg-type]
+
+    assert [(r["data"]["id"], r["data"]["seq"]) for r in websocket.sent[:-1]] == [("replay_1", 2), ("replay_2", 3)]
+    assert websocket.sent[-1]["type"] == "message:resumed"
+    assert websocket.sent[-1]["data"] == {
+        "channel_id": "1",
+        "seq": 3,
+        "epoch": replay_buffer.epoch,
+        "source": "buffer",
+        "count": 2,
+        "has_more": False,
+    }
+
+    # サーバー再起動後（epochが異なる）はDBから取得する
+    messages = create_test_messages("1", 3)
+    websocket = _FakeWebSocket()
+    resume = {"channel_id": "1", "last_seq": 1, "epoch": "old", "last_message_id": messages[0].id}
+    await handle_websocket_message(websocket, {"type": "message:resume", "data": resume}, db_session=test_db)  # type: ignore[arg-type]
+
+    assert [r["data"]["id"] for r in websocket.sent[:-1]] == [messages[1].id, messages[2].id]
+    assert websocket.sent[-1]["data"]["source"] == "database"
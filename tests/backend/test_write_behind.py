@@ -0,0 +1,86 @@
+"""メッセージ一括保存テスト（最小限・実用版）"""
+
+import asyncio
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.backend.models import Message
+from src.backend.schemas import MessageCreate
+from src.backend.utils.write_behind import MessageWriteBehind
+
+
+def _message(message_id: str) -> MessageCreate:
+    return MessageCreate(
+        id=message_id,
+        channel_id="1",
+        user_id="user_1",
+        user_name="テストユーザー",
+        content=f"メッセージ {message_id}",
+        timestamp=datetime.now(UTC),
+        is_own_message=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_batched_insert_is_idempotent(test_db: Session, tmp_path: Path) -> None:
+    """まとめて保存され、同じIDのメッセージは二重に保存されないテスト"""
+    writer = MessageWriteBehind(tmp_path / "journal.jsonl", sessionmaker(bind=test_db.get_bind()))
+
+    futures = [writer.submit(_message(message_id)) for message_id in ("wb_1", "wb_2", "wb_1")]
+    assert [await future for future in futures] == [True, True, False]
+
+    # 保存済みのIDを再送しても保存されない
+    assert await writer.submit(_message("wb_2")) is False
+    await writer.close()
+
+    assert test_db.query(Message).count() == 2
+    # コミット済みのためジャーナルは空
+    assert (tmp_path / "journal.jsonl").read_text(encoding="utf-8") == ""
+
+
+@pytest.mark.asyncio
+async def test_recover_from_journal(test_db: Session, tmp_path: Path) -> None:
+    """コミット前に終了したメッセージが次回起動時に保存されるテスト"""
+    journal_path = tmp_path / "journal.jsonl"
+    crashed = MessageWriteBehind(journal_path, sessionmaker(bind=test_db.get_bind()))
+    for message_id in ("wb_10", "wb_11"):
+        row = {"created_at": datetime.now(UTC)}
+        crashed._append_journal(crashed._journal_line(row, _message(message_id)))
+    crashed._sync_journal()
+    with journal_path.open("a", encoding="utf-8") as f:
+        f.write('{"message": {"id": "wb_12"')  # 書き込み途中の行
+
+    writer = MessageWriteBehind(journal_path, sessionmaker(bind=test_db.get_bind()))
+    assert writer.recover() == 2
+    assert not journal_path.exists()
+    assert {message.id for message in test_db.query(Message).all()} == {"wb_10", "wb_11"}
+
+
+@pytest.mark.asyncio
+async def test_journal_keeps_only_unsaved_rows(
+    test_db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """保存に失敗した行が残っていても、コミット済みの行はジャーナルから取り除かれるテスト"""
+    journal_path = tmp_path / "journal.jsonl"
+    writer = MessageWriteBehind(journal_path, sessionmaker(bind=test_db.get_bind()), journal_compact_bytes=0)
+    writer.RETRY_BACKOFF_SECONDS = 0
+    insert_rows = writer._insert_rows
+
+    def fail_insert(rows: list[dict]) -> set[str]:
+        raise RuntimeError("DB unavailable")
+
+    monkeypatch.setattr(writer, "_insert_rows", fail_insert)
+    with pytest.raises(RuntimeError):
+        await writer.submit(_message("wb_failed"))
+
+    monkeypatch.setattr(writer, "_insert_rows", insert_rows)
+    futures = [writer.submit(_message(f"wb_{index}")) for index in range(20)]
+    assert await asyncio.gather(*futures) == [True] * 20
+    await writer.close()
+
+    lines = journal_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["message"]["id"] for line in lines] == ["wb_failed"]
@@ -4,12 +4,17 @@
 """
 
 import asyncio
+import os
 from collections.abc import AsyncGenerator, Generator
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from src.backend.models import Channel
 
+# アプリのDB設定より先に読み込まれるよう、TESTINGの指定がなくてもテスト用の設定にする
+# （未指定の場合はchat.dbのファイルが作成され、SQLiteの書き込みスレッドが有効になるため）
+os.environ.setdefault("TESTING", "true")
+
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
@@ -18,10 +23,13 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from src.backend.database import Base, get_db
+from src.backend.database import Base, get_db, get_read_db, get_replica_db
 
 # テーブル重複定義エラーを回避するため、モデルは使用時にimportする
 from src.backend.main import app
+from src.backend.utils.recent_ids import recent_message_ids
+from src.backend.utils.response_cache import response_cache
+from src.backend.websocket.replay import replay_buffer
 
 # テスト用データベース設定
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -55,6 +63,12 @@ def test_db() -> Generator[Session]:
             db.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_replica_db] = override_get_db
+    # テストごとにDBを作り直すため、保存済みIDのキャッシュ・再送ログ・レスポンスキャッシュも空にする
+    recent_message_ids.clear()
+    replay_buffer.clear()
+    response_cache.clear()
 
     db = TestingSessionLocal()
     try: